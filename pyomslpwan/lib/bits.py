@@ -0,0 +1,47 @@
+import numpy
+
+
+
+# Bit vectors are boolean arrays, most significant bit first. Functions work on the last axis,
+# so a batch of values is converted in one call.
+
+
+
+def uintToBits(value, width: int) -> numpy.ndarray:
+    if isinstance(value, int):
+        # Python integers may be wider than 64 bits, like the uplink midamble
+        data = numpy.frombuffer(value.to_bytes((width + 7) // 8, "big"), dtype=numpy.uint8)
+        return numpy.unpackbits(data)[-width:].view(numpy.bool_) if width > 0 else numpy.zeros(0, dtype=numpy.bool_)
+    assert width <= 64
+    value = numpy.asarray(value, dtype=numpy.uint64)
+    assert width == 64 or (value >> numpy.uint64(width) == 0).all()
+    shifts = numpy.arange(width - 1, -1, -1, dtype=numpy.uint64)
+    return ((value[..., None] >> shifts) & numpy.uint64(1)).astype(numpy.bool_)
+
+
+
+def bitsToUint(bits: numpy.ndarray):
+    bits = numpy.asarray(bits, dtype=numpy.bool_)
+    width = bits.shape[-1]
+    if bits.ndim == 1:
+        # packbits pads the last byte on the right
+        return int.from_bytes(numpy.packbits(bits).tobytes(), "big") >> (-width % 8)
+    assert width <= 64
+    shifts = numpy.arange(width - 1, -1, -1, dtype=numpy.uint64)
+    return (bits.astype(numpy.uint64) << shifts).sum(axis=-1, dtype=numpy.uint64)
+
+
+
+def bytesToBits(data) -> numpy.ndarray:
+    # data is a bytes-like object or a uint8 array of shape (..., n_bytes)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = numpy.frombuffer(data, dtype=numpy.uint8)
+    return numpy.unpackbits(numpy.asarray(data, dtype=numpy.uint8), axis=-1).view(numpy.bool_)
+
+
+
+def bitsToBytes(bits: numpy.ndarray) -> numpy.ndarray:
+    # Returns a uint8 array of shape (..., n_bytes), call tobytes() on a single vector
+    bits = numpy.asarray(bits)
+    assert bits.shape[-1] % 8 == 0
+    return numpy.packbits(bits.astype(numpy.bool_, copy=False), axis=-1)
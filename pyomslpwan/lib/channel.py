@@ -1,5 +1,7 @@
+import math
 import numpy
 from collections import deque
+from fractions import Fraction
 import numba
 from scipy import signal
 import bitstring
@@ -23,95 +25,488 @@ def gaussdesign(bt, span, sps):
 
 
 
-class Correlator:
+class MultiCorrelator:
 
-    def __init__(self, pattern):
-        self.size = len(pattern)
-        self.buffer = numpy.zeros(self.size - 1, dtype=complex)
-        self.pattern = pattern
-        self.pattern_rms = numpy.sqrt((numpy.abs(self.pattern) ** 2).sum())
+    def __init__(self, patterns, fft_size=None):
+        # Correlates one stream against several patterns, sharing the window power and the
+        # spectrum of every block between them
+        self.sizes = [len(pattern) for pattern in patterns]
+        self.max_size = max(self.sizes)
+        self.buffer = numpy.zeros(self.max_size - 1, dtype=complex)
+        self.patterns = patterns
+        self.pattern_rms = [numpy.sqrt((numpy.abs(pattern) ** 2).sum()) for pattern in patterns]
+
+        # Overlap-save: every FFT block of fft_size samples yields fft_size - max_size + 1 correlations
+        if fft_size is None:
+            fft_size = 1 << int(16 * self.max_size - 1).bit_length()
+        assert fft_size >= self.max_size
+        self.fft_size = fft_size
+        self.step = self.fft_size - self.max_size + 1
+        self.pattern_spectra = [numpy.fft.fft(numpy.conj(pattern[::-1]), self.fft_size) for pattern in patterns]
     
-    def correlate(self, samples): # consider scipy.signal.correlate / convolve
+    def correlate(self, samples):
+        # Returns one normalized correlation per pattern, index i belongs to the window ending at samples[i]
         padded_samples = numpy.concatenate([self.buffer, samples])
+        n_outputs = len(samples)
+
+        # Window power from a cumulative sum, restarted every call so rounding stays local
+        power_sum = numpy.zeros(len(padded_samples) + 1)
+        numpy.cumsum(padded_samples.real ** 2 + padded_samples.imag ** 2, out=power_sum[1:])
+        window_end = power_sum[self.max_size:]
+        silence = numpy.finfo(float).eps * self.max_size * power_sum[-1]
+
+        n_blocks = max(-(-n_outputs // self.step), 1)
+        blocks = numpy.zeros((n_blocks - 1) * self.step + self.fft_size, dtype=complex)
+        blocks[:len(padded_samples)] = padded_samples
+        blocks = numpy.lib.stride_tricks.sliding_window_view(blocks, self.fft_size)[::self.step]
+        spectrum = numpy.fft.fft(blocks, axis=1)
+
+        correlations = []
+        for size, pattern_rms, pattern_spectrum in zip(self.sizes, self.pattern_rms, self.pattern_spectra):
+            correlation = numpy.fft.ifft(spectrum * pattern_spectrum, axis=1)[:, self.max_size - 1:].ravel()[:n_outputs]
+            window_power = window_end - power_sum[self.max_size - size:len(power_sum) - size]
+
+            # Windows without power, down to the rounding of the cumulative sum, have no defined correlation
+            audible = window_power > silence
+            scale = numpy.zeros(n_outputs)
+            numpy.sqrt(window_power, out=scale, where=audible)
+            numpy.divide(1 / pattern_rms, scale, out=scale, where=audible)
+            correlation *= scale
+            correlations.append(correlation)
+
+        self.buffer = padded_samples[len(padded_samples) - (self.max_size - 1):]
+        return correlations
+    
+    def clear(self):
+        self.buffer[:] = 0
 
-        window_squared = numpy.lib.stride_tricks.sliding_window_view(numpy.abs(padded_samples) ** 2, self.size)
-        window_rms = numpy.sqrt(window_squared.sum(axis=1))
 
-        normalized_correlation = numpy.correlate(padded_samples, self.pattern) / (window_rms * self.pattern_rms)
 
-        self.buffer = padded_samples[-(self.size - 1):]
-        return normalized_correlation
+class Correlator(MultiCorrelator):
+
+    def __init__(self, pattern, fft_size=None):
+        super().__init__([pattern], fft_size)
+        self.size = len(pattern)
+        self.pattern = pattern
     
+    def correlate(self, samples):
+        return super().correlate(samples)[0]
+
+
+
+class SampleRingBuffer:
+
+    def __init__(self, capacity=1024):
+        # Every sample is stored twice, capacity apart, so any range of up to capacity samples is
+        # one contiguous slice. Positions are absolute sample indices since the last clear.
+        self.capacity = capacity
+        self.data = numpy.zeros(2 * self.capacity, dtype=complex)
+        self.start = 0
+        self.end = 0
+
+    def __len__(self):
+        return self.end - self.start
+
     def clear(self):
-        self.buffer[:] = 0
+        self.start = 0
+        self.end = 0
+
+    def write(self, position, samples):
+        offset = position % self.capacity
+        n_samples = len(samples)
+        self.data[offset:offset + n_samples] = samples
+        if offset + n_samples <= self.capacity:
+            self.data[offset + self.capacity:offset + self.capacity + n_samples] = samples
+        else:
+            split = self.capacity - offset
+            self.data[offset + self.capacity:] = samples[:split]
+            self.data[:n_samples - split] = samples[split:]
+
+    def reserve(self, size):
+        # Grows by doubling, so appending stays amortized O(block) however long samples are kept
+        if size <= self.capacity:
+            return
+        samples = self.view(self.start, self.end).copy()
+        self.capacity = 1 << int(size - 1).bit_length()
+        self.data = numpy.zeros(2 * self.capacity, dtype=complex)
+        self.write(self.start, samples)
+
+    def append(self, samples):
+        self.reserve(len(self) + len(samples))
+        self.write(self.end, samples)
+        self.end += len(samples)
+
+    def discard(self, position):
+        # Drops samples before position
+        self.start = max(self.start, min(position, self.end))
+
+    def view(self, start, end):
+        # Zero-copy, valid until the next append
+        assert self.start <= start <= end <= self.end
+        offset = start % self.capacity
+        return self.data[offset:offset + end - start]
+
+
+
+class PowerSquelch:
+
+    def __init__(self, window=256, open_ratio=4.0, close_ratio=2.0, hang=8, pretrigger=None, averaging=0.01, noise_floor=None, min_noise_floor=1e-12):
+        # Opens when the mean power of a window of samples exceeds open_ratio times the noise floor
+        # and closes after hang consecutive windows below close_ratio times the noise floor. The
+        # noise floor follows the power of closed windows. Without an initial noise floor it starts
+        # at the quietest window of the first block, so a burst at the start of reception still opens.
+        # Windows with a power of at most min_noise_floor (zero-filled or blanked input) say nothing
+        # about the noise and neither set nor update the noise floor.
+        self.window = window
+        self.open_ratio = open_ratio
+        self.close_ratio = close_ratio
+        self.hang = hang
+        self.pretrigger = window if pretrigger is None else pretrigger
+        self.averaging = averaging
+        self.initial_noise_floor = noise_floor
+        self.min_noise_floor = min_noise_floor
+        self.clear()
+
+    def clear(self):
+        self.noise_floor = self.initial_noise_floor
+        self.is_open = False
+        self.hang_count = 0
+
+    def getSpans(self, samples):
+        # Returns (start, end) index ranges of samples with activity
+        n_windows = -(-len(samples) // self.window)
+        power_sum = numpy.zeros(len(samples) + 1)
+        numpy.cumsum(samples.real ** 2 + samples.imag ** 2, out=power_sum[1:])
+        bounds = numpy.minimum(numpy.arange(n_windows + 1) * self.window, len(samples))
+        powers = numpy.diff(power_sum[bounds]) / numpy.diff(bounds)
+
+        if self.noise_floor is None:
+            noise_powers = powers[powers > self.min_noise_floor]
+            if len(noise_powers) == 0:
+                return []
+            self.noise_floor = noise_powers.min()
+
+        spans = []
+        for index, power in enumerate(powers):
+            if self.is_open:
+                self.hang_count = self.hang if power >= self.close_ratio * self.noise_floor else self.hang_count - 1
+                self.is_open = self.hang_count > 0
+            elif power > self.open_ratio * self.noise_floor:
+                self.is_open = True
+                self.hang_count = self.hang
+            elif power > self.min_noise_floor:
+                self.noise_floor += self.averaging * (power - self.noise_floor)
+
+            if not self.is_open:
+                continue
+            if len(spans) != 0 and spans[-1][1] == bounds[index]:
+                spans[-1][1] = bounds[index + 1]
+            else:
+                spans.append([bounds[index], bounds[index + 1]])
+        return spans
+
+
+
+class DetectionFrontEnd:
+
+    def __init__(self, fft_size=None, squelch=None, noise_probe_interval=8):
+        # Correlates incoming samples against the patterns of all registered synchronizers in one
+        # pass and keeps one sample history for all of them. With a squelch only samples around
+        # activity are correlated, the history still keeps every sample. CFAR synchronizers take
+        # their noise statistics from closed samples instead, which are correlated in probes of the
+        # longest cfar_window once every noise_probe_interval probe lengths.
+        self.fft_size = fft_size
+        self.squelch = squelch
+        self.noise_probe_interval = noise_probe_interval
+        self.synchronizers = []
+        self.correlator = None
+        self.history = SampleRingBuffer()
+        self.clear()
+
+    def register(self, synchronizer):
+        self.synchronizers.append(synchronizer)
+        self.correlator = MultiCorrelator([synchronizer.syncword for synchronizer in self.synchronizers], self.fft_size)
+        self.clear()
+
+    def getLookback(self):
+        # Samples before a span that its correlation depends on
+        if self.correlator is None:
+            return 0
+        pretrigger = 0 if self.squelch is None else self.squelch.pretrigger
+        return pretrigger + self.correlator.max_size - 1
+
+    def clear(self):
+        # Detections right after a clear point into a zero history
+        min_buffer_size = max([synchronizer.min_buffer_size for synchronizer in self.synchronizers] + [self.getLookback()])
+        self.history.clear()
+        self.history.append(numpy.zeros(min_buffer_size, dtype=complex))
+        self.correlated_end = self.history.end
+        self.detected_end = self.history.end
+        self.correlated_samples = 0
+        if self.correlator is not None:
+            self.correlator.clear()
+        if self.squelch is not None:
+            self.squelch.clear()
+
+    def getEnd(self):
+        return self.history.end
+
+    def feed(self, samples):
+        end_position = self.getEnd()
+        self.history.append(samples)
+
+        if self.squelch is None:
+            self.correlate(end_position, end_position + len(samples))
+        else:
+            closed_start = end_position
+            for start, end in self.squelch.getSpans(samples):
+                # Starts a bit early, so a syncword right before the squelch opened is found as well
+                start = max(end_position + start - self.squelch.pretrigger, self.detected_end)
+                self.probeNoise(closed_start, start)
+                self.correlate(start, end_position + end, noise=False)
+                closed_start = end_position + end
+            self.probeNoise(closed_start, self.getEnd())
+
+        # Pending peaks complete once enough samples without crossings follow, correlated or not
+        for synchronizer in self.synchronizers:
+            synchronizer.advance(self.getEnd())
+        self.trimBuffer()
+
+    def correlate(self, start, end, detect=True, noise=True):
+        if start != self.correlated_end:
+            # The correlator continues from the samples before start instead of the last correlated ones
+            self.correlator.buffer = self.history.view(start - (self.correlator.max_size - 1), start).copy()
+        correlations = self.correlator.correlate(self.history.view(start, end))
+        self.correlated_end = end
+        self.correlated_samples += end - start
+
+        for synchronizer, correlation in zip(self.synchronizers, correlations):
+            if detect:
+                synchronizer.detect(correlation, start, noise)
+            elif synchronizer.false_alarm_rate is not None:
+                synchronizer.updateNoise(numpy.abs(correlation), start)
+        if detect:
+            self.detected_end = end
+
+    def probeNoise(self, start, end):
+        # Probes sit at fixed absolute positions, so the noise statistics do not depend on the block size
+        probe_size = max([synchronizer.cfar_window for synchronizer in self.synchronizers if synchronizer.false_alarm_rate is not None], default=0)
+        if probe_size == 0:
+            return
+        interval = self.noise_probe_interval * probe_size
+        for probe_start in range(start // interval * interval, end, interval):
+            probe_end = min(probe_start + probe_size, end)
+            probe_start = max(probe_start, start)
+            if probe_start < probe_end:
+                self.correlate(probe_start, probe_end, detect=False)
+
+    def trimBuffer(self):
+        keep_position = min(synchronizer.getKeepPosition() for synchronizer in self.synchronizers)
+        self.history.discard(min(keep_position, self.getEnd() - self.getLookback()))
 
 
 
 class SyncwordSynchronizer:
 
-    def __init__(self, syncword, syncword_offset, threshold):
-        self.correlator = Correlator(syncword)
+    # Tail probability at which CFAR mode measures the correlation distribution
+    CFAR_QUANTILE = 0.01
+    # Resolution of the histogram of correlation magnitudes, which lie in [0, 1]
+    CFAR_BINS = 1024
+    # Noise samples needed before the threshold is fitted, unless the window is shorter
+    CFAR_MIN_SAMPLES = 1000
+    # Threshold fits per cfar_window samples
+    CFAR_UPDATES = 8
+
+    def __init__(self, syncword, syncword_offset, threshold, front_end=None, guard=None, min_spacing=None,
+                 false_alarm_rate=None, sample_rate=None, cfar_window=None):
+        self.syncword = syncword
+        self.size = len(syncword)
         self.threshold = threshold
         self.syncword_offset = syncword_offset
-
-        self.min_buffer_size = self.syncword_offset + self.correlator.size - 1
-        self.buffer = numpy.zeros(self.min_buffer_size, dtype=complex)
-        self.position = 0
+        self.min_buffer_size = self.syncword_offset + self.size - 1
+
+        # CFAR mode, enabled by a target rate of false candidates per second, raises the threshold
+        # above the fixed one to keep that rate in the current noise and interference
+        assert false_alarm_rate is None or sample_rate is not None, "false_alarm_rate requires sample_rate"
+        self.false_alarm_rate = false_alarm_rate
+        self.sample_rate = sample_rate
+        self.cfar_window = 64 * self.size if cfar_window is None else cfar_window
+        self.cfar_step = max(self.cfar_window // self.CFAR_UPDATES, 1)
+        self.clearNoise()
+
+        # Threshold crossings at most guard samples apart form one peak, peaks closer than min_spacing
+        # to the previous candidate are dropped, both default to the syncword size and 0 disables them
+        self.guard = self.size if guard is None else guard
+        self.min_spacing = self.size if min_spacing is None else min_spacing
+        self.peak = None
+        self.last_sync_position = None
 
         self.streams = []
+
+        # A synchronizer without a shared front end correlates on its own, a shared one is cleared by its owner
+        self.owns_front_end = front_end is None
+        self.front_end = DetectionFrontEnd() if front_end is None else front_end
+        self.front_end.register(self)
     
     def clear(self):
-        self.correlator.clear()
-
-        self.buffer = numpy.zeros(self.min_buffer_size, dtype=complex)
-        self.position = 0
         self.streams = []
+        self.peak = None
+        self.last_sync_position = None
+        self.clearNoise()
+        if self.owns_front_end:
+            self.front_end.clear()
     
-    def trimBuffer(self):
+    def getKeepPosition(self):
+        keep_position = self.front_end.getEnd() - self.min_buffer_size
         if len(self.streams) != 0:
-            index = self.streams[0]["position"] - self.position
-            stream_size = len(self.buffer) - index
-            keep_size = max(stream_size, self.min_buffer_size)
-        else:
-            keep_size = self.min_buffer_size
-        trim_index = len(self.buffer) - keep_size
-        self.buffer = self.buffer[trim_index:]
-        self.position += trim_index
+            keep_position = min(keep_position, self.streams[0]["position"])
+        if self.peak is not None:
+            keep_position = min(keep_position, self.peak["position"] - self.syncword_offset)
+        return keep_position
     
     def feed(self, samples):
-        correlation = self.correlator.correlate(samples)
-        from matplotlib import pyplot
-        #pyplot.plot(numpy.absolute(correlation))
-        #pyplot.show()
-
-        sync_indices = numpy.argwhere(numpy.abs(correlation) > self.threshold)[:, 0]
-        #print(sync_indices)
-        for index in sync_indices:
-            sync_position = self.position + len(self.buffer) + index - (self.correlator.size - 1)
-            start_position = sync_position - self.syncword_offset
-
-            phase_shift = correlation[index] / numpy.abs(correlation[index])
-            self.streams.append({"position": start_position, "phase_shift": phase_shift})
+        # Feeds the front end, which also serves the other synchronizers sharing it
+        self.front_end.feed(samples)
+    
+    def clearNoise(self):
+        # The last cfar_window noise magnitudes as histogram bins in a ring, and their histogram
+        self.noise_bins = numpy.zeros(self.cfar_window, dtype=numpy.uint16)
+        self.noise_histogram = numpy.zeros(self.CFAR_BINS, dtype=numpy.int64)
+        self.noise_count = 0
+        # Magnitudes held back until the next block shows whether a peak follows them
+        self.noise_pending = numpy.zeros(0)
+        self.noise_pending_keep = numpy.zeros(0, dtype=bool)
+        self.noise_pending_position = None
+        self.noise_exclude_end = 0
+        self.cfar_threshold = None
+        self.detection_threshold = self.threshold
+
+    def detect(self, correlation, position, noise=True):
+        # correlation[i] belongs to the window ending at the sample at absolute position + i,
+        # noise tells whether it may contribute to the CFAR noise statistics
+        magnitude = numpy.abs(correlation)
+        if self.false_alarm_rate is not None and noise:
+            self.updateNoise(magnitude, position)
+        sync_indices = numpy.flatnonzero(magnitude > self.detection_threshold)
+        splits = numpy.flatnonzero(numpy.diff(sync_indices) > self.guard) + 1
+
+        for peak_indices in numpy.split(sync_indices, splits) if len(sync_indices) != 0 else []:
+            index = peak_indices[numpy.argmax(magnitude[peak_indices])]
+            peak = {"position": position + index - (self.size - 1), "correlation": correlation[index], "end": position + peak_indices[-1]}
+
+            # A peak may continue from the previous block
+            if self.peak is not None and position + peak_indices[0] - self.peak["end"] <= self.guard:
+                if numpy.abs(peak["correlation"]) <= numpy.abs(self.peak["correlation"]):
+                    peak["position"] = self.peak["position"]
+                    peak["correlation"] = self.peak["correlation"]
+            elif self.peak is not None:
+                self.addStream(self.peak)
+            self.peak = peak
+
+        self.advance(position + len(correlation))
+    
+    def advance(self, position):
+        # There are no further crossings before position, the last peak is complete once guard
+        # samples without a crossing follow it
+        if self.peak is not None and position - 1 - self.peak["end"] >= self.guard:
+            self.addStream(self.peak)
+            self.peak = None
+    
+    def updateNoise(self, magnitude, position):
+        # The threshold is fitted again every cfar_step samples of absolute position, both the noise
+        # window and the threshold then only depend on the samples and not on the block size
+        while len(magnitude) != 0:
+            step_end = (position // self.cfar_step + 1) * self.cfar_step
+            size = min(step_end - position, len(magnitude))
+            self.collectNoise(magnitude[:size], position)
+            if position + size == step_end:
+                self.updateThreshold()
+            magnitude, position = magnitude[size:], position + size
+
+    def collectNoise(self, magnitude, position):
+        # Magnitudes less than size samples away from a threshold crossing belong to a peak, not to the
+        # noise. The last size magnitudes wait for the next block, which may start with a crossing.
+        # Until the first fit the fixed threshold may lie inside the noise, so nothing counts as a peak.
+        keep = numpy.ones(len(magnitude), dtype=bool)
+        if self.noise_pending_position is not None and self.noise_pending_position + len(self.noise_pending) == position:
+            magnitude = numpy.concatenate([self.noise_pending, magnitude])
+            keep = numpy.concatenate([self.noise_pending_keep, keep])
+            position = self.noise_pending_position
+        keep[:max(self.noise_exclude_end - position, 0)] = False
+
+        crossings = numpy.flatnonzero(magnitude > self.detection_threshold) if self.cfar_threshold is not None else []
+        if len(crossings) != 0:
+            peak_edges = numpy.zeros(len(magnitude) + 1, dtype=int)
+            numpy.add.at(peak_edges, numpy.maximum(crossings - (self.size - 1), 0), 1)
+            numpy.add.at(peak_edges, numpy.minimum(crossings + self.size, len(magnitude)), -1)
+            keep &= numpy.cumsum(peak_edges[:-1]) == 0
+            self.noise_exclude_end = max(self.noise_exclude_end, position + crossings[-1] + self.size)
+        # Windows without power have no correlation
+        keep &= magnitude != 0
+
+        split = max(len(magnitude) - self.size, 0)
+        self.noise_pending = magnitude[split:]
+        self.noise_pending_keep = keep[split:]
+        self.noise_pending_position = position + split
+        self.addNoise(magnitude[:split][keep[:split]])
+
+    def addNoise(self, magnitude):
+        bins = numpy.minimum((magnitude[len(magnitude) - self.cfar_window:] * self.CFAR_BINS).astype(int), self.CFAR_BINS - 1)
+        # The first min(noise_count, cfar_window) slots are filled, the ones written to leave the window
+        filled = min(self.noise_count, self.cfar_window)
+        self.noise_count += len(magnitude) - len(bins)
+        slots = (self.noise_count + numpy.arange(len(bins))) % self.cfar_window
+        numpy.subtract.at(self.noise_histogram, self.noise_bins[slots[slots < filled]], 1)
+        numpy.add.at(self.noise_histogram, bins, 1)
+        self.noise_bins[slots] = bins
+        self.noise_count += len(bins)
+
+    def updateThreshold(self):
+        # In white noise the squared normalized correlation follows Beta(1, size - 1), so
+        # P(|c| > t) = (1 - t^2) ^ (size - 1). Colored noise and interference change the exponent,
+        # it is fitted to the CFAR_QUANTILE of the magnitudes in the noise window, which is frequent
+        # enough to be estimated from the window and rare enough to describe the tail.
+        window_size = min(self.noise_count, self.cfar_window)
+        if window_size < min(self.CFAR_MIN_SAMPLES, self.cfar_window):
+            return
+        target = (1 - self.CFAR_QUANTILE) * window_size
+        cumulative = numpy.cumsum(self.noise_histogram)
+        index = numpy.searchsorted(cumulative, target)
+        # Linear interpolation within the bin
+        quantile = (index + (target - cumulative[index] + self.noise_histogram[index]) / self.noise_histogram[index]) / self.CFAR_BINS
+        log_survival = numpy.log1p(-min(quantile, 1 - 1e-9) ** 2)
+
+        exponent = numpy.log(self.CFAR_QUANTILE) / min(log_survival, -numpy.finfo(float).tiny)
+        probability = min(self.false_alarm_rate / self.sample_rate, 1)
+        self.cfar_threshold = numpy.sqrt(max(1 - probability ** (1 / exponent), 0))
+        self.detection_threshold = max(self.threshold, self.cfar_threshold)
+    
+    def addStream(self, peak):
+        if self.last_sync_position is not None and peak["position"] - self.last_sync_position < self.min_spacing:
+            return
+        self.last_sync_position = peak["position"]
 
-        self.buffer = numpy.concatenate([self.buffer, samples])
-        self.trimBuffer()
+        metric = numpy.abs(peak["correlation"])
+        self.streams.append({"position": peak["position"] - self.syncword_offset, "phase_shift": peak["correlation"] / metric, "metric": metric})
     
-    def getBuffer(self):
+    def getSamples(self, start, end):
+        # Phase corrected samples of the current stream, start and end are relative to its position
         stream = self.streams[0]
-        index = stream["position"] - self.position
-        samples = self.buffer[index:] / stream["phase_shift"]
-        return samples
+        samples = self.front_end.history.view(stream["position"] + start, stream["position"] + end)
+        return samples / stream["phase_shift"]
+    
+    def getBuffer(self):
+        return self.getSamples(0, self.getSize())
     
     def getSize(self):
         if len(self.streams) == 0:
             return 0
         else:
-            index = self.streams[0]["position"] - self.position
-            return len(self.buffer) - index
+            return self.front_end.getEnd() - self.streams[0]["position"]
     
     def nextMatch(self):
         self.streams.pop(0)
-        self.trimBuffer()
+        self.front_end.trimBuffer()
 
 
 
@@ -226,7 +621,11 @@ class IqFrequencyDemodulator:
         delta = iq[1:] * iq[:-1].conjugate()
         angle = numpy.arctan2(delta.imag, delta.real)
         angle /= self.sensitivity
+        self.previous_sample = iq[-1]
         return angle
+    
+    def clear(self):
+        self.previous_sample = 0
 
 
 
@@ -269,86 +668,95 @@ def _cubic_interp(interp_buffer, mu):
     return (a0 * interp_buffer[0] + a1 * interp_buffer[1] +
             a2 * interp_buffer[2] + a3 * interp_buffer[3])
 
+# Loop state of GMSKSynchronizer, carried across blocks
+GMSK_SYNC_STATE = numpy.dtype([
+    ("phase", numpy.float64),
+    ("freq", numpy.float64),
+    ("nco", numpy.complex128),
+    ("timing_error", numpy.float64),
+    ("mu", numpy.float64),
+    ("prev_sample", numpy.complex128),
+    ("has_prev_sample", numpy.bool_),
+    ("interp_buffer", numpy.complex128, (4,)),
+    ("n_buffered", numpy.int64),
+])
+
+
+
 @numba.njit(**NUMBA_PARAMS)
-def _synchronize(
-    phase,
-    freq,
-    alpha_freq,
-    beta_freq,
-    interp_buffer,
-    prev_sample,
-    mu,
-    sps,
-    alpha_time,
-    beta_time,
-    timing_error,
-    iq_samples):
-
-    a1 = [1j]
-    a2 = [1j]
-    f_error = [0.0]
-    p_error = [0.0]
-    f_correct = [1j]
-    f_error.pop(0)
-    p_error.pop(0)
-    f_correct.pop(0)
-    a1.pop(0)
-    a2.pop(0)
-
-    synchronized = [1j]
-    synchronized.pop(0)
-    interp_buffer.pop(-1)
-    phase_wrap = 0.0  # Track phase wraps for frequency adjustment
-    
-    for sample in iq_samples:
-        # Frequency correction: mix with NCO
-        corrected = sample * numpy.exp(-1j * phase)
-        a1.append(sample)
-        a2.append(numpy.exp(-1j * phase))
-        f_correct.append(corrected)
-        # Frequency error detection (simplified for GMSK)
-        error_freq = numpy.angle(corrected)  # Assumes real-axis alignment; adjust as needed
-        f_error.append(error_freq)
+def _synchronize(iq_samples, state, alpha_freq, beta_freq, sps, alpha_time, beta_time, output,
+                 diagnostics, f_error, p_error, f_correct, a1, a2):
+    # Stops early when output is full, returns the number of consumed samples, of outputs and of timing errors.
+    # Diagnostics are written at the index of their sample (p_error at the index of the error) only if enabled.
+    s = state[0]
+    buffer = s.interp_buffer
+    n_outputs = 0
+    n_timing_errors = 0
+
+    i = 0
+    while i < len(iq_samples) and n_outputs < len(output):
+        sample = iq_samples[i]
+        # Frequency correction: mix with NCO, kept as a unit phasor exp(-1j * phase)
+        nco = s.nco
+        corrected = sample * nco
+        # Frequency error detection (simplified for GMSK), assumes real-axis alignment
+        error_freq = math.atan2(corrected.imag, corrected.real)
+        if diagnostics:
+            a1[i] = sample
+            a2[i] = nco
+            f_correct[i] = corrected
+            f_error[i] = error_freq
         # Update PLL
-        freq += beta_freq * error_freq
-        phase += freq + alpha_freq * error_freq
-        # Keep phase within [0, 2π)
-        phase %= (2 * numpy.pi)
-        
-        # Timing recovery
-        interp_buffer.append(corrected)
-        if len(interp_buffer) < 4:
-            continue  # Wait for enough samples
-        if len(interp_buffer) == 5:
-            interp_buffer.pop(0)
-        
+        s.freq += beta_freq * error_freq
+        increment = s.freq + alpha_freq * error_freq
+        s.phase = (s.phase + increment) % (2 * numpy.pi)
+        nco *= complex(math.cos(increment), -math.sin(increment))
+        # First order renormalization keeps rounding errors from growing the magnitude
+        s.nco = nco * (1.5 - 0.5 * (nco.real * nco.real + nco.imag * nco.imag))
+        i += 1
+
+        # Timing recovery over the last 4 corrected samples
+        if s.n_buffered < 4:
+            buffer[s.n_buffered] = corrected
+            s.n_buffered += 1
+            if s.n_buffered < 4:
+                continue
+        else:
+            buffer[0] = buffer[1]
+            buffer[1] = buffer[2]
+            buffer[2] = buffer[3]
+            buffer[3] = corrected
+
         # Interpolate at current mu
-        interp_sample = _cubic_interp(interp_buffer, mu)
-        
+        interp_sample = _cubic_interp(buffer, s.mu)
+
         # Gardner Timing Error Detection (works best with SPS=2)
-        if prev_sample is not None:
-            error_timing = numpy.real((interp_sample - prev_sample) * numpy.conj(interp_buffer[2]))
-            p_error.append(error_timing)
+        if s.has_prev_sample:
+            error_timing = ((interp_sample - s.prev_sample) * buffer[2].conjugate()).real
+            if diagnostics:
+                p_error[n_timing_errors] = error_timing
+            n_timing_errors += 1
             # Update timing loop
-            timing_error += beta_time * error_timing
-            mu += (alpha_time * error_timing + timing_error) + (1.0 / sps)
-            mu %= 1.0  # Keep mu within [0,1)
-            
+            s.timing_error += beta_time * error_timing
+            s.mu = (s.mu + (alpha_time * error_timing + s.timing_error) + (1.0 / sps)) % 1.0
+
             # Check if a symbol should be output
-            if mu + (1.0 / sps) >= 1.0:
-                synchronized.append(interp_sample)
-        
-        prev_sample = interp_sample
-    
-    return freq, phase, timing_error, mu, prev_sample, numpy.array(f_error), numpy.array(p_error), numpy.array(f_correct), numpy.array(a1), numpy.array(a2),  numpy.array(synchronized)
+            if s.mu + (1.0 / sps) >= 1.0:
+                output[n_outputs] = interp_sample
+                n_outputs += 1
+
+        s.prev_sample = interp_sample
+        s.has_prev_sample = True
+
+    return i, n_outputs, n_timing_errors
+
+
 
 class GMSKSynchronizer:
     # Generated by DeepSeek
-    def __init__(self, sps, loop_bandwidth_freq=0.05, loop_bandwidth_time=0.05, damping=0.707):
+    def __init__(self, sps, loop_bandwidth_freq=0.05, loop_bandwidth_time=0.05, damping=0.707, diagnostics=False):
         self.sps = sps  # Samples per symbol
         # Frequency recovery (PLL) parameters
-        self.phase = 0.0
-        self.freq = 0.0
         self.damping = damping
         self.loop_bw_freq = loop_bandwidth_freq
         # Compute PLL coefficients (alpha and beta)
@@ -358,33 +766,178 @@ class GMSKSynchronizer:
         self.beta_freq = (4 * theta**2) / delta
         
         # Timing recovery parameters
-        self.mu = 0.0  # Fractional interval [0, 1)
         self.loop_bw_time = loop_bandwidth_time
         theta_time = loop_bandwidth_time / (damping + 1/(4*damping))
         delta_time = (1 + 2*damping*theta_time + theta_time**2)
         self.alpha_time = (4 * damping * theta_time) / delta_time
         self.beta_time = (4 * theta_time**2) / delta_time
-        self.timing_error = 0.0
-        #self.interp_buffer = deque(maxlen=4)  # For cubic interpolation
-        self.interp_buffer = []
-        self.prev_sample = None  # Previous interpolated sample for Gardner TED
-    
+
+        # Without diagnostics, synchronize only allocates the synchronized symbols
+        # and returns None in place of f_error, p_error, f_correct, a1 and a2
+        self.diagnostics = diagnostics
+        self.state = numpy.zeros(1, dtype=GMSK_SYNC_STATE)
+        self.clear()
+
+    def clear(self):
+        self.state[:] = 0
+        self.state["nco"] = 1
+
     def synchronize(self, iq_samples):
-        self.interp_buffer.append(1j)
-        self.freq, self.phase, self.timing_error, self.mu, self.prev_sample, f_error, p_error, f_correct, a1, a2, output = _synchronize(
-            self.phase,
-            self.freq,
-            self.alpha_freq,
-            self.beta_freq,
-            self.interp_buffer,
-            self.prev_sample,
-            self.mu,
-            self.sps,
-            self.alpha_time,
-            self.beta_time,
-            self.timing_error,
-            iq_samples)
-        return f_error, p_error, f_correct, a1, a2, output
+        iq_samples = numpy.asarray(iq_samples, dtype=numpy.complex128)
+        n = len(iq_samples)
+        if self.diagnostics:
+            f_error = numpy.empty(n, dtype=numpy.float32)
+            p_error = numpy.empty(n, dtype=numpy.float32)
+            f_correct = numpy.empty(n, dtype=numpy.complex64)
+            a1 = numpy.empty(n, dtype=numpy.complex64)
+            a2 = numpy.empty(n, dtype=numpy.complex64)
+        else:
+            f_error = p_error = numpy.empty(0, dtype=numpy.float32)
+            f_correct = a1 = a2 = numpy.empty(0, dtype=numpy.complex64)
+
+        # Symbols come out about every sps samples, the output only grows if the timing loop runs fast
+        output = numpy.empty(n // max(int(self.sps), 1) + 2, dtype=numpy.complex64)
+        consumed = n_outputs = n_timing_errors = 0
+        while True:
+            block_consumed, block_outputs, block_timing_errors = _synchronize(
+                iq_samples[consumed:], self.state, self.alpha_freq, self.beta_freq, self.sps, self.alpha_time, self.beta_time,
+                output[n_outputs:], self.diagnostics, f_error[consumed:], p_error[n_timing_errors:],
+                f_correct[consumed:], a1[consumed:], a2[consumed:])
+            consumed += block_consumed
+            n_outputs += block_outputs
+            n_timing_errors += block_timing_errors
+            if consumed == n:
+                break
+            output = numpy.concatenate([output, numpy.empty(len(output), dtype=numpy.complex64)])
+
+        output = output[:n_outputs]
+        if not self.diagnostics:
+            return None, None, None, None, None, output
+        return f_error, p_error[:n_timing_errors], f_correct, a1, a2, output
+
+    @property
+    def phase(self):
+        return self.state["phase"][0]
+
+    @property
+    def freq(self):
+        return self.state["freq"][0]
+
+    @property
+    def mu(self):
+        return self.state["mu"][0]
+
+    @property
+    def timing_error(self):
+        return self.state["timing_error"][0]
+
+
+
+class RationalResampler:
+
+    def __init__(self, interpolation, decimation, taps=None, passband=0.8, stopband=1.0, attenuation=60):
+        # Streaming upfirdn: resamples by interpolation / decimation with a polyphase FIR, filter state is carried
+        # across blocks. Without taps, a Kaiser window lowpass is designed with band edges given as fractions of the
+        # lower Nyquist frequency of input and output, a stopband above 1 lets aliases fall into a band that a
+        # later stage removes.
+        divisor = math.gcd(interpolation, decimation)
+        self.interpolation = interpolation // divisor
+        self.decimation = decimation // divisor
+
+        if taps is None:
+            nyquist = 1 / max(self.interpolation, self.decimation)
+            numtaps, beta = signal.kaiserord(attenuation, (stopband - passband) * nyquist)
+            cutoff = min((passband + stopband) / 2 * nyquist, 1 - 1e-6)
+            taps = signal.firwin(numtaps, cutoff, window=("kaiser", beta)) * self.interpolation
+        self.taps = numpy.asarray(taps)
+
+        # Row p holds the taps of phase p, reversed to run over input samples in ascending order
+        n_phase_taps = -(-len(self.taps) // self.interpolation)
+        padded = numpy.zeros(n_phase_taps * self.interpolation, dtype=self.taps.dtype)
+        padded[:len(self.taps)] = self.taps
+        self.filter_bank = numpy.ascontiguousarray(padded.reshape(n_phase_taps, self.interpolation).T[:, ::-1])
+        self.n_phase_taps = n_phase_taps
+
+        self.clear()
+
+    def clear(self):
+        self.history = numpy.zeros(self.n_phase_taps - 1, dtype=self.taps.dtype)
+        # Index of the next output and number of consumed inputs, both relative to the same reference
+        self.output_index = 0
+        self.input_index = 0
+
+    def resample(self, samples):
+        samples = numpy.asarray(samples)
+        extended = numpy.concatenate([self.history, samples])
+        windows = numpy.lib.stride_tricks.sliding_window_view(extended, self.n_phase_taps)
+
+        # Output m filters the window ending at input (m * D) // I with phase (m * D) % I
+        input_end = self.input_index + len(samples)
+        output_end = -(-input_end * self.interpolation // self.decimation)
+        output = numpy.empty(output_end - self.output_index, dtype=numpy.result_type(samples, self.taps))
+
+        # Outputs that are I apart share their phase and are D inputs apart
+        for residue in range(min(self.interpolation, len(output))):
+            position = (self.output_index + residue) * self.decimation
+            first_window = position // self.interpolation - self.input_index
+            phase = position % self.interpolation
+            output[residue::self.interpolation] = windows[first_window::self.decimation][:len(output[residue::self.interpolation])] @ self.filter_bank[phase]
+
+        self.history = extended[len(extended) - len(self.history):]
+        # Keep indices small, shifting by I outputs shifts by D inputs
+        shift = output_end // self.interpolation
+        self.output_index = output_end - shift * self.interpolation
+        self.input_index = input_end - shift * self.decimation
+        return output
+
+
+
+class SampleRateConverter:
+
+    def __init__(self, input_rate, output_rate, passband=0.8, attenuation=60, max_denominator=1000):
+        # Converts to output_rate, approximated as a ratio with denominators up to max_denominator. Decimation
+        # factors are split off into integer decimating stages as long as a later stage still decimates, each only
+        # protects the passband of the final output, so early stages at high rates get short filters.
+        ratio = Fraction(output_rate / input_rate).limit_denominator(max_denominator)
+        interpolation, decimation = ratio.numerator, ratio.denominator
+        self.input_rate = input_rate
+        self.output_rate = input_rate * interpolation / decimation
+        passband_edge = passband * min(self.output_rate, input_rate) / 2
+
+        self.stages = []
+        rate = input_rate
+        for factor in self.primeFactors(decimation):
+            if decimation // factor <= interpolation:
+                break
+            rate /= factor
+            decimation //= factor
+            nyquist = rate / 2
+            self.stages.append(RationalResampler(1, factor, passband=passband_edge / nyquist,
+                                                 stopband=(rate - passband_edge) / nyquist, attenuation=attenuation))
+        if interpolation != 1 or decimation != 1:
+            self.stages.append(RationalResampler(interpolation, decimation, passband=passband, attenuation=attenuation))
+
+    @staticmethod
+    def primeFactors(n):
+        factors = []
+        factor = 2
+        while factor * factor <= n:
+            while n % factor == 0:
+                factors.append(factor)
+                n //= factor
+            factor += 1
+        if n > 1:
+            factors.append(n)
+        return factors
+
+    def resample(self, samples):
+        for stage in self.stages:
+            samples = stage.resample(samples)
+        return samples
+
+    def clear(self):
+        for stage in self.stages:
+            stage.clear()
 
 
 
@@ -495,4 +1048,57 @@ def constructLaurentPulses(phi, L, h, SPS):
 def constructLaurentPulsesGmsk(BT, L, SPS):
     tx_pulse = GmskModulator(BT, L, SPS).modulate(numpy.ones(1), True)
     phi = numpy.unwrap(numpy.angle(tx_pulse))
-    return constructLaurentPulses(phi, L, 1 / 2, SPS)
\ No newline at end of file
+    return constructLaurentPulses(phi, L, 1 / 2, SPS)
+
+
+
+class GmskSymbolSampler:
+
+    def __init__(self, bandwidth_time_product, kernel_span, samples_per_symbol, averaging=0.002):
+        # Turns GMSK at samples_per_symbol into one complex sample per symbol that approximates MSK at 1 SPS:
+        # matched filter for the main Laurent pulse C0, then the sampling phase that maximizes |sum (-1)^k y_k^2|,
+        # the alternating real/imaginary structure of the Laurent symbols, averaged over about 1 / averaging symbols
+        self.sps = samples_per_symbol
+        pulse = constructLaurentPulsesGmsk(bandwidth_time_product, kernel_span, samples_per_symbol)[0]
+        self.taps = pulse[::-1] / numpy.sum(pulse ** 2)
+        self.decay = 1 - averaging
+        self.clear()
+
+    def clear(self):
+        self.history = numpy.zeros(len(self.taps) - 1, dtype=numpy.complex128)
+        # Last symbol period of filtered samples, the next symbol may move back into it
+        self.tail = numpy.zeros(self.sps, dtype=numpy.complex128)
+        # Absolute indices of the first filtered sample of the next block and of the next symbol
+        self.position = 0
+        self.next_symbol = 0
+        self.timing_metric = numpy.zeros(self.sps, dtype=numpy.complex128)
+        self.phase = 0
+
+    def getPhase(self):
+        return self.phase
+
+    def sample(self, samples):
+        samples = numpy.asarray(samples, dtype=numpy.complex128)
+        if len(samples) == 0:
+            return numpy.zeros(0, dtype=numpy.complex128)
+        extended = numpy.concatenate([self.history, samples])
+        filtered = numpy.convolve(extended, self.taps, "valid")
+        self.history = extended[len(extended) - len(self.history):]
+
+        # Timing metric of every phase, the sign alternates with the absolute symbol index
+        n = numpy.arange(self.position, self.position + len(filtered))
+        squared = numpy.where(n // self.sps % 2 == 0, 1, -1) * filtered ** 2
+        phases = n % self.sps
+        block_metric = numpy.bincount(phases, squared.real, self.sps) + 1j * numpy.bincount(phases, squared.imag, self.sps)
+        self.timing_metric = self.timing_metric * self.decay ** (len(filtered) / self.sps) + block_metric
+        self.phase = int(numpy.argmax(numpy.abs(self.timing_metric)))
+
+        # Move the next symbol to the best phase by at most half a symbol, so that no symbol is skipped or repeated
+        self.next_symbol += (self.phase - self.next_symbol + self.sps // 2) % self.sps - self.sps // 2
+
+        combined = numpy.concatenate([self.tail, filtered])
+        symbols = combined[self.next_symbol - (self.position - self.sps)::self.sps]
+        self.next_symbol += len(symbols) * self.sps
+        self.tail = combined[-self.sps:]
+        self.position += len(filtered)
+        return symbols
@@ -2,7 +2,14 @@ import bitstring
 import numpy
 import numpy.typing
 
-from pyomslpwan.lib.convolution import convolve, deconvolve, softViterbiDecode, generateEmissionTable
+from pyomslpwan.lib.convolution import convolve, convolutionalEncode, convolutionalEncodeBytes, softViterbiDecode, softViterbiDecodeBatch, quantizedViterbiDecode, quantizedViterbiDecodeBatch, generateEmissionTable
+from pyomslpwan.lib.crc import generateBitTable, generateByteTable, crcRemainders, remaindersToBits
+from pyomslpwan.lib.trellis import getTrellis
+
+
+
+# Codewords that fail the CRC check are corrected against a table of all codewords up to this many data bits
+MAX_CRC_CODEBOOK_DATA_SIZE = 12
 
 
 
@@ -21,30 +28,56 @@ def binaryToNrz(data):
 def nrzToBinary(data):
     return data > 0
 
+def nrzToQuantized(data, n_bits):
+    # Scales each codeword (last two axes) so that twice its mean amplitude saturates
+    max_level = 2 ** (n_bits - 1) - 1
+    amplitude = numpy.mean(numpy.abs(data), axis=(-2, -1), keepdims=True)
+    scale = max_level / (2 * numpy.maximum(amplitude, numpy.finfo(numpy.float32).tiny))
+    return numpy.clip(numpy.rint(data * scale), -max_level, max_level).astype(numpy.int8)
+
 
 
 class ConvolutionalCodec:
 
-    def __init__(self, constraint_length, polynomials, recursive_polynomial=None, use_lookup_table=True):
+    def __init__(self, constraint_length, polynomials, recursive_polynomial=None, use_lookup_table=True, traceback_depth=0, quantization_bits=0):
         
         self.constraint_length = constraint_length
         self.polynomials = numpy.array(polynomials, dtype=numpy.uint32)
         self.recursive_polynomial = recursive_polynomial
+        # 0 traces back the whole codeword, otherwise survivor memory is bounded to twice the depth
+        self.traceback_depth = traceback_depth
+        # 0 decodes in floating point, otherwise soft values are quantized to 3 to 8 bits
+        assert quantization_bits == 0 or 3 <= quantization_bits <= 8
+        self.quantization_bits = quantization_bits
+
+        # Read-only tables shared by every codec with the same code
+        trellis = getTrellis(self.constraint_length, self.polynomials, self.recursive_polynomial)
+        self.next_states = trellis.next_states
+        self.output_patterns = trellis.output_patterns
+        self.byte_next_states = trellis.byte_next_states
+        self.byte_outputs = trellis.byte_outputs
 
         if use_lookup_table:
-            self.emission_table = generateEmissionTable(self.constraint_length, self.polynomials)
+            self.emission_table = trellis.emission_table
         else:
             self.emission_table = None
+        # Emission tables restricted to the generators that were received, see decodeSubStreams
+        self.sub_emission_tables = {}
+
+    def getEmissionTable(self):
+        if self.emission_table is None:
+            return generateEmissionTable(self.constraint_length, self.polynomials)
+        return self.emission_table
 
     def encode(self, data, initial_state=0, final_state=0):
         data = data.astype(numpy.bool_)
 
-        if self.recursive_polynomial is not None:
-            data = deconvolve(data, self.constraint_length, self.recursive_polynomial, 0)
-
-        emissions = [convolve(data, self.constraint_length, poly, initial_state, final_state) for poly in self.polynomials]
+        if self.byte_next_states is None:
+            emissions = convolutionalEncode(data, self.constraint_length, self.polynomials, self.next_states, self.output_patterns, initial_state, final_state)
+        else:
+            emissions = convolutionalEncodeBytes(data, self.constraint_length, self.polynomials, self.next_states, self.output_patterns, self.byte_next_states, self.byte_outputs, initial_state, final_state)
 
-        return emissions
+        return list(emissions)
     
     def decode(self, observed_emissions, initial_state=0, final_state=0, soft=False):
         observed_emissions = numpy.stack(observed_emissions, axis=0).astype(numpy.float32)
@@ -52,40 +85,148 @@ class ConvolutionalCodec:
         if not soft:
             observed_emissions = binaryToNrz(observed_emissions)
         
-        if self.emission_table is None:
-            data = softViterbiDecode(observed_emissions, self.constraint_length, initial_state, final_state, polynomials=self.polynomials)
+        return self.decodeNrz(observed_emissions, self.emission_table, initial_state, final_state)
+
+    def decodeSubStreams(self, sub_streams, emission_size, initial_state=0, final_state=0, soft=False):
+        # sub_streams is a list of (emission_index, positions, values), where positions (a slice or
+        # an index array) tell where the received values belong in the emission stream. Emissions
+        # without any sub-stream are left out of the trellis, overlapping values are averaged.
+        emission_indices = sorted({emission_index for emission_index, _, _ in sub_streams})
+        rows = {emission_index: row for row, emission_index in enumerate(emission_indices)}
+
+        observed_emissions = numpy.zeros((len(emission_indices), emission_size), dtype=numpy.float32)
+        counts = numpy.zeros((len(emission_indices), emission_size), dtype=numpy.uint8)
+
+        for emission_index, positions, values in sub_streams:
+            values = numpy.asarray(values, dtype=numpy.float32)
+            if not soft:
+                values = binaryToNrz(values)
+            observed_emissions[rows[emission_index], positions] += values
+            counts[rows[emission_index], positions] += 1
+
+        numpy.divide(observed_emissions, counts, where=counts > 1, out=observed_emissions)
+
+        key = tuple(emission_indices)
+        if key not in self.sub_emission_tables:
+            self.sub_emission_tables[key] = numpy.ascontiguousarray(self.getEmissionTable()[emission_indices])
+
+        return self.decodeNrz(observed_emissions, self.sub_emission_tables[key], initial_state, final_state)
+
+    def decodeNrz(self, observed_emissions, emission_table, initial_state, final_state):
+        if self.quantization_bits:
+            data = quantizedViterbiDecode(nrzToQuantized(observed_emissions, self.quantization_bits), self.constraint_length, initial_state, final_state, self.getEmissionTable() if emission_table is None else emission_table, self.traceback_depth)
+        elif emission_table is None:
+            data = softViterbiDecode(observed_emissions, self.constraint_length, initial_state, final_state, polynomials=self.polynomials, traceback_depth=self.traceback_depth)
         else:
-            data = softViterbiDecode(observed_emissions, self.constraint_length, initial_state, final_state, emission_table=self.emission_table)
+            data = softViterbiDecode(observed_emissions, self.constraint_length, initial_state, final_state, emission_table=emission_table, traceback_depth=self.traceback_depth)
 
         if self.recursive_polynomial is not None:
             data = convolve(data, self.constraint_length, self.recursive_polynomial, 0, 0)[:-self.constraint_length + 1]
 
         return data
 
+    def decodeBatch(self, observed_emissions, initial_state=0, final_state=0, soft=False, erasures=None):
+        # observed_emissions has shape (batch, n_emissions, length), erasures is a
+        # boolean mask broadcastable to it that is True where a symbol was not received
+        observed_emissions = numpy.asarray(observed_emissions, dtype=numpy.float32)
+
+        if not soft:
+            observed_emissions = binaryToNrz(observed_emissions)
+        
+        if erasures is not None:
+            observed_emissions = numpy.where(erasures, numpy.float32(0), observed_emissions)
+
+        if self.quantization_bits:
+            data = quantizedViterbiDecodeBatch(nrzToQuantized(observed_emissions, self.quantization_bits), self.constraint_length, initial_state, final_state, self.getEmissionTable(), self.traceback_depth)
+        else:
+            data = softViterbiDecodeBatch(observed_emissions, self.constraint_length, initial_state, final_state, self.getEmissionTable(), self.traceback_depth)
+
+        if self.recursive_polynomial is not None:
+            data = numpy.stack([convolve(row, self.constraint_length, self.recursive_polynomial, 0, 0)[:-self.constraint_length + 1] for row in data])
+
+        return data
+
 
 
 class CrcCodec:
 
     def __init__(self, crc_length, polynomial, use_lookup_table=True):
         self.crc_length = crc_length
-        self.codec = ConvolutionalCodec(crc_length + 1, [polynomial], recursive_polynomial=polynomial, use_lookup_table=use_lookup_table)
+        self.polynomial = polynomial
+        self.use_lookup_table = use_lookup_table
+        self.bit_table = generateBitTable(crc_length, polynomial)
+        self.byte_table = generateByteTable(crc_length, polynomial)
+        # The trellis has 2^crc_length states, it is only built once a long codeword fails the check
+        self._codec = None
+        # (data bits, NRZ codewords) of every message, by data size
+        self.codebooks = {}
+
+    @property
+    def codec(self):
+        if self._codec is None:
+            self._codec = ConvolutionalCodec(self.crc_length + 1, [self.polynomial], recursive_polynomial=self.polynomial, use_lookup_table=self.use_lookup_table)
+        return self._codec
+
+    def getCodebook(self, data_size):
+        if data_size not in self.codebooks:
+            shifts = numpy.arange(data_size - 1, -1, -1)
+            messages = ((numpy.arange(2 ** data_size)[:, numpy.newaxis] >> shifts) & 0b1).astype(numpy.bool_)
+            self.codebooks[data_size] = messages, binaryToNrz(self.encode(messages)).astype(numpy.float32)
+        return self.codebooks[data_size]
     
+    def remainder(self, data):
+        # Accepts a single bitstream or a (batch, size) array of bitstreams
+        data = numpy.asarray(data).astype(numpy.bool_)
+        remainders = crcRemainders(numpy.atleast_2d(data), self.crc_length, self.bit_table, self.byte_table)
+        if data.ndim == 1:
+            return remainders[0]
+        return remainders
+
     def encode(self, data):
-        encoded = self.codec.encode(data)[0]
+        data = numpy.asarray(data).astype(numpy.bool_)
+        encoded = numpy.concatenate([data, self.parity(data)], axis=-1)
         return encoded
     
     def parity(self, data):
-        encoded = self.encode(data)
-        parity = encoded[-self.crc_length:]
+        data = numpy.asarray(data).astype(numpy.bool_)
+        remainders = crcRemainders(numpy.atleast_2d(data), self.crc_length, self.bit_table, self.byte_table)
+        parity = remaindersToBits(remainders, self.crc_length)
+        if data.ndim == 1:
+            return parity[0]
         return parity
     
     def decode(self, encoded, soft=False):
-        data = self.codec.decode([encoded], soft=soft)
+        # Accepts a single codeword or a (batch, size) array of codewords. A hard decision that is
+        # already a codeword is also the most likely one, only the other codewords run the decoder.
+        encoded = numpy.asarray(encoded)
+        hard = nrzToBinary(encoded) if soft else encoded.astype(numpy.bool_)
+        if encoded.ndim == 1:
+            if self.check(hard):
+                return hard[:-self.crc_length]
+            return self.correct(encoded[numpy.newaxis], soft)[0]
+
+        data = hard[:, :-self.crc_length].copy()
+        failing = ~self.check(hard)
+        if failing.any():
+            data[failing] = self.correct(encoded[failing], soft)
         return data
+
+    def correct(self, encoded, soft=False):
+        # Most likely messages of a (batch, size) array of codewords. Short messages are found by
+        # correlating with every codeword, which is as exact as the Viterbi decoder but much faster.
+        data_size = encoded.shape[1] - self.crc_length
+        if data_size > MAX_CRC_CODEBOOK_DATA_SIZE:
+            return self.codec.decodeBatch(encoded[:, numpy.newaxis, :], soft=soft)
+
+        nrz = numpy.asarray(encoded, dtype=numpy.float32)
+        if not soft:
+            nrz = binaryToNrz(nrz)
+        messages, codebook = self.getCodebook(data_size)
+        return messages[(nrz @ codebook.T).argmax(axis=1)]
     
     def check(self, encoded):
-        parity = self.parity(encoded)
-        return (parity == 0).all()
+        remainders = self.remainder(encoded)
+        return remainders == 0
 
 
 
@@ -99,6 +240,11 @@ class Puncturer:
         punctured = data[pattern][:punctured_length]
         return punctured
 
+    def positions(self, punctured_length, depunctured_length):
+        # Indices of the punctured values in the depunctured stream
+        puncture_mask = numpy.resize(self.bitmask, depunctured_length)
+        return numpy.flatnonzero(puncture_mask)[:punctured_length]
+
     def depuncture(self, data, depunctured_length, placeholder_value=0):
         depunctured = numpy.full(depunctured_length, placeholder_value, dtype=data.dtype)
         puncture_mask = numpy.resize(self.bitmask, depunctured_length)
@@ -112,16 +258,19 @@ class Scrambler:
     def __init__(self, index_multiplier):
         self.index_multiplier = index_multiplier
     
+    def permutation(self, size):
+        # Position of each data value in the interleaved stream
+        data_index = numpy.arange(size, dtype=numpy.uint32)
+        return (self.index_multiplier * data_index) % size
+
     def scramble(self, data):
-        data_index = numpy.arange(len(data), dtype=numpy.uint32)
-        interleaved_index = (self.index_multiplier * data_index) % len(data)
+        interleaved_index = self.permutation(len(data))
         interleaved = numpy.empty_like(data)
         interleaved[interleaved_index] = data
         return interleaved
     
     def unscramble(self, interleaved):
-        data_index = numpy.arange(len(interleaved), dtype=numpy.uint32)
-        interleaved_index = (self.index_multiplier * data_index) % len(interleaved)
+        interleaved_index = self.permutation(len(interleaved))
         data = interleaved[interleaved_index]
         return data
 
@@ -5,6 +5,16 @@ import numba
 
 
 NUMBA_PARAMS = dict(cache=True)
+NUMBA_PARALLEL_PARAMS = dict(cache=True, parallel=True)
+
+# Quantized path metrics are int16, renormalized often enough that up to 8 emissions
+# of 8-bit soft values can not overflow between renormalizations. All int16 arithmetic
+# goes through int16 arrays, so the metric loops vectorize at full int16 width.
+QUANTIZED_PATH_METRIC_FLOOR = numpy.int16(-2 ** 14)
+RENORMALIZATION_INTERVAL = 16
+
+# Moves bit 0 of byte i to bit 56 + i
+DECISION_PACKING_MULTIPLIER = numpy.uint64(0x0102040810204080)
 
 
 
@@ -84,78 +94,537 @@ def deconvolve(convoluted: numpy.typing.NDArray[numpy.bool_],
 
 
 
-# locals=dict(expected_emission_1=numba.bool_, expected_emission_2=numba.bool_)
+@numba.njit(**NUMBA_PARAMS)
+def generateEncoderTable(constraint_length: int,
+                         polynomials: numpy.typing.NDArray[numpy.uint32],
+                         recursive_polynomial: int
+                         ) -> tuple[numpy.typing.NDArray[numpy.uint32], numpy.typing.NDArray[numpy.uint32]]:
+
+    # Indexed by (state << 1) | data_bit, where the state holds the previous constraint_length - 1
+    # register bits. The register bit is fed back through the recursive polynomial unless it is 0.
+    # Outputs of all polynomials are packed into one pattern, polynomial i in bit i.
+    n_states = 2 ** (constraint_length - 1)
+    n_emissions = len(polynomials)
+
+    next_states = numpy.empty(n_states * 2, dtype=numpy.uint32)
+    output_patterns = numpy.zeros(n_states * 2, dtype=numpy.uint32)
+
+    for state in range(n_states):
+        for data_bit in range(2):
+            register_bit = data_bit
+            if recursive_polynomial != 0:
+                register_bit = dotProduct(state | (data_bit << (constraint_length - 1)), recursive_polynomial, constraint_length)
+            register = state | (register_bit << (constraint_length - 1))
+
+            index = (state << 1) | data_bit
+            next_states[index] = register >> 1
+            for emission_index in range(n_emissions):
+                output_patterns[index] |= dotProduct(register, polynomials[emission_index], constraint_length) << emission_index
+
+    return next_states, output_patterns
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def generateByteEncoderTable(next_states: numpy.typing.NDArray[numpy.uint32],
+                             output_patterns: numpy.typing.NDArray[numpy.uint32],
+                             n_emissions: int
+                             ) -> tuple[numpy.typing.NDArray[numpy.uint32], numpy.typing.NDArray[numpy.uint8]]:
+
+    # Indexed by (state << 8) | byte, data and output bytes are MSB first
+    n_states = len(next_states) // 2
+
+    byte_next_states = numpy.empty(n_states * 256, dtype=numpy.uint32)
+    byte_outputs = numpy.zeros((n_states * 256, n_emissions), dtype=numpy.uint8)
+
+    for state in range(n_states):
+        for byte in range(256):
+            index = (state << 8) | byte
+            current_state = state
+            for bit_index in range(8):
+                table_index = (current_state << 1) | ((byte >> (7 - bit_index)) & 0b1)
+                output_pattern = output_patterns[table_index]
+                for emission_index in range(n_emissions):
+                    byte_outputs[index, emission_index] |= ((output_pattern >> emission_index) & 0b1) << (7 - bit_index)
+                current_state = next_states[table_index]
+            byte_next_states[index] = current_state
+
+    return byte_next_states, byte_outputs
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def encodeTail(emissions: numpy.typing.NDArray[numpy.bool_],
+               constraint_length: int,
+               polynomials: numpy.typing.NDArray[numpy.uint32],
+               state: int,
+               final_state: int):
+
+    # Tail bits are shifted into the register directly, bypassing the recursion
+    data_size = emissions.shape[1] - constraint_length + 1
+    input_mask = 0b1 << (constraint_length - 1)
+    tail = final_state
+
+    for tail_index in range(constraint_length - 1):
+        register = state | (tail & input_mask)
+        tail <<= 1
+        for emission_index in range(len(polynomials)):
+            emissions[emission_index, data_size + tail_index] = dotProduct(register, polynomials[emission_index], constraint_length)
+        state = register >> 1
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def convolutionalEncode(data: numpy.typing.NDArray[numpy.bool_],
+                        constraint_length: int,
+                        polynomials: numpy.typing.NDArray[numpy.uint32],
+                        next_states: numpy.typing.NDArray[numpy.uint32],
+                        output_patterns: numpy.typing.NDArray[numpy.uint32],
+                        initial_state: int,
+                        final_state: int
+                        ) -> numpy.typing.NDArray[numpy.bool_]:
+
+    # Emits all polynomials in a single pass over the data, one table lookup per bit
+    data_size = len(data)
+    n_emissions = len(polynomials)
+    emission_size = data_size + constraint_length - 1
+
+    emissions = numpy.empty((n_emissions, emission_size), dtype=numpy.bool_)
+    state = initial_state >> 1
+
+    for data_index in range(data_size):
+        table_index = (state << 1) | data[data_index]
+        output_pattern = output_patterns[table_index]
+        for emission_index in range(n_emissions):
+            emissions[emission_index, data_index] = (output_pattern >> emission_index) & 0b1
+        state = next_states[table_index]
+
+    encodeTail(emissions, constraint_length, polynomials, state, final_state)
+
+    return emissions
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def convolutionalEncodeBytes(data: numpy.typing.NDArray[numpy.bool_],
+                             constraint_length: int,
+                             polynomials: numpy.typing.NDArray[numpy.uint32],
+                             next_states: numpy.typing.NDArray[numpy.uint32],
+                             output_patterns: numpy.typing.NDArray[numpy.uint32],
+                             byte_next_states: numpy.typing.NDArray[numpy.uint32],
+                             byte_outputs: numpy.typing.NDArray[numpy.uint8],
+                             initial_state: int,
+                             final_state: int
+                             ) -> numpy.typing.NDArray[numpy.bool_]:
+
+    # Same as convolutionalEncode, but whole bytes are advanced with one lookup
+    data_size = len(data)
+    n_emissions = len(polynomials)
+    emission_size = data_size + constraint_length - 1
+    n_bytes = data_size // 8
+
+    emissions = numpy.empty((n_emissions, emission_size), dtype=numpy.bool_)
+    state = initial_state >> 1
+
+    for byte_index in range(n_bytes):
+        offset = byte_index * 8
+        byte = 0
+        for bit_index in range(8):
+            byte = (byte << 1) | data[offset + bit_index]
+        table_index = (state << 8) | byte
+        for emission_index in range(n_emissions):
+            output_byte = byte_outputs[table_index, emission_index]
+            for bit_index in range(8):
+                emissions[emission_index, offset + bit_index] = (output_byte >> (7 - bit_index)) & 0b1
+        state = byte_next_states[table_index]
+
+    for data_index in range(n_bytes * 8, data_size):
+        table_index = (state << 1) | data[data_index]
+        output_pattern = output_patterns[table_index]
+        for emission_index in range(n_emissions):
+            emissions[emission_index, data_index] = (output_pattern >> emission_index) & 0b1
+        state = next_states[table_index]
+
+    encodeTail(emissions, constraint_length, polynomials, state, final_state)
+
+    return emissions
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def generateEmissionPatterns(emission_table: numpy.typing.NDArray[numpy.int8]
+                             ) -> numpy.typing.NDArray[numpy.uint32]:
+
+    n_emissions = emission_table.shape[0]
+    n_windows = emission_table.shape[1]
+
+    emission_patterns = numpy.zeros(n_windows, dtype=numpy.uint32)
+
+    for window in range(n_windows):
+        for emission_index in range(n_emissions):
+            if emission_table[emission_index, window] > 0:
+                emission_patterns[window] |= 0b1 << emission_index
+
+    return emission_patterns
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def computeBranchMetrics(observed_emissions: numpy.typing.NDArray[numpy.float32|numpy.int8],
+                         data_index: int,
+                         branch_metrics: numpy.typing.NDArray[numpy.float64|numpy.int16]):
+
+    # Correlation of the observed emissions with every possible emission pattern
+    n_emissions = observed_emissions.shape[0]
+    n_patterns = len(branch_metrics)
+
+    for pattern in range(n_patterns):
+        branch_metric = 0
+        for emission_index in range(n_emissions):
+            if (pattern >> emission_index) & 0b1:
+                branch_metric += observed_emissions[emission_index, data_index]
+            else:
+                branch_metric -= observed_emissions[emission_index, data_index]
+        branch_metrics[pattern] = branch_metric
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def generateEmissionSigns(emission_patterns: numpy.typing.NDArray[numpy.uint32],
+                          n_emissions: int,
+                          emission_signs: numpy.typing.NDArray[numpy.int16]):
+
+    # Sign of every emission for predecessor bit i of every state, at column i * n_states + state
+    n_states = len(emission_patterns) // 2
+
+    for emission_index in range(n_emissions):
+        for state in range(n_states):
+            for predecessor_bit in range(2):
+                pattern = emission_patterns[(state << 1) | predecessor_bit]
+                emission_signs[emission_index, predecessor_bit * n_states + state] = ((pattern >> emission_index) & 0b1) * 2 - 1
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def computeWindowBranchMetrics(observed_emissions: numpy.typing.NDArray[numpy.int8],
+                               data_index: int,
+                               emission_signs: numpy.typing.NDArray[numpy.int16],
+                               branch_metrics: numpy.typing.NDArray[numpy.int16]):
+
+    # Branch metric of every transition, laid out like the emission signs
+    branch_metrics[:] = 0
+    for emission_index in range(observed_emissions.shape[0]):
+        observed = observed_emissions[emission_index, data_index]
+        for column in range(len(branch_metrics)):
+            branch_metrics[column] += emission_signs[emission_index, column] * observed
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def addCompareSelect(path_metrics: numpy.typing.NDArray[numpy.float64],
+                     branch_metrics: numpy.typing.NDArray[numpy.float64],
+                     emission_patterns: numpy.typing.NDArray[numpy.uint32],
+                     next_path_metrics: numpy.typing.NDArray[numpy.float64],
+                     decision_bytes: numpy.typing.NDArray[numpy.uint8]):
+
+    # Both predecessors 2j and 2j + 1 lead to states j (input 0) and j + n_states / 2 (input 1)
+    n_butterflies = len(path_metrics) // 2
+
+    for butterfly in range(n_butterflies):
+        path_metric_1 = path_metrics[butterfly << 1]
+        path_metric_2 = path_metrics[(butterfly << 1) | 0b1]
+
+        for state in (butterfly, butterfly | n_butterflies):
+            window = state << 1
+
+            candidate_metric_1 = path_metric_1 + branch_metrics[emission_patterns[window]]
+            candidate_metric_2 = path_metric_2 + branch_metrics[emission_patterns[window | 0b1]]
+
+            if candidate_metric_1 > candidate_metric_2:
+                next_path_metrics[state] = candidate_metric_1
+                decision_bytes[state] = 0
+            else:
+                next_path_metrics[state] = candidate_metric_2
+                decision_bytes[state] = 1
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def quantizedAddCompareSelect(path_metrics: numpy.typing.NDArray[numpy.int16],
+                              branch_metrics: numpy.typing.NDArray[numpy.int16],
+                              next_path_metrics: numpy.typing.NDArray[numpy.int16],
+                              candidate_metrics: numpy.typing.NDArray[numpy.int16],
+                              decision_bytes: numpy.typing.NDArray[numpy.uint8]):
+
+    # Same as addCompareSelect, split into branchless loops over all states
+    n_states = len(path_metrics)
+    n_butterflies = n_states // 2
+
+    for state in range(n_states):
+        butterfly = state & (n_butterflies - 1)
+        next_path_metrics[state] = path_metrics[butterfly << 1] + branch_metrics[state]
+        candidate_metrics[state] = path_metrics[(butterfly << 1) | 0b1] + branch_metrics[n_states + state]
+
+    for state in range(n_states):
+        decision_bytes[state] = next_path_metrics[state] <= candidate_metrics[state]
+        next_path_metrics[state] = max(next_path_metrics[state], candidate_metrics[state])
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def renormalizePathMetrics(path_metrics: numpy.typing.NDArray[numpy.float64|numpy.int16],
+                           path_metric_floor: float|int):
+
+    # Only differences between path metrics matter, keeps integer metrics in range
+    best_path_metric = path_metrics.max()
+    for state in range(len(path_metrics)):
+        path_metrics[state] = max(path_metrics[state] - best_path_metric, path_metric_floor)
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def getDecision(decisions: numpy.typing.NDArray[numpy.uint64],
+                row: int,
+                state: int
+                ) -> int:
+    
+    word = decisions[row, state >> 6]
+    return int((word >> numpy.uint64(state & 0x3F)) & numpy.uint64(0b1))
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def packDecisions(decision_octets: numpy.typing.NDArray[numpy.uint64],
+                  decisions: numpy.typing.NDArray[numpy.uint64],
+                  row: int):
+
+    # Decision bytes are 0 or 1, eight of them are gathered into the top byte of a
+    # single product, then placed into the word (little endian byte order)
+    for word_index in range(decisions.shape[1]):
+        word = numpy.uint64(0)
+        for octet_index in range(word_index * 8, min(word_index * 8 + 8, len(decision_octets))):
+            octet = (decision_octets[octet_index] * DECISION_PACKING_MULTIPLIER) >> numpy.uint64(56)
+            word |= octet << numpy.uint64(8 * (octet_index & 0b111))
+        decisions[row, word_index] = word
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def traceback(decisions: numpy.typing.NDArray[numpy.uint64],
+              constraint_length: int,
+              state: int,
+              end_index: int,
+              start_index: int,
+              output_end_index: int,
+              data: numpy.typing.NDArray[numpy.bool_]
+              ) -> int:
+    
+    # Follows survivors from end_index down to start_index and outputs
+    # data bits from output_end_index down to start_index
+    ring_size = decisions.shape[0]
+    data_size = len(data)
+    state_mask = 2 ** (constraint_length - 1) - 1
+
+    for data_index in range(end_index, start_index - 1, -1):
+        if data_index <= output_end_index and data_index < data_size:
+            data_bit = state >> (constraint_length - 2)
+            data[data_index] = data_bit
+        state = ((state << 1) | getDecision(decisions, data_index % ring_size, state)) & state_mask
+
+    return state
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def advanceTrellis(observed_emissions: numpy.typing.NDArray[numpy.float32|numpy.int8],
+                   start_index: int,
+                   end_index: int,
+                   emission_patterns: numpy.typing.NDArray[numpy.uint32],
+                   emission_signs: numpy.typing.NDArray[numpy.float64|numpy.int16],
+                   branch_metrics: numpy.typing.NDArray[numpy.float64|numpy.int16],
+                   path_metrics: numpy.typing.NDArray[numpy.float64|numpy.int16],
+                   next_path_metrics: numpy.typing.NDArray[numpy.float64|numpy.int16],
+                   candidate_metrics: numpy.typing.NDArray[numpy.float64|numpy.int16],
+                   decision_bytes: numpy.typing.NDArray[numpy.uint8],
+                   decisions: numpy.typing.NDArray[numpy.uint64],
+                   path_metric_floor: float|int
+                   ) -> tuple[numpy.typing.NDArray[numpy.float64|numpy.int16], numpy.typing.NDArray[numpy.float64|numpy.int16]]:
+
+    ring_size = decisions.shape[0]
+    decision_octets = decision_bytes.view(numpy.uint64)
+
+    # A finite floor means int16 metrics, which take the vectorized path and are renormalized
+    fixed_point = path_metric_floor != -numpy.inf
+
+    for data_index in range(start_index, end_index):
+        if fixed_point:
+            computeWindowBranchMetrics(observed_emissions, data_index, emission_signs, branch_metrics)
+            quantizedAddCompareSelect(path_metrics, branch_metrics, next_path_metrics, candidate_metrics, decision_bytes)
+        else:
+            computeBranchMetrics(observed_emissions, data_index, branch_metrics)
+            addCompareSelect(path_metrics, branch_metrics, emission_patterns, next_path_metrics, decision_bytes)
+
+        packDecisions(decision_octets, decisions, data_index % ring_size)
+
+        path_metrics, next_path_metrics = next_path_metrics, path_metrics
+
+        if fixed_point and (data_index + 1) % RENORMALIZATION_INTERVAL == 0:
+            renormalizePathMetrics(path_metrics, path_metric_floor)
+
+    return path_metrics, next_path_metrics
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def viterbiDecode(observed_emissions: numpy.typing.NDArray[numpy.float32|numpy.int8],
+                  constraint_length: int,
+                  initial_state: int,
+                  final_state: int|None,
+                  emission_patterns: numpy.typing.NDArray[numpy.uint32],
+                  traceback_depth: int =0,
+                  path_metric_floor: float|int =-numpy.inf
+                  ) -> numpy.typing.NDArray[numpy.bool_]:
+
+    n_states = 2 ** (constraint_length - 1)
+    n_words = (n_states + 63) // 64
+    n_emissions = observed_emissions.shape[0]
+    emission_size = observed_emissions.shape[1]
+    data_size = emission_size - constraint_length + 1
+
+    # Survivor decisions are packed one bit per state, in a ring of twice the
+    # traceback depth when decoding with a sliding window
+    sliding_window = 0 < traceback_depth and 2 * traceback_depth < emission_size
+    if sliding_window:
+        ring_size = 2 * traceback_depth
+    else:
+        ring_size = emission_size
+
+    # Metrics take the type of the floor, float64 or int16 for quantized emissions. Float branch
+    # metrics are kept per emission pattern, int16 ones per transition, see generateEmissionSigns.
+    fixed_point = path_metric_floor != -numpy.inf
+    if fixed_point:
+        branch_metrics = numpy.full(2 * n_states, path_metric_floor)
+        emission_signs = numpy.full((n_emissions, 2 * n_states), path_metric_floor)
+        generateEmissionSigns(emission_patterns, n_emissions, emission_signs)
+    else:
+        branch_metrics = numpy.full(2 ** n_emissions, path_metric_floor)
+        emission_signs = numpy.full((0, 0), path_metric_floor)
+
+    decisions = numpy.empty((ring_size, n_words), dtype=numpy.uint64)
+    decision_bytes = numpy.zeros((n_states + 7) // 8 * 8, dtype=numpy.uint8)
+    path_metrics = numpy.full(n_states, path_metric_floor)
+    path_metrics[initial_state] = 0
+    next_path_metrics = numpy.empty_like(path_metrics)
+    candidate_metrics = numpy.empty_like(path_metrics)
+
+    data = numpy.empty(data_size, dtype=numpy.bool_)
+    decoded_index = 0
+    data_index = 0
+
+    # The window is advanced by traceback_depth steps at a time, then the oldest
+    # half of the ring is traced back from the best state and output
+    if sliding_window:
+        for data_index in range(0, emission_size - traceback_depth + 1, traceback_depth):
+            end_index = data_index + traceback_depth
+            path_metrics, next_path_metrics = advanceTrellis(observed_emissions, data_index, end_index, emission_patterns, emission_signs, branch_metrics, path_metrics, next_path_metrics, candidate_metrics, decision_bytes, decisions, path_metric_floor)
+            if end_index >= ring_size:
+                traceback(decisions, constraint_length, path_metrics.argmax(), end_index - 1, end_index - ring_size, end_index - traceback_depth - 1, data)
+                decoded_index = end_index - traceback_depth
+        data_index += traceback_depth
+
+    path_metrics, next_path_metrics = advanceTrellis(observed_emissions, data_index, emission_size, emission_patterns, emission_signs, branch_metrics, path_metrics, next_path_metrics, candidate_metrics, decision_bytes, decisions, path_metric_floor)
+
+    if final_state is not None:
+        state = final_state
+    else:
+        state = path_metrics.argmax()
+
+    traceback(decisions, constraint_length, state, emission_size - 1, decoded_index, emission_size - 1, data)
+
+    return data
+
+
+
 @numba.njit(**NUMBA_PARAMS)
 def softViterbiDecode(observed_emissions: numpy.typing.NDArray[numpy.float32],
                     constraint_length: int,
                     initial_state: int,
                     final_state: int|None,
                     polynomials: numpy.typing.NDArray[numpy.uint]|None =None,
-                    emission_table: numpy.typing.NDArray[numpy.bool_]|None =None,
+                    emission_table: numpy.typing.NDArray[numpy.int8]|None =None,
+                    traceback_depth: int =0
                     ) -> numpy.typing.NDArray[numpy.bool_]:
     
     if polynomials is not None:
-        _polynomials = polynomials
+        _emission_table = generateEmissionTable(constraint_length, polynomials)
     if emission_table is not None:
         _emission_table = emission_table
 
-    n_states = 2 ** (constraint_length - 1)
-    n_emissions = observed_emissions.shape[0]
-    emission_size = observed_emissions.shape[1]
+    emission_patterns = generateEmissionPatterns(_emission_table)
+
+    return viterbiDecode(observed_emissions, constraint_length, initial_state, final_state, emission_patterns, traceback_depth)
+
+
+
+@numba.njit(**NUMBA_PARALLEL_PARAMS)
+def softViterbiDecodeBatch(observed_emissions: numpy.typing.NDArray[numpy.float32],
+                           constraint_length: int,
+                           initial_state: int,
+                           final_state: int|None,
+                           emission_table: numpy.typing.NDArray[numpy.int8],
+                           traceback_depth: int =0
+                           ) -> numpy.typing.NDArray[numpy.bool_]:
+
+    # Decodes a (batch, n_emissions, emission_size) array, one codeword per thread
+    batch_size = observed_emissions.shape[0]
+    emission_size = observed_emissions.shape[2]
     data_size = emission_size - constraint_length + 1
-    state_mask = n_states - 1
 
-    from_states = numpy.empty((emission_size, n_states), dtype=numpy.uint32)
-    path_metrics = numpy.empty((emission_size + 1, n_states))
-    path_metrics[0, :] = numpy.inf
-    path_metrics[0, initial_state] = 0
+    emission_patterns = generateEmissionPatterns(emission_table)
 
-    for data_index in range(emission_size):
-        for state in range(n_states):
-            previous_window_1 = (state << 1)
-            previous_window_2 = previous_window_1 | 0b1
-            previous_state_1 = previous_window_1 & state_mask
-            previous_state_2 = previous_window_2 & state_mask
-            branch_metric_1 = 0
-            branch_metric_2 = 0
+    data = numpy.empty((batch_size, data_size), dtype=numpy.bool_)
 
-            for emission_index in range(n_emissions):
-                if emission_table is not None:
-                    expected_emission_1 = _emission_table[emission_index, previous_window_1]
-                    expected_emission_2 = _emission_table[emission_index, previous_window_2]
-                elif polynomials is not None:
-                    expected_emission_1 = dotProduct(previous_window_1, _polynomials[emission_index], constraint_length) * 2 - 1
-                    expected_emission_2 = dotProduct(previous_window_2, _polynomials[emission_index], constraint_length) * 2 - 1
-
-                #branch_metric_1 += abs(expected_emission_1 - observed_emissions[emission_index, data_index])
-                #branch_metric_2 += abs(expected_emission_2 - observed_emissions[emission_index, data_index])
-                branch_metric_1 += (expected_emission_1 - observed_emissions[emission_index, data_index]) ** 2
-                branch_metric_2 += (expected_emission_2 - observed_emissions[emission_index, data_index]) ** 2
-            
-            branch_metric_1 = branch_metric_1 ** 0.5
-            branch_metric_2 = branch_metric_2 ** 0.5
-
-            path_metric_1 = path_metrics[data_index, previous_state_1] + branch_metric_1
-            path_metric_2 = path_metrics[data_index, previous_state_2] + branch_metric_2
-
-            if path_metric_1 < path_metric_2:
-                path_metrics[data_index + 1, state] = path_metric_1
-                from_states[data_index, state] = previous_state_1
-            else:
-                path_metrics[data_index + 1, state] = path_metric_2
-                from_states[data_index, state] = previous_state_2
+    for batch_index in numba.prange(batch_size):
+        data[batch_index] = viterbiDecode(observed_emissions[batch_index], constraint_length, initial_state, final_state, emission_patterns, traceback_depth)
+
+    return data
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def quantizedViterbiDecode(observed_emissions: numpy.typing.NDArray[numpy.int8],
+                           constraint_length: int,
+                           initial_state: int,
+                           final_state: int|None,
+                           emission_table: numpy.typing.NDArray[numpy.int8],
+                           traceback_depth: int =0
+                           ) -> numpy.typing.NDArray[numpy.bool_]:
     
-    data = numpy.empty(data_size, dtype=numpy.bool_)
-    if final_state is not None:
-        state = final_state
-    else:
-        state = path_metrics[emission_size, :].argmin()
+    emission_patterns = generateEmissionPatterns(emission_table)
 
-    for data_index in range(emission_size - 1, -1, -1):
-        if data_index < data_size:
-            data_bit = state >> (constraint_length - 2)
-            data[data_index] = data_bit
-        state = from_states[data_index, state]
+    return viterbiDecode(observed_emissions, constraint_length, initial_state, final_state, emission_patterns, traceback_depth, QUANTIZED_PATH_METRIC_FLOOR)
+
+
+
+@numba.njit(**NUMBA_PARALLEL_PARAMS)
+def quantizedViterbiDecodeBatch(observed_emissions: numpy.typing.NDArray[numpy.int8],
+                                constraint_length: int,
+                                initial_state: int,
+                                final_state: int|None,
+                                emission_table: numpy.typing.NDArray[numpy.int8],
+                                traceback_depth: int =0
+                                ) -> numpy.typing.NDArray[numpy.bool_]:
+
+    batch_size = observed_emissions.shape[0]
+    emission_size = observed_emissions.shape[2]
+    data_size = emission_size - constraint_length + 1
+
+    emission_patterns = generateEmissionPatterns(emission_table)
+
+    data = numpy.empty((batch_size, data_size), dtype=numpy.bool_)
+
+    for batch_index in numba.prange(batch_size):
+        data[batch_index] = viterbiDecode(observed_emissions[batch_index], constraint_length, initial_state, final_state, emission_patterns, traceback_depth, QUANTIZED_PATH_METRIC_FLOOR)
 
     return data
 
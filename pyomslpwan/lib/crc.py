@@ -0,0 +1,106 @@
+import numpy
+import numpy.typing
+import numba
+
+
+
+NUMBA_PARAMS = dict(cache=True)
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def generateBitTable(crc_length: int,
+                     polynomial: int
+                     ) -> numpy.typing.NDArray[numpy.uint32]:
+
+    mask = (1 << crc_length) - 1
+
+    bit_table = numpy.zeros(2, dtype=numpy.uint32)
+    bit_table[1] = polynomial & mask
+
+    return bit_table
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def generateByteTable(crc_length: int,
+                      polynomial: int
+                      ) -> numpy.typing.NDArray[numpy.uint32]:
+
+    mask = (1 << crc_length) - 1
+    feedback = polynomial & mask
+    top_shift = crc_length - 1
+
+    byte_table = numpy.zeros(256, dtype=numpy.uint32)
+    if crc_length < 8:
+        return byte_table
+
+    for byte in range(256):
+        register = byte << (crc_length - 8)
+        for _ in range(8):
+            top_bit = (register >> top_shift) & 0b1
+            register = (register << 1) & mask
+            if top_bit:
+                register ^= feedback
+        byte_table[byte] = register
+
+    return byte_table
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def crcRemainders(data: numpy.typing.NDArray[numpy.bool_],
+                  crc_length: int,
+                  bit_table: numpy.typing.NDArray[numpy.uint32],
+                  byte_table: numpy.typing.NDArray[numpy.uint32]
+                  ) -> numpy.typing.NDArray[numpy.uint32]:
+
+    n_words = data.shape[0]
+    data_size = data.shape[1]
+    mask = (1 << crc_length) - 1
+    top_shift = crc_length - 1
+
+    if crc_length >= 8:
+        n_bytes = data_size // 8
+    else:
+        n_bytes = 0
+    n_leading_bits = data_size - n_bytes * 8
+
+    remainders = numpy.empty(n_words, dtype=numpy.uint32)
+
+    for word_index in range(n_words):
+        register = 0
+
+        for data_index in range(n_leading_bits):
+            top_bit = (register >> top_shift) & 0b1
+            register = ((register << 1) & mask) ^ bit_table[top_bit ^ data[word_index, data_index]]
+
+        for byte_index in range(n_bytes):
+            byte = 0
+            offset = n_leading_bits + byte_index * 8
+            for bit_index in range(8):
+                byte = (byte << 1) | data[word_index, offset + bit_index]
+            table_index = ((register >> (crc_length - 8)) ^ byte) & 0xFF
+            register = ((register << 8) & mask) ^ byte_table[table_index]
+
+        remainders[word_index] = register
+
+    return remainders
+
+
+
+@numba.njit(**NUMBA_PARAMS)
+def remaindersToBits(remainders: numpy.typing.NDArray[numpy.uint32],
+                     crc_length: int
+                     ) -> numpy.typing.NDArray[numpy.bool_]:
+
+    n_words = len(remainders)
+
+    bits = numpy.empty((n_words, crc_length), dtype=numpy.bool_)
+
+    for word_index in range(n_words):
+        register = remainders[word_index]
+        for bit_index in range(crc_length):
+            bits[word_index, bit_index] = (register >> (crc_length - 1 - bit_index)) & 0b1
+
+    return bits
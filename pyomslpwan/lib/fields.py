@@ -3,6 +3,28 @@ import numpy
 import contextlib
 from typing import Self
 
+from pyomslpwan.lib.bits import uintToBits, bitsToUint, bytesToBits, bitsToBytes
+
+
+
+# Field storage: hard bits hold 0/1, soft values hold NRZ symbols (+1 for a one bit). Unset
+# positions hold 0 in both and are tracked by a separate validity mask.
+HARD_DTYPE = numpy.dtype(numpy.uint8)
+SOFT_DTYPE = numpy.dtype(numpy.float32)
+
+
+
+def convertValues(values, valid, dtype):
+    # Converts stored values to another storage dtype, unset positions stay 0
+    if values.dtype == dtype:
+        return values
+    elif dtype == HARD_DTYPE:
+        return (values > 0).astype(HARD_DTYPE)
+    elif values.dtype == HARD_DTYPE:
+        return (values.astype(dtype) * 2 - 1) * valid
+    else:
+        return values.astype(dtype)
+
 
 
 class Value:
@@ -16,38 +38,72 @@ class Value:
 
 
 class Container(Value):
+
+    # Group whose contiguous buffer backs this container, see FieldGroup.allocate
+    layout = None
     
     def getSize(self) -> int:
         raise NotImplementedError
 
-    def getData(self) -> numpy.ndarray:
+    def getDtype(self) -> numpy.dtype:
+        raise NotImplementedError
+
+    def getData(self, dtype=None, copy=True) -> numpy.ndarray:
+        # Stored values, converted if dtype differs from the storage dtype. With copy=False the
+        # storage itself may be returned, it changes with later writes to this container or to
+        # the layout it is bound to.
+        raise NotImplementedError
+
+    def getValid(self, copy=True) -> numpy.ndarray:
         raise NotImplementedError
     
-    def setData(self, data: numpy.ndarray):
+    def setData(self, data: numpy.ndarray, valid=True):
+        # data is converted from its own dtype, hard bits for HARD_DTYPE and NRZ values otherwise
         raise NotImplementedError
     
     def copyFrom(self, container: Self):
-        self.setData(container.getData())
+        self.setData(container.getData(copy=False), container.getValid(copy=False))
     
     def getBitstream(self) -> numpy.ndarray:
-        data = numpy.nan_to_num(self.getData(), nan=-1)
-        return (data > 0).astype(int)
+        data = self.getData(copy=False)
+        if data.dtype == HARD_DTYPE:
+            return data.astype(numpy.bool_)
+        return data > 0
     
     def setBitstream(self, bitstream: numpy.ndarray):
-        self.setData(bitstream * 2 - 1)
+        bits = numpy.asarray(bitstream)
+        if bits.dtype != numpy.bool_:
+            bits = bits > 0
+        self.setData(bits.view(HARD_DTYPE))
     
-    def getNrzStream(self) -> numpy.ndarray:
-        data = numpy.nan_to_num(self.getData(), nan=0)
-        return data
+    def getNrzStream(self, copy=True) -> numpy.ndarray:
+        return self.getData(SOFT_DTYPE, copy)
     
     def setNrzStream(self, nrz: numpy.ndarray):
-        self.setData(nrz)
+        self.setData(numpy.asarray(nrz, dtype=SOFT_DTYPE))
+    
+    def getUint(self) -> int:
+        return bitsToUint(self.getBitstream())
+    
+    def setUint(self, value: int):
+        self.setBitstream(uintToBits(value, self.getSize()))
+    
+    def getBytes(self) -> bytes:
+        return bitsToBytes(self.getBitstream()).tobytes()
+    
+    def setBytes(self, data: bytes):
+        self.setBitstream(bytesToBits(data))
     
     def getBits(self):
         bitstream = self.getBitstream()
         return bitstring.Bits(bitstream.astype(numpy.bool_))
     
     def setBits(self, bits=None, **kwargs):
+        # Integers and bytes skip bitstring, other initializers are passed to bitstring.Bits
+        if bits is None and kwargs.keys() == {"uint"}:
+            return self.setUint(kwargs["uint"])
+        if bits is None and kwargs.keys() == {"bytes"}:
+            return self.setBytes(kwargs["bytes"])
         if bits is None:
             size = self.getSize()
             if size > 0:
@@ -58,7 +114,10 @@ class Container(Value):
 
 class Field(Container):
 
-    def __init__(self, size=0, bits=None, **kwargs):
+    def __init__(self, size=0, bits=None, dtype=SOFT_DTYPE, **kwargs):
+        # A layout may switch the storage dtype, releasing it restores the default one
+        self.default_dtype = numpy.dtype(dtype)
+        self.dtype = self.default_dtype
         self.setSize(size)
         if (len(kwargs) > 0) or (bits is not None):
             self.setBits(bits, **kwargs)
@@ -67,35 +126,82 @@ class Field(Container):
         return self.size
     
     def setSize(self, size):
+        if self.layout is not None:
+            if size == self.size:
+                self.data[:] = 0
+                self.valid[:] = False
+                return
+            # A resized field no longer fits the buffer of its group
+            self.layout.release()
         self.size = size
-        self.data = numpy.full(self.size, numpy.nan)
+        self.data = numpy.zeros(self.size, dtype=self.dtype)
+        self.valid = numpy.zeros(self.size, dtype=numpy.bool_)
+
+    def getDtype(self):
+        return self.dtype
     
-    def getData(self):
-        return self.data
+    def getData(self, dtype=None, copy=True):
+        if dtype is None or dtype == self.dtype:
+            return self.data.copy() if copy else self.data
+        return convertValues(self.data, self.valid, dtype)
+
+    def getValid(self, copy=True):
+        return self.valid.copy() if copy else self.valid
     
-    def setData(self, data):
-        self.data[:] = data
+    def setData(self, data, valid=True):
+        self.data[:] = data if data.dtype == self.dtype else convertValues(data, valid, self.dtype)
+        self.valid[:] = valid
 
 
 
 class FieldGroup(Container):
 
+    # Views into the buffers of the layout owner, None while fields are stored separately
+    buffer = None
+    valid_buffer = None
+    bound = ()
+
     def __init__(self, fields: list[Container]):
         self.fields: list[Container] = fields
     
     def getSize(self):
+        if self.buffer is not None:
+            return len(self.buffer)
         sizes = [field.getSize() for field in self.fields]
         return sum(sizes)
     
-    def getData(self):
-        data = [field.getData() for field in self.fields]
+    def getDtype(self):
+        if self.buffer is not None:
+            return self.buffer.dtype
+        # Mixed groups are read as soft values
+        dtypes = {field.getDtype() for field in self.fields}
+        return dtypes.pop() if len(dtypes) == 1 else SOFT_DTYPE
+    
+    def getData(self, dtype=None, copy=True):
+        if self.buffer is not None:
+            if dtype is None or dtype == self.buffer.dtype:
+                return self.buffer.copy() if copy else self.buffer
+            return convertValues(self.buffer, self.valid_buffer, dtype)
+        if dtype is None:
+            dtype = self.getDtype()
+        data = [field.getData(dtype, copy=False) for field in self.fields]
         return numpy.concatenate(data)
+
+    def getValid(self, copy=True):
+        if self.valid_buffer is not None:
+            return self.valid_buffer.copy() if copy else self.valid_buffer
+        valid = [field.getValid(copy=False) for field in self.fields]
+        return numpy.concatenate(valid)
     
-    def setData(self, data):
+    def setData(self, data, valid=True):
+        if self.buffer is not None:
+            self.buffer[:] = data if data.dtype == self.buffer.dtype else convertValues(data, valid, self.buffer.dtype)
+            self.valid_buffer[:] = valid
+            return
         pos = 0
         for field in self.fields:
             size = field.getSize()
-            field.setData(data[pos:pos + size])
+            field.setData(data[pos:pos + size], valid if valid is True else valid[pos:pos + size])
             pos += size
     
     def getPosition(self, target_field):
@@ -106,6 +212,76 @@ class FieldGroup(Container):
             else:
                 pos += field.getSize()
     
+    def allocate(self, dtype=None):
+        # Moves the data of all nested fields into one contiguous buffer owned by this group, nested
+        # fields and groups become views into it so reading or writing any of them is copy-free.
+        # All nested fields switch to the given storage dtype, the layout is released as soon as
+        # a nested field changes its size.
+        dtype = self.getDtype() if dtype is None else numpy.dtype(dtype)
+        if self.layout is self and self.buffer.dtype == dtype:
+            return
+        # A group that is a view into a layout is copied out of it
+        buffer = self.getData(dtype)
+        valid_buffer = self.getValid()
+        self.bound = []
+        self.bind(buffer, valid_buffer, self)
+
+    def bind(self, buffer, valid_buffer, owner):
+        if self.layout is not None and self.layout is not owner:
+            self.layout.release()
+        self.buffer = buffer
+        self.valid_buffer = valid_buffer
+        self.layout = owner
+        owner.bound.append(self)
+
+        positions = {}
+        pos = 0
+        for field in self.fields:
+            size = field.getSize()
+            positions.setdefault(id(field), (pos, size))
+            if isinstance(field, FieldGroup):
+                field.bind(buffer[pos:pos + size], valid_buffer[pos:pos + size], owner)
+            else:
+                if field.layout is not None and field.layout is not owner:
+                    field.layout.release()
+                field.data = buffer[pos:pos + size]
+                field.valid = valid_buffer[pos:pos + size]
+                field.dtype = buffer.dtype
+                field.layout = owner
+                owner.bound.append(field)
+            pos += size
+
+        # Groups over consecutive fields, like CodedHeader.fec_systematic, become views as well
+        for name, group in vars(self).items():
+            if name == "layout" or not isinstance(group, FieldGroup) or group.layout is owner:
+                continue
+            spans = [positions.get(id(field)) for field in group.fields]
+            if len(spans) == 0 or None in spans:
+                continue
+            start = spans[0][0]
+            end = start
+            for field_pos, size in spans:
+                if field_pos != end:
+                    break
+                end += size
+            else:
+                group.buffer = buffer[start:end]
+                group.valid_buffer = valid_buffer[start:end]
+                group.layout = owner
+                owner.bound.append(group)
+
+    def release(self):
+        # Nested fields keep their values in their default dtype, groups fall back to concatenating their fields
+        for container in self.bound:
+            container.layout = None
+            if isinstance(container, FieldGroup):
+                container.buffer = None
+                container.valid_buffer = None
+            elif container.dtype != container.default_dtype:
+                container.data = convertValues(container.data, container.valid, container.default_dtype)
+                container.dtype = container.default_dtype
+        self.bound = []
+
     def __setattr__(self, name, value):
             if hasattr(self, "_define_fields") and not name.startswith("__"):
                 self.fields.append(value)
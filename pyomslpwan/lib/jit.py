@@ -0,0 +1,124 @@
+import os
+import time
+import argparse
+import numpy
+import numba
+from numba.core import event
+from numba.core.dispatcher import Dispatcher
+
+from pyomslpwan.lib import convolution, crc, channel, synchronization
+from pyomslpwan.lib.coding import ConvolutionalCodec, CrcCodec, MAX_CRC_CODEBOOK_DATA_SIZE
+from pyomslpwan.lib.trellis import MAX_BYTE_ENCODER_CONSTRAINT_LENGTH
+
+
+
+KERNEL_MODULES = [convolution, crc, channel, synchronization]
+
+
+
+def getKernels():
+    kernels = {}
+    for module in KERNEL_MODULES:
+        for name, value in vars(module).items():
+            if isinstance(value, Dispatcher):
+                kernels[name] = value
+    return kernels
+
+
+
+def setCacheDir(path):
+    # Moves the on-disk cache of compiled kernels, also for worker processes started afterwards.
+    # Kernels that were already compiled in this process stay in memory.
+    os.makedirs(path, exist_ok=True)
+    os.environ["NUMBA_CACHE_DIR"] = path
+    numba.config.CACHE_DIR = path
+
+    for kernel in getKernels().values():
+        kernel.enable_caching()
+
+
+
+def warmupSteps():
+    # Compilation depends only on argument types, so a small code exercises the same
+    # specializations as the OMS LPWAN codes. Kernels are reached through the classes that
+    # call them at runtime, which fix the dtypes (and read-only tables) of their arguments,
+    # and inputs have the dtypes of the receiver: float32 NRZ fields and complex64 samples.
+    codec = ConvolutionalCodec(3, [0b111, 0b101], recursive_polynomial=0b111)
+    quantized_codec = ConvolutionalCodec(3, [0b111, 0b101], recursive_polynomial=0b111, quantization_bits=4)
+    # Registers longer than the byte-wise table limit are encoded bit by bit
+    long_codec = ConvolutionalCodec(MAX_BYTE_ENCODER_CONSTRAINT_LENGTH + 1, [0b1000000011, 0b1111111111], recursive_polynomial=0b1000000011)
+    crc_codec = CrcCodec(8, 0x107)
+
+    data = numpy.zeros(16, dtype=bool)
+    emissions = [numpy.ones(18, dtype=numpy.float32)] * 2
+    batch = numpy.ones((2, 2, 18), dtype=numpy.float32)
+    crc_data = numpy.zeros(9, dtype=bool)
+    # Failing codewords too long for the codebook go through the Viterbi decoder
+    crc_soft = -numpy.ones(MAX_CRC_CODEBOOK_DATA_SIZE + 1 + 8, dtype=numpy.float32)
+    crc_soft[0] = 1
+    samples = numpy.ones(32, dtype=numpy.complex64)
+
+    return [
+        ("ConvolutionalCodec.encode", lambda: codec.encode(data)),
+        ("ConvolutionalCodec.encode (bitwise)", lambda: long_codec.encode(data)),
+        ("ConvolutionalCodec.decode", lambda: codec.decode(emissions, soft=True)),
+        ("ConvolutionalCodec.decodeBatch", lambda: codec.decodeBatch(batch, soft=True)),
+        ("ConvolutionalCodec.decodeSubStreams", lambda: codec.decodeSubStreams([(0, slice(None), emissions[0])], 18, soft=True)),
+        ("ConvolutionalCodec.decode (quantized)", lambda: quantized_codec.decode(emissions, soft=True)),
+        ("ConvolutionalCodec.decodeBatch (quantized)", lambda: quantized_codec.decodeBatch(batch, soft=True)),
+        ("CrcCodec.parity", lambda: crc_codec.parity(crc_data)),
+        ("CrcCodec.decode", lambda: crc_codec.decode(crc_soft, soft=True)),
+        ("SymbolSync.work", lambda: synchronization.SymbolSync(2, 0.1, 1, 1, 0.01).work(samples, numpy.ones(32, dtype=numpy.float32))),
+        ("GMSKSynchronizer.synchronize", lambda: channel.GMSKSynchronizer(2).synchronize(samples)),
+    ]
+
+
+
+def warmup(verbose=False):
+    # Compiles or loads from the cache every kernel used by the codecs and synchronizers,
+    # returns compile time per kernel (excluding nested kernels) and wall time per warm-up step
+    compile_times = {}
+    step_times = {}
+
+    with event.install_recorder("numba:compile") as recorder:
+        for name, step in warmupSteps():
+            start = time.perf_counter()
+            step()
+            step_times[name] = time.perf_counter() - start
+
+    # Time spent compiling numba's own helpers is counted towards the kernel that needed them
+    kernels = getKernels()
+    stack = []
+    for timestamp, compile_event in recorder.buffer:
+        if compile_event.is_start:
+            stack.append([compile_event.data["dispatcher"].py_func.__name__, timestamp, 0.0])
+        else:
+            kernel_name, start, nested_duration = stack.pop()
+            if kernel_name not in kernels:
+                continue
+            duration = timestamp - start
+            compile_times[kernel_name] = compile_times.get(kernel_name, 0.0) + duration - nested_duration
+            if stack:
+                stack[-1][2] += duration
+
+    if verbose:
+        for name, duration in step_times.items():
+            print(f"{name}: {duration:.3f} s")
+        for kernel_name, duration in sorted(compile_times.items(), key=lambda item: -item[1]):
+            print(f"    compiled {kernel_name}: {duration:.3f} s")
+        if not compile_times:
+            print("All kernels were loaded from the cache")
+
+    return compile_times, step_times
+
+
+
+if __name__ == "__main__":
+    # Precompiles all kernels into the cache, e.g. while building a container image
+    parser = argparse.ArgumentParser(description="Compile numba kernels into the on-disk cache")
+    parser.add_argument("--cache-dir", help="cache location, defaults to NUMBA_CACHE_DIR or the package directory")
+    args = parser.parse_args()
+
+    if args.cache_dir is not None:
+        setCacheDir(args.cache_dir)
+    warmup(verbose=True)
@@ -1,10 +1,46 @@
 import numpy
 import math
+import numba
 
 from pyomslpwan.lib.channel import IqFrequencyDemodulator
 
 
 
+NUMBA_PARAMS = dict(cache=True)
+
+# State of SymbolSync carried between blocks: TED inputs and decisions, clock loop and interpolator phase
+SYMBOL_SYNC_STATE = numpy.dtype([
+    ("ted_input", numpy.float64),
+    ("ted_previous_input", numpy.float64),
+    ("ted_decision", numpy.float64),
+    ("ted_previous_decision", numpy.float64),
+    ("ted_error", numpy.float64),
+    ("avg_period", numpy.float64),
+    ("inst_period", numpy.float64),
+    ("clock_phase", numpy.float64),
+    ("phase", numpy.float64),
+    ("phase_n", numpy.int64),
+    ("phase_wrapped", numpy.float64),
+])
+
+# Polyphase interpolator bank of shape (NSTEPS + 1, NTAPS), loaded on first use
+_interpolator_taps = None
+
+
+
+def getInterpolatorTaps():
+    # The bank is read-only and shared by all resamplers of the process
+    global _interpolator_taps
+    if _interpolator_taps is None:
+        from pyomslpwan.lib import interpolator_taps
+        taps = numpy.array(interpolator_taps.taps, dtype=numpy.float32)
+        assert taps.shape == (interpolator_taps.NSTEPS + 1, interpolator_taps.NTAPS)
+        taps.flags.writeable = False
+        _interpolator_taps = taps
+    return _interpolator_taps
+
+
+
 class Slicer:
 
     def decision(self, x):
@@ -94,24 +130,23 @@ class InterpolatingResampler:
         self.phase_n = 0
         self.phase_wrapped = 0
 
-        from interpolator_taps import taps, NTAPS, NSTEPS
-        self.taps = taps
-        self.NTAPS = NTAPS
-        self.NSTEPS = NSTEPS
-
-        self.filters = []
-        for i in range(NSTEPS + 1):
-            t = numpy.array(self.taps[i])
-            self.filters.append(t)
-        
-        self.ntaps = NTAPS
+        self.filter_bank = getInterpolatorTaps()
+        self.NSTEPS = self.filter_bank.shape[0] - 1
+        self.NTAPS = self.filter_bank.shape[1]
+        self.ntaps = self.NTAPS
 
     def interpolate(self, input, mu):
         imu = round(mu * self.NSTEPS)
         # TODO: mu check
-        r = numpy.dot(self.filters[imu], input[:self.NTAPS])
+        r = numpy.dot(self.filter_bank[imu], input[:self.NTAPS])
         return r
 
+    def interpolate_many(self, input, indices, mus):
+        # Output k interpolates input[indices[k]:indices[k] + NTAPS] at mus[k], rounding like interpolate
+        filters = self.filter_bank[numpy.rint(numpy.asarray(mus) * self.NSTEPS).astype(numpy.intp)]
+        windows = input[numpy.asarray(indices)[:, None] + numpy.arange(self.NTAPS)]
+        return numpy.einsum("ij,ij->i", windows, filters)
+
     def next_phase(self, increment):
         phase = self.phase_wrapped + increment
         n = math.floor(phase)
@@ -135,49 +170,103 @@ class InterpolatingResampler:
 
 
 
+@numba.njit(**NUMBA_PARAMS)
+def symbolSync(signal, inputs, filter_bank, state, alpha, beta, min_avg_period, max_avg_period, synced, outputs):
+    # Zero-crossing TED, PI clock loop and polyphase interpolation over one block. Stops when the
+    # next symbol needs samples beyond the block or the outputs are full, returns the number of
+    # outputs and the index of the next symbol, where the following block has to continue.
+    s = state[0]
+    n_steps = filter_bank.shape[0] - 1
+    n_taps = filter_bank.shape[1]
+    offset = n_taps // 2
+
+    ii = 0
+    oo = 0
+    while ii + offset < len(inputs) - n_taps and oo < len(outputs):
+        imu = round(s.phase_wrapped * n_steps)
+        interp_output = 0.0
+        synced_output = 0j
+        for k in range(n_taps):
+            interp_output += filter_bank[imu, k] * inputs[ii + k]
+            synced_output += filter_bank[imu, k] * signal[ii + offset + k]
+        outputs[oo] = interp_output
+        synced[oo] = synced_output
+        oo += 1
+
+        s.ted_previous_input = s.ted_input
+        s.ted_input = interp_output
+        s.ted_previous_decision = s.ted_decision
+        s.ted_decision = 1.0 if interp_output > 0 else -1.0
+        s.ted_error = s.ted_previous_decision * s.ted_input - s.ted_decision * s.ted_previous_input
+
+        s.avg_period = max(min(s.avg_period + beta * s.ted_error, max_avg_period), min_avg_period)
+        s.inst_period = s.avg_period + alpha * s.ted_error
+        if s.inst_period <= 0:
+            s.inst_period = s.avg_period
+        s.clock_phase += s.inst_period
+        s.clock_phase = s.clock_phase % math.copysign(s.avg_period / 2, s.clock_phase)
+
+        s.phase = s.phase_wrapped + s.inst_period
+        s.phase_n = math.floor(s.phase)
+        s.phase_wrapped = s.phase - s.phase_n
+        ii += s.phase_n
+
+    return oo, ii
+
+
+
 class SymbolSync:
 
     def __init__(self, sps, loop_bw, damping_factor, ted_gain, max_deviation):
         self.ted = Ted(Slicer())
         self.clock = Clock(loop_bw, sps + max_deviation, sps - max_deviation, sps, damping_factor, ted_gain)
         self.interp = InterpolatingResampler()
-        self.synced_interp = InterpolatingResampler()
-
-        self.interp.sync_reset(sps)
-        self.synced_interp.sync_reset(sps)
+        self.sps = sps
 
         self.filter_delay = (self.interp.ntaps + 1) / 2
+        self.state = numpy.zeros(1, dtype=SYMBOL_SYNC_STATE)
+        self.clear()
 
     def work(self, signal, input_items):
-        ni = len(input_items) - self.interp.ntaps
-        output_items = []
+        # Blocks of a continuous stream may have any size, samples after the last symbol are kept
+        # for the next call
+        signal = numpy.concatenate([self.signal_tail, signal])
+        input_items = numpy.concatenate([self.input_tail, input_items])
+
         synced = []
-        ii = 0
-        synced_ii = 0
-        oo = 0
+        output_items = []
+        consumed = 0
         while True:
-            interp_output = self.interp.interpolate(input_items[ii:], self.interp.phase_wrapped)
-            output_items.append(interp_output)
-            synced_interp_output = self.synced_interp.interpolate(signal[synced_ii + 4:], self.synced_interp.phase_wrapped)
-            synced.append(synced_interp_output)
-            self.ted.input(interp_output)
-            self.clock.advance_loop(self.ted.error)
-            _, look_ahead_phase_n, _ = self.interp.next_phase(self.clock.inst_period)
-            if ii + 4 + look_ahead_phase_n >= ni:
-                # TODO: revert
+            capacity = len(input_items) - consumed + 1
+            block_synced = numpy.empty(capacity, dtype=numpy.complex128)
+            block_outputs = numpy.empty(capacity)
+            n_outputs, n_consumed = symbolSync(signal[consumed:], input_items[consumed:], self.interp.filter_bank, self.state,
+                                               self.clock.alpha, self.clock.beta, self.clock.min_avg_period, self.clock.max_avg_period,
+                                               block_synced, block_outputs)
+            synced.append(block_synced[:n_outputs])
+            output_items.append(block_outputs[:n_outputs])
+            consumed += n_consumed
+            if n_outputs < capacity:
                 break
-            self.interp.advance_phase(self.clock.inst_period)
-            self.synced_interp.advance_phase(self.clock.inst_period)
-            oo += 1
-            ii += self.interp.phase_n
-            synced_ii += self.synced_interp.phase_n
-        return numpy.array(synced), numpy.array(output_items)
+
+        self.signal_tail = signal[consumed:]
+        self.input_tail = input_items[consumed:]
+        return numpy.concatenate(synced), numpy.concatenate(output_items)
     
     def clear(self):
         self.ted.clear()
         self.clock.clear()
         self.interp.clear()
-        self.synced_interp.clear()
+        self.interp.sync_reset(self.sps)
+
+        self.state[:] = 0
+        self.state["avg_period"] = self.clock.avg_period
+        self.state["inst_period"] = self.clock.inst_period
+        self.state["phase"] = self.interp.phase
+        self.state["phase_n"] = self.interp.phase_n
+        self.state["phase_wrapped"] = self.interp.phase_wrapped
+        self.signal_tail = numpy.zeros(0, dtype=numpy.complex128)
+        self.input_tail = numpy.zeros(0)
 
 
 
@@ -204,6 +293,7 @@ class GfskDemod:
         return demod, synced, synced_demod, data
     
     def clear(self):
+        self.fmdemod.clear()
         self.clock_recovery.clear()
 
 
@@ -0,0 +1,115 @@
+import numpy
+from multiprocessing import shared_memory
+
+from pyomslpwan.lib.convolution import generateEmissionTable, generateEncoderTable, generateByteEncoderTable
+
+
+
+# Byte-wise encoding tables have 256 entries per state, only built for short registers
+MAX_BYTE_ENCODER_CONSTRAINT_LENGTH = 9
+
+# Process-wide tables, keyed by (constraint_length, polynomials, recursive_polynomial)
+_trellis_cache = {}
+# Shared memory blocks backing attached or exported tables, kept open for the process lifetime
+_shared_memory_blocks = []
+_exported_blocks = []
+
+
+
+class Trellis:
+
+    TABLE_NAMES = ["emission_table", "next_states", "output_patterns", "byte_next_states", "byte_outputs"]
+
+    def __init__(self, emission_table, next_states, output_patterns, byte_next_states=None, byte_outputs=None):
+        self.emission_table = emission_table
+        self.next_states = next_states
+        self.output_patterns = output_patterns
+        self.byte_next_states = byte_next_states
+        self.byte_outputs = byte_outputs
+
+        for table in self.getTables().values():
+            table.flags.writeable = False
+
+    @staticmethod
+    def generate(constraint_length, polynomials, recursive_polynomial):
+        emission_table = generateEmissionTable(constraint_length, polynomials)
+        # 0 marks a feedforward encoder, a feedback polynomial always has the input tap set
+        next_states, output_patterns = generateEncoderTable(constraint_length, polynomials, recursive_polynomial)
+
+        if constraint_length <= MAX_BYTE_ENCODER_CONSTRAINT_LENGTH:
+            byte_next_states, byte_outputs = generateByteEncoderTable(next_states, output_patterns, len(polynomials))
+        else:
+            byte_next_states, byte_outputs = None, None
+
+        return Trellis(emission_table, next_states, output_patterns, byte_next_states, byte_outputs)
+
+    def getTables(self):
+        tables = {name: getattr(self, name) for name in Trellis.TABLE_NAMES}
+        return {name: table for name, table in tables.items() if table is not None}
+
+
+
+def trellisKey(constraint_length, polynomials, recursive_polynomial=None):
+    return (int(constraint_length), tuple(int(poly) for poly in polynomials), int(recursive_polynomial or 0))
+
+
+
+def getTrellis(constraint_length, polynomials, recursive_polynomial=None):
+    # Tables are generated once per process and are read-only, so codecs can share them
+    key = trellisKey(constraint_length, polynomials, recursive_polynomial)
+    trellis = _trellis_cache.get(key)
+
+    if trellis is None:
+        polynomials = numpy.array(key[1], dtype=numpy.uint32)
+        trellis = Trellis.generate(key[0], polynomials, key[2])
+        _trellis_cache[key] = trellis
+
+    return trellis
+
+
+
+def shareTrellisCache():
+    # Copies every cached table into one shared memory block and returns a picklable handle
+    # that worker processes pass to attachTrellisCache
+    layout = []
+    size = 0
+    for key, trellis in _trellis_cache.items():
+        for name, table in trellis.getTables().items():
+            size = (size + 7) // 8 * 8
+            layout.append((key, name, table.dtype.str, table.shape, size))
+            size += table.nbytes
+
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    _shared_memory_blocks.append(block)
+    _exported_blocks.append(block)
+
+    for key, name, dtype, shape, offset in layout:
+        table = numpy.ndarray(shape, dtype=dtype, buffer=block.buf, offset=offset)
+        table[...] = getattr(_trellis_cache[key], name)
+
+    return block.name, layout
+
+
+
+def attachTrellisCache(handle):
+    # Maps tables exported by shareTrellisCache into this process without copying, meant for
+    # worker processes started by the exporting one, which share its resource tracker
+    name, layout = handle
+    block = shared_memory.SharedMemory(name=name)
+    _shared_memory_blocks.append(block)
+
+    tables = {}
+    for key, table_name, dtype, shape, offset in layout:
+        tables.setdefault(key, {})[table_name] = numpy.ndarray(shape, dtype=dtype, buffer=block.buf, offset=offset)
+
+    for key, key_tables in tables.items():
+        if key not in _trellis_cache:
+            _trellis_cache[key] = Trellis(**key_tables)
+
+
+
+def releaseTrellisCache():
+    # Removes the shared memory blocks created by this process, mappings stay valid until they are dropped
+    for block in _exported_blocks:
+        block.unlink()
+    _exported_blocks.clear()
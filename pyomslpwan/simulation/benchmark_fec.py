@@ -0,0 +1,152 @@
+import numpy
+import time
+
+
+
+from pyomslpwan.src.uplink.frame import *
+import pyomslpwan.src.structs as structs
+from pyomslpwan.src.channel import *
+from pyomslpwan.simulation.noise import *
+from pyomslpwan.lib.coding import *
+
+
+
+class FecEncodeBenchmark:
+
+    def __init__(self, phy_payload_length):
+        self.fec_codec = CommonFecEncodingScheme().codec
+
+        self.phy_payload_length = phy_payload_length
+
+    def sample(self):
+        data = numpy.random.randint(0, 2, self.phy_payload_length * 8, dtype=bool)
+
+        start = time.perf_counter()
+        self.fec_codec.encode(data)
+        end = time.perf_counter()
+
+        return end - start
+
+    def test(self, n):
+        self.sample() # JIT warm-up
+        return sum([self.sample() for _ in range(n)]) / n
+
+
+
+class FecDecodeBenchmark:
+
+    def __init__(self, eb_n0, phy_payload_length):
+        self.fec_codec = CommonFecEncodingScheme().codec
+
+        self.phy_payload_length = phy_payload_length
+        self.dev = noiseDeviation(eb_n0)
+
+    def sample(self):
+        data = numpy.random.randint(0, 2, self.phy_payload_length * 8, dtype=bool)
+        emissions = [binaryToNrz(coded) + realNoise(self.dev, len(coded)) for coded in self.fec_codec.encode(data)]
+
+        start = time.perf_counter()
+        self.fec_codec.decode(emissions, soft=True)
+        end = time.perf_counter()
+
+        return end - start
+
+    def test(self, n):
+        self.sample() # JIT warm-up
+        return sum([self.sample() for _ in range(n)]) / n
+
+
+
+class PayloadParseBenchmark:
+
+    def __init__(self, eb_n0, phy_payload_length, burst_type):
+        self.fec_codec = CommonFecEncodingScheme()
+        self.interleaver = CommonInterleavingScheme()
+
+        self.burst_type = burst_type
+        self.phy_payload_length = phy_payload_length
+        self.dev = noiseDeviation(eb_n0)
+
+    def sample(self):
+        phy_payload = numpy.random.randint(0, 256, self.phy_payload_length,  dtype=numpy.uint8).tobytes()
+        data = generateCodedPayloadSingleBurst(self.fec_codec, self.interleaver, phy_payload, self.burst_type)
+        data_rx = binaryToNrz(data) + realNoise(self.dev, len(data))
+
+        start = time.perf_counter()
+        parseCodedPayloadSingleBurst(self.fec_codec, self.interleaver, data_rx, self.phy_payload_length, self.burst_type)
+        end = time.perf_counter()
+
+        return end - start
+
+    def test(self, n):
+        self.sample() # JIT warm-up
+        return sum([self.sample() for _ in range(n)]) / n
+
+
+
+class QuantizationLossTest:
+
+    def __init__(self, eb_n0, phy_payload_length, quantization_bits):
+        self.fec_codec = CommonFecEncodingScheme().codec
+        self.quantized_fec_codec = CommonFecEncodingScheme(quantization_bits=quantization_bits).codec
+
+        self.phy_payload_length = phy_payload_length
+        self.dev = noiseDeviation(eb_n0)
+
+    def decode(self, fec_codec, fec_inputs):
+        start = time.perf_counter()
+        datas_rx = fec_codec.decodeBatch(fec_inputs, soft=True)
+        end = time.perf_counter()
+        return datas_rx, end - start
+
+    def test(self, n, repeats=10):
+        datas = numpy.random.randint(0, 2, (n, self.phy_payload_length * 8), dtype=bool)
+        fec_inputs = numpy.array([[binaryToNrz(coded) + realNoise(self.dev, len(coded)) for coded in self.fec_codec.encode(data)] for data in datas])
+
+        self.decode(self.fec_codec, fec_inputs[:1]) # JIT warm-up
+        self.decode(self.quantized_fec_codec, fec_inputs[:1])
+
+        # Both decoders are timed alternately and the fastest run is kept, so that
+        # load changes on the machine affect them equally
+        duration = quantized_duration = numpy.inf
+        for _ in range(repeats):
+            datas_rx, sample_duration = self.decode(self.fec_codec, fec_inputs)
+            duration = min(duration, sample_duration)
+            quantized_datas_rx, sample_duration = self.decode(self.quantized_fec_codec, fec_inputs)
+            quantized_duration = min(quantized_duration, sample_duration)
+
+        ber = numpy.mean(datas ^ datas_rx)
+        quantized_ber = numpy.mean(datas ^ quantized_datas_rx)
+
+        return ber, quantized_ber, duration / n, quantized_duration / n
+
+
+
+def printFecBenchmark(eb_n0, phy_payload_length, n):
+    duration = FecEncodeBenchmark(phy_payload_length).test(n)
+    print(f"Convolutional encode (rate 1/4, {phy_payload_length} bytes): {duration * 1e3:.3f} ms")
+
+    duration = FecDecodeBenchmark(eb_n0, phy_payload_length).test(n)
+    print(f"Viterbi decode (rate 1/4, {phy_payload_length} bytes): {duration * 1e3:.3f} ms")
+
+    for burst_type, name in zip(structs.BURST_TYPES_UPLINK_SINGLE_BURST, ["7/8", "1/2", "1/3"]):
+        duration = PayloadParseBenchmark(eb_n0, phy_payload_length, burst_type).test(n)
+        print(f"Single burst payload parse (FEC rate {name}, {phy_payload_length} bytes): {duration * 1e3:.3f} ms")
+
+
+
+def printQuantizationReport(eb_n0_arr, phy_payload_length, quantization_bits_arr, n):
+    # BER of the fixed-point decoder against the floating-point one on the same noisy codewords
+    print(f"Quantization loss (rate 1/4, {phy_payload_length} bytes, {n} codewords)")
+    print("bits | Eb/N0 [dB] | BER float | BER fixed | float [ms] | fixed [ms] | speedup")
+    for quantization_bits in quantization_bits_arr:
+        for eb_n0 in eb_n0_arr:
+            ber, quantized_ber, duration, quantized_duration = QuantizationLossTest(eb_n0, phy_payload_length, quantization_bits).test(n)
+            print(f"{quantization_bits} | {eb_n0:.1f} | {ber:.2e} | {quantized_ber:.2e} | {duration * 1e3:.3f} | {quantized_duration * 1e3:.3f} | {duration / quantized_duration:.2f}x")
+
+
+
+if __name__ == "__main__":
+    numpy.random.seed(0)
+    printFecBenchmark(0, 255, 50)
+    printQuantizationReport(numpy.linspace(-4, -1, 4), 255, [3, 4, 6, 8], 50)
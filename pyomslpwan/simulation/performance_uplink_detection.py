@@ -18,6 +18,7 @@ class UplinkPositiveDetectionTestSyncword:
 
     def __init__(self, threshold, eb_n0):
         self.crc_codec = CodedLengthCrc()
+        self.coded_length_decoder = CodedLengthDecoder()
         self.precoder = Precoder()
 
         self.modulator = UplinkMskModulator()
@@ -51,7 +52,7 @@ class UplinkPositiveDetectionTestSyncword:
         coded_length_rx = structs.CodedLength()
         coded_length_rx.setNrzStream(self.demodulator.demodulate(cl_signal_rx))
         try:
-            length_data_a_rx = parseCodedLength(self.crc_codec, coded_length_rx)
+            length_data_a_rx = parseCodedLength(self.coded_length_decoder, coded_length_rx)
         except AssertionError:
             return False
         
@@ -68,7 +69,7 @@ class UplinkPositiveDetectionTestSyncword:
 class UplinkNegativeDetectionTestSyncword:
 
     def __init__(self, threshold, eb_n0):
-        self.crc_codec = CodedLengthCrc()
+        self.coded_length_decoder = CodedLengthDecoder()
 
         self.demodulator = UplinkPrecodedMskDemodulator()
         self.correlator = UplinkSyncwordCorrelator()
@@ -94,7 +95,7 @@ class UplinkNegativeDetectionTestSyncword:
             coded_length_rx = structs.CodedLength()
             coded_length_rx.setNrzStream(self.demodulator.demodulate(cl_signal_rx))
             try:
-                parseCodedLength(self.crc_codec, coded_length_rx)
+                parseCodedLength(self.coded_length_decoder, coded_length_rx)
             except AssertionError:
                 continue
             
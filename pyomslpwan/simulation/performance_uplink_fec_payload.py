@@ -109,6 +109,9 @@ class UplinkPayloadFecTestMulti:
 
 
 class UplinkFecTestDirect:
+
+    # Generators that are not received in each configuration, decoded as erasures
+    ERASED_GENERATORS = [[2, 3], [0, 3], [1, 2, 3], [0, 2, 3]]
     
     def __init__(self, eb_n0, size, generator_index):
         self.fec_codec = CommonFecEncodingScheme().codec
@@ -122,66 +125,67 @@ class UplinkFecTestDirect:
         self.generator_index = generator_index
         self.dev = noiseDeviation(eb_n0)
     
-    def sample(self):
+    def transmit(self):
         data = numpy.random.randint(0, 2, self.size, dtype=bool)
         fec_input = []
 
-        if self.generator_index < 4:
-            codeds = self.fec_codec.encode(data)
-
-            for coded in codeds:
-                self.modulator.clear()
-                self.demodulator.clear()
-
-                interleaved = self.interleaver.interleave(coded)
-
-                bitstream = self.precoder.encode(interleaved)
-
-                signal = self.modulator.modulate(bitstream)
-                noise = complexNoise(self.dev, len(signal))
-                signal_rx = signal + noise
-            
-                interleaved_rx = self.demodulator.demodulate(signal_rx)
-                coded_rx = self.interleaver.deinterleave(interleaved_rx)
-                fec_input.append(coded_rx)
-            if self.generator_index == 0:
-                fec_input[2] = numpy.zeros_like(fec_input[0])
-                fec_input[3] = numpy.zeros_like(fec_input[0])
-            elif self.generator_index == 1:
-                fec_input[0] = numpy.zeros_like(fec_input[0])
-                fec_input[3] = numpy.zeros_like(fec_input[0])
-            elif self.generator_index == 2:
-                fec_input[1] = numpy.zeros_like(fec_input[0])
-                fec_input[2] = numpy.zeros_like(fec_input[0])
-                fec_input[3] = numpy.zeros_like(fec_input[0])
-            elif self.generator_index == 3:
-                fec_input[0] = numpy.zeros_like(fec_input[0])
-                fec_input[2] = numpy.zeros_like(fec_input[0])
-                fec_input[3] = numpy.zeros_like(fec_input[0])
-            data_rx = self.fec_codec.decode(fec_input, soft=True)
-        
-        else:
+        codeds = self.fec_codec.encode(data)
+
+        for coded in codeds:
             self.modulator.clear()
             self.demodulator.clear()
 
-            coded = data
             interleaved = self.interleaver.interleave(coded)
+
             bitstream = self.precoder.encode(interleaved)
-            
+
             signal = self.modulator.modulate(bitstream)
-            noise = realNoise(self.dev, len(signal))
+            noise = complexNoise(self.dev, len(signal))
             signal_rx = signal + noise
-
+        
             interleaved_rx = self.demodulator.demodulate(signal_rx)
             coded_rx = self.interleaver.deinterleave(interleaved_rx)
-            data_rx = nrzToBinary(coded_rx)
+            fec_input.append(coded_rx)
+        
+        return data, fec_input
+    
+    def sample(self):
+        data = numpy.random.randint(0, 2, self.size, dtype=bool)
+
+        self.modulator.clear()
+        self.demodulator.clear()
+
+        coded = data
+        interleaved = self.interleaver.interleave(coded)
+        bitstream = self.precoder.encode(interleaved)
+        
+        signal = self.modulator.modulate(bitstream)
+        noise = realNoise(self.dev, len(signal))
+        signal_rx = signal + noise
+
+        interleaved_rx = self.demodulator.demodulate(signal_rx)
+        coded_rx = self.interleaver.deinterleave(interleaved_rx)
+        data_rx = nrzToBinary(coded_rx)
 
         n_errors = numpy.sum(data ^ data_rx)
         
         return n_errors / len(data)
     
     def test(self, n):
-        return sum([self.sample() for _ in range(n)]) / n
+        if self.generator_index >= 4:
+            return sum([self.sample() for _ in range(n)]) / n
+
+        datas, fec_inputs = zip(*[self.transmit() for _ in range(n)])
+        datas = numpy.array(datas)
+        fec_inputs = numpy.array(fec_inputs)
+
+        erasures = numpy.zeros(fec_inputs.shape[1:], dtype=bool)
+        erasures[UplinkFecTestDirect.ERASED_GENERATORS[self.generator_index]] = True
+        datas_rx = self.fec_codec.decodeBatch(fec_inputs, soft=True, erasures=erasures)
+
+        n_errors = numpy.sum(datas ^ datas_rx)
+
+        return n_errors / datas.size
 
 
 
@@ -4,7 +4,7 @@ from matplotlib import pyplot
 import matplotlib
 matplotlib.use("tkagg")
 
-from pyomslpwan.lib.channel import GmskModulator, IqFrequencyModulator, GMSKSynchronizer
+from pyomslpwan.lib.channel import GmskModulator, IqFrequencyModulator, GMSKSynchronizer, SampleRateConverter
 from pyomslpwan.src.structs import *
 from pyomslpwan.src.uplink.frame import BurstModeUplinkGenerator, BurstModeUplinkParser
 from pyomslpwan.src.uplink.pdu import UplinkFrame, UplinkBurst
@@ -31,7 +31,7 @@ TIME_COEF = 0
 
 
 uplink_generator = BurstModeUplinkGenerator()
-uplink_receiver = UplinkReceiver(0.5, 0.3)
+uplink_receiver = UplinkReceiver(0.5, 0.3, resampler=SampleRateConverter(SAMP_RATE, BAUD))
 uplink_parser = BurstModeUplinkParser()
 uplink_modulator = GmskModulator(0.5, GAUSS_SPAN, GAUSS_SPS)
 uplink_synchronizer = GMSKSynchronizer(GAUSS_SPS, FREQ_COEF, TIME_COEF)
@@ -201,13 +201,13 @@ def transmitUplink(burst):
 
 def receiveUplink(iq):
     # TODO: matching filter
-    uplink_synchronizer = GMSKSynchronizer(GAUSS_SPS, FREQ_COEF, TIME_COEF)
+    uplink_synchronizer = GMSKSynchronizer(GAUSS_SPS, FREQ_COEF, TIME_COEF, diagnostics=True)
     f_error, p_error, f_correct, a1, a2, synchronized = uplink_synchronizer.synchronize(iq)
     pyplot.plot(numpy.unwrap(numpy.angle(f_correct)))
     #pyplot.plot(p_error)
     pyplot.show()
     uplink_receiver.clear()
-    uplink_receiver.feed(iq[::8])
+    uplink_receiver.feed(iq)
     bursts = uplink_receiver.bursts
     return bursts
 
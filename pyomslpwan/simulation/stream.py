@@ -18,11 +18,7 @@ def butter_lowpass_filter(data, cutoff, fs, order=5):
     return y
 
 def rationalResample(samples, I, D):
-    interpolated = numpy.zeros(len(samples) * I, dtype=samples.dtype)
-    interpolated[::I] = samples
-    filtered = butter_lowpass_filter(interpolated, min(1/D, 1/I), I, order=5)
-    decimated = filtered[::D]
-    return decimated
+    return RationalResampler(I, D).resample(samples)
 
 def upsample(samples, R):
     return numpy.repeat(samples, R)
@@ -22,6 +22,13 @@ class UplinkPrecodedMskDemodulator(PrecodedMskDemodulator):
 
 
 
+class UplinkGmskSymbolSampler(GmskSymbolSampler):
+
+    def __init__(self, samples_per_symbol):
+        super().__init__(0.5, 3, samples_per_symbol)
+
+
+
 class DownlinkSyncwordCorrelator(Correlator):
 
     def __init__(self):
@@ -50,17 +57,17 @@ class UplinkMidambleCorrelator(Correlator):
 
 
 class UplinkSyncwordSynchronizer(SyncwordSynchronizer):
-    def __init__(self, threshold):
+    def __init__(self, threshold, front_end=None, **kwargs):
         syncword_size = BurstModeUplink().syncword.getSize()
         syncword = Precoder().encode(numpy.array(bitstring.BitArray(uint=BurstModeUplink.SYNCWORD, length=syncword_size)))
         syncword_mod = UplinkMskModulator().modulate(syncword)
         #syncword_mod = binaryToNrz(syncword)
-        super().__init__(syncword=syncword_mod, syncword_offset=0, threshold=threshold)
+        super().__init__(syncword=syncword_mod, syncword_offset=0, threshold=threshold, front_end=front_end, **kwargs)
 
 
 
 class UplinkMidambleSynchronizer(SyncwordSynchronizer):
-    def __init__(self, threshold):
+    def __init__(self, threshold, front_end=None, **kwargs):
         syncword_size = BurstModeUplink().syncword.getSize()
         coded_length_size = BurstModeUplink().coded_length.getSize()
         max_data_a_size = 384 * 8
@@ -70,12 +77,12 @@ class UplinkMidambleSynchronizer(SyncwordSynchronizer):
         syncword = Precoder().encode(numpy.array(bitstring.BitArray(uint=BurstModeUplink.MIDAMBLE, length=midamble_size)))
         syncword_mod = UplinkMskModulator().modulate(syncword)
         #syncword_mod = binaryToNrz(syncword)
-        super().__init__(syncword=syncword_mod, syncword_offset=midamble_pos, threshold=threshold)
+        super().__init__(syncword=syncword_mod, syncword_offset=midamble_pos, threshold=threshold, front_end=front_end, **kwargs)
 
 
 
 class DownlinkSyncwordSynchronizer(SyncwordSynchronizer):
-    def __init__(self, threshold):
+    def __init__(self, threshold, front_end=None, **kwargs):
         syncword_size = BurstModeDownlink().syncword.getSize()
         syncword = toNrzArray(numpy.array(bitstring.BitArray(uint=BurstModeDownlink.SYNCWORD, length=syncword_size)))
-        super().__init__(syncword=syncword, syncword_offset=0, threshold=threshold)
\ No newline at end of file
+        super().__init__(syncword=syncword, syncword_offset=0, threshold=threshold, front_end=front_end, **kwargs)
\ No newline at end of file
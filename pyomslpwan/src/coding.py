@@ -1,4 +1,4 @@
-from pyomslpwan.lib.coding import ConvolutionalCodec, Puncturer, CrcCodec, Scrambler, DifferentialCodec
+from pyomslpwan.lib.coding import ConvolutionalCodec, Puncturer, CrcCodec, Scrambler, DifferentialCodec, binaryToNrz
 from pyomslpwan.lib.fields import Field, FieldGroup
 import numpy
 
@@ -55,13 +55,14 @@ class CommonFecEncodingScheme:
     PUNCTURING_PATTERN_B = 0b0100000
     PUNCTURING_PATTERN_C = 0b0010000
 
-    def __init__(self):
+    def __init__(self, quantization_bits=0):
         self.codec = ConvolutionalCodec(CommonFecEncodingScheme.CONSTRAINT_LENGTH,
                                         [CommonFecEncodingScheme.POLYNOMIAL_G0,
                                          CommonFecEncodingScheme.POLYNOMIAL_G1,
                                          CommonFecEncodingScheme.POLYNOMIAL_G2,
                                          CommonFecEncodingScheme.POLYNOMIAL_G3],
-                                        recursive_polynomial=CommonFecEncodingScheme.POLYNOMIAL_G0)
+                                        recursive_polynomial=CommonFecEncodingScheme.POLYNOMIAL_G0,
+                                        quantization_bits=quantization_bits)
 
         self.puncturer_a = Puncturer(CommonFecEncodingScheme.PUNCTURING_PATTERN_SIZE,
                                      CommonFecEncodingScheme.PUNCTURING_PATTERN_A)
@@ -70,14 +71,21 @@ class CommonFecEncodingScheme:
         self.puncturer_c = Puncturer(CommonFecEncodingScheme.PUNCTURING_PATTERN_SIZE,
                                      CommonFecEncodingScheme.PUNCTURING_PATTERN_C)
     
+    def encodeEmissions(self, data):
+        # Unpunctured output of all generators, each including its tail
+        return self.codec.encode(data,
+                                 initial_state=CommonFecEncodingScheme.INITIAL_STATE,
+                                 final_state=CommonFecEncodingScheme.FINAL_STATE)
+
     def encode(self, data):
-        c0, c1, c2, c3 = self.codec.encode(data,
-                                           initial_state=CommonFecEncodingScheme.INITIAL_STATE,
-                                           final_state=CommonFecEncodingScheme.FINAL_STATE)
+        return self.emissionsToParities(self.encodeEmissions(data))
+
+    def emissionsToParities(self, emissions):
+        c0, c1, c2, c3 = emissions
 
-        data_size = len(data)
-        punctured_size = data_size // CommonFecEncodingScheme.PUNCTURING_PATTERN_SIZE
         tail_size = CommonFecEncodingScheme.CONSTRAINT_LENGTH - 1
+        data_size = len(c0) - tail_size
+        punctured_size = data_size // CommonFecEncodingScheme.PUNCTURING_PATTERN_SIZE
 
         parities = CommonFecEncodingSchemeParities()
         parities.systematic.setSize(data_size)
@@ -106,49 +114,36 @@ class CommonFecEncodingScheme:
     def decode(self, parities: CommonFecEncodingSchemeParities, data_size):
         punctured_size = data_size // CommonFecEncodingScheme.PUNCTURING_PATTERN_SIZE
         tail_size = CommonFecEncodingScheme.CONSTRAINT_LENGTH - 1
-        default = lambda x, d: x if len(x) > 0 else d
-        
-        zero_parity = numpy.zeros(data_size)
-        zero_tail = numpy.zeros(tail_size)
-
-        systematic = default(parities.systematic.getNrzStream(), zero_parity)
-        fec_parity_1 = default(parities.fec_parity_1.getNrzStream(), zero_parity)
-        fec_parity_2 = default(parities.fec_parity_2.getNrzStream(), zero_parity)
-        fec_tail_0 = default(parities.fec_tail_0.getNrzStream(), zero_tail)
-        fec_tail_1 = default(parities.fec_tail_1.getNrzStream(), zero_tail)
-        fec_tail_2 = default(parities.fec_tail_2.getNrzStream(), zero_tail)
-        fec_tail_3 = default(parities.fec_tail_3.getNrzStream(), zero_tail)
-
-        fec_parity_3 = numpy.zeros(data_size)
-        fec_parity_3_mask = numpy.zeros(data_size)
-
-        if parities.fec_parity_3.getSize() > 0:
-            fec_parity_3 += parities.fec_parity_3.getNrzStream()
-            fec_parity_3_mask += 1
-        if parities.fec_parity_3a.getSize() > 0:
-            fec_parity_3 += self.puncturer_a.depuncture(parities.fec_parity_3a.getNrzStream(), data_size)
-            fec_parity_3_mask += self.puncturer_a.depuncture(numpy.ones(punctured_size), data_size)
-        if parities.fec_parity_3b.getSize() > 0:
-            fec_parity_3 += self.puncturer_b.depuncture(parities.fec_parity_3b.getNrzStream(), data_size)
-            fec_parity_3_mask += self.puncturer_b.depuncture(numpy.ones(punctured_size), data_size)
-        if parities.fec_parity_3c.getSize() > 0:
-            fec_parity_3 += self.puncturer_c.depuncture(parities.fec_parity_3c.getNrzStream(), data_size)
-            fec_parity_3_mask += self.puncturer_c.depuncture(numpy.ones(punctured_size), data_size)
-
-        numpy.divide(fec_parity_3, fec_parity_3_mask, where=fec_parity_3_mask != 0, out=fec_parity_3)
-
-        fec_data_0 = numpy.concatenate([systematic, fec_tail_0])
-        fec_data_1 = numpy.concatenate([fec_parity_1, fec_tail_1])
-        fec_data_2 = numpy.concatenate([fec_parity_2, fec_tail_2])
-        fec_data_3 = numpy.concatenate([fec_parity_3, fec_tail_3])
-
-        emissions = [fec_data_0, fec_data_1, fec_data_2, fec_data_3]
-        data = self.codec.decode(emissions,
-                                 initial_state=CommonFecEncodingScheme.INITIAL_STATE,
-                                 final_state=CommonFecEncodingScheme.FINAL_STATE,
-                                 soft=True)
-
-        return data
+        parity = slice(0, data_size)
+        tail = slice(data_size, data_size + tail_size)
+
+        # Received fields as (generator, positions, field), generators that were not received
+        # at all are skipped by the decoder
+        fields = [
+            (0, parity, parities.systematic),
+            (1, parity, parities.fec_parity_1),
+            (2, parity, parities.fec_parity_2),
+            (3, parity, parities.fec_parity_3),
+            (0, tail, parities.fec_tail_0),
+            (1, tail, parities.fec_tail_1),
+            (2, tail, parities.fec_tail_2),
+            (3, tail, parities.fec_tail_3),
+            (3, self.puncturer_a.positions(punctured_size, data_size), parities.fec_parity_3a),
+            (3, self.puncturer_b.positions(punctured_size, data_size), parities.fec_parity_3b),
+            (3, self.puncturer_c.positions(punctured_size, data_size), parities.fec_parity_3c),
+        ]
+        sub_streams = [(generator, positions, field.getNrzStream(copy=False)) for generator, positions, field in fields if field.getSize() > 0]
+
+        return self.decodeSubStreams(sub_streams, data_size)
+
+    def decodeSubStreams(self, sub_streams, data_size):
+        # sub_streams holds NRZ values as (generator, positions, values), see ConvolutionalCodec.decodeSubStreams
+        tail_size = CommonFecEncodingScheme.CONSTRAINT_LENGTH - 1
+        return self.codec.decodeSubStreams(sub_streams,
+                                           data_size + tail_size,
+                                           initial_state=CommonFecEncodingScheme.INITIAL_STATE,
+                                           final_state=CommonFecEncodingScheme.FINAL_STATE,
+                                           soft=True)
 
 
 
@@ -159,6 +154,9 @@ class CommonInterleavingScheme:
     def __init__(self):
         self.scrambler = Scrambler(CommonInterleavingScheme.MULTIPLIER)
     
+    def permutation(self, size):
+        return self.scrambler.permutation(size)
+
     def interleave(self, data):
         return self.scrambler.scramble(data)
     
@@ -195,4 +193,48 @@ class CodedHeaderCrc(CrcCodec):
     POLYNOMIAL = 0x107
 
     def __init__(self):
-        super().__init__(CodedHeaderCrc.LENGTH, CodedHeaderCrc.POLYNOMIAL)
\ No newline at end of file
+        super().__init__(CodedHeaderCrc.LENGTH, CodedHeaderCrc.POLYNOMIAL)
+
+
+
+class CodedLengthDecoder:
+
+    MIN_LENGTH_DATA_A = 4
+    MAX_LENGTH_DATA_A = 384
+    LENGTH_DATA_A_SIZE = 9
+    # Random noise reaches this correlation with its closest codeword in about a quarter of cases
+    MIN_CORRELATION = 0.75
+
+    def __init__(self, min_correlation=MIN_CORRELATION):
+        self.crc_codec = CodedLengthCrc()
+        # Streams whose closest codeword correlates less than this are rejected as noise
+        self.min_correlation = min_correlation
+
+        self.lengths = numpy.arange(CodedLengthDecoder.MIN_LENGTH_DATA_A, CodedLengthDecoder.MAX_LENGTH_DATA_A + 1)
+        shifts = numpy.arange(CodedLengthDecoder.LENGTH_DATA_A_SIZE - 1, -1, -1)
+        length_bits = (self.lengths[:, numpy.newaxis] >> shifts) & 0b1
+        codewords = self.crc_codec.encode(length_bits)
+        self.codebook = binaryToNrz(codewords).astype(numpy.float32)
+
+    def decode(self, nrz):
+        # Maximum-likelihood decision by correlating against every valid codeword,
+        # accepts a single NRZ stream or a (batch, size) array of NRZ streams. Besides the
+        # lengths, returns the correlation of the chosen codeword normalized to 1 for a
+        # noiseless stream, and its margin over the runner-up codeword
+        nrz = numpy.asarray(nrz, dtype=numpy.float32)
+        correlation = numpy.atleast_2d(nrz) @ self.codebook.T
+        amplitude = numpy.maximum(numpy.abs(numpy.atleast_2d(nrz)).sum(axis=1), numpy.finfo(numpy.float32).tiny)
+
+        best_two = numpy.argpartition(correlation, -2, axis=1)[:, -2:]
+        best_two_correlation = numpy.take_along_axis(correlation, best_two, axis=1)
+        best = best_two[numpy.arange(len(correlation)), best_two_correlation.argmax(axis=1)]
+        margin = best_two_correlation.max(axis=1) - best_two_correlation.min(axis=1)
+        normalized_correlation = best_two_correlation.max(axis=1) / amplitude
+
+        lengths = self.lengths[best]
+        if nrz.ndim == 1:
+            return int(lengths[0]), float(normalized_correlation[0]), float(margin[0])
+        return lengths, normalized_correlation, margin
+
+    def check(self, normalized_correlation):
+        return normalized_correlation >= self.min_correlation
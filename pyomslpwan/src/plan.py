@@ -0,0 +1,237 @@
+import math
+import numpy
+
+import pyomslpwan.src.structs as structs
+from pyomslpwan.src.coding import CommonFecEncodingScheme, CommonInterleavingScheme
+from pyomslpwan.lib.coding import Puncturer, binaryToNrz
+from pyomslpwan.lib.bits import bytesToBits, bitsToBytes
+
+
+
+DIRECTIONS = [DIRECTION_UPLINK := 0,
+              DIRECTION_DOWNLINK := 1]
+
+# Coded payload struct of every burst, keyed by (direction, burst_mode, burst_type)
+CODED_PAYLOAD_LAYOUTS = {
+    (DIRECTION_UPLINK, structs.BURST_MODE_SINGLE_BURST, structs.BURST_TYPE_UPLINK_SINGLE_BURST_FEC_RATE_7_8): [structs.CodedPayloadSingleBurstFec78],
+    (DIRECTION_UPLINK, structs.BURST_MODE_SINGLE_BURST, structs.BURST_TYPE_UPLINK_SINGLE_BURST_FEC_RATE_1_2): [structs.CodedPayloadSingleBurstFec12],
+    (DIRECTION_UPLINK, structs.BURST_MODE_SINGLE_BURST, structs.BURST_TYPE_UPLINK_SINGLE_BURST_FEC_RATE_1_3): [structs.CodedPayloadSingleBurstFec13],
+    (DIRECTION_UPLINK, structs.BURST_MODE_MULTI_BURST, structs.BURST_TYPE_UPLINK_MULTI_BURST_TIMING_1): [structs.CodedPayloadMultiBurst1, structs.CodedPayloadMultiBurst2, structs.CodedPayloadMultiBurst3],
+    (DIRECTION_UPLINK, structs.BURST_MODE_MULTI_BURST, structs.BURST_TYPE_UPLINK_MULTI_BURST_TIMING_2): [structs.CodedPayloadMultiBurst1, structs.CodedPayloadMultiBurst2, structs.CodedPayloadMultiBurst3],
+    (DIRECTION_UPLINK, structs.BURST_MODE_MULTI_BURST, structs.BURST_TYPE_UPLINK_MULTI_BURST_TIMING_3): [structs.CodedPayloadMultiBurst1, structs.CodedPayloadMultiBurst2, structs.CodedPayloadMultiBurst3],
+    (DIRECTION_DOWNLINK, structs.BURST_MODE_SINGLE_BURST, structs.BURST_TYPE_DOWNLINK_SINGLE_BURST_FEC_RATE_7_8): [structs.CodedPayloadSingleBurstFec78],
+    (DIRECTION_DOWNLINK, structs.BURST_MODE_SINGLE_BURST, structs.BURST_TYPE_DOWNLINK_SINGLE_BURST_FEC_RATE_1_2): [structs.CodedPayloadSingleBurstFec12],
+    (DIRECTION_DOWNLINK, structs.BURST_MODE_SINGLE_BURST, structs.BURST_TYPE_DOWNLINK_SINGLE_BURST_FEC_RATE_1_3): [structs.CodedPayloadSingleBurstFec13],
+    (DIRECTION_DOWNLINK, structs.BURST_MODE_MULTI_BURST, structs.BURST_TYPE_DOWNLINK_MULTI_BURST): [structs.CodedPayloadMultiBurst1, structs.CodedPayloadMultiBurst2, structs.CodedPayloadMultiBurst3],
+}
+
+# Attribute of the CodedPayload PDU that holds each coded payload struct
+CODED_PAYLOAD_NAMES = {
+    structs.CodedPayloadSingleBurstFec78: "single_burst_fec_7_8_struct",
+    structs.CodedPayloadSingleBurstFec12: "single_burst_fec_1_2_struct",
+    structs.CodedPayloadSingleBurstFec13: "single_burst_fec_1_3_struct",
+    structs.CodedPayloadMultiBurst1: "multi_burst_1_struct",
+    structs.CodedPayloadMultiBurst2: "multi_burst_2_struct",
+    structs.CodedPayloadMultiBurst3: "multi_burst_3_struct",
+}
+
+# Fields that carry the systematic FEC output
+SYSTEMATIC_FIELDS = ["phy_payload", "_7_8_padding"]
+
+# Process-wide plans, keyed by (direction, burst_mode, burst_type, phy_payload_length, interleaver)
+_plan_cache = {}
+
+
+
+class BurstPlan:
+
+    def __init__(self, struct, fields, emission_size, permutation):
+        # fields maps id() of a coded payload field to (generator, positions in the emission, known zero, systematic),
+        # fields without an entry are padding and never reach the decoder
+        self.sub_streams = []
+        self.known_sub_streams = []
+        emission_index = []
+        coded_index = []
+        systematic_index = [numpy.empty(0, dtype=int)]
+        systematic_positions = [numpy.empty(0, dtype=int)]
+
+        offset = 0
+        for field in struct.fields:
+            size = field.getSize()
+            coded_positions = numpy.arange(offset, offset + size)
+            stream_positions = permutation[offset:offset + size]
+            offset += size
+
+            if id(field) not in fields:
+                continue
+            generator, positions, known, systematic = fields[id(field)]
+
+            emission_index.append(generator * emission_size + numpy.arange(emission_size)[positions])
+            coded_index.append(coded_positions)
+            if known:
+                self.known_sub_streams.append((generator, positions, -numpy.ones(size)))
+            else:
+                self.sub_streams.append((generator, positions, stream_positions))
+            if systematic:
+                systematic_index.append(coded_positions)
+                systematic_positions.append(numpy.arange(emission_size)[positions])
+
+        # Flat gather indices, the coded payload is emissions.ravel()[emission_index] at coded_index,
+        # which lands at stream_index once interleaved
+        self.emission_index = numpy.concatenate(emission_index)
+        self.coded_index = numpy.concatenate(coded_index)
+        self.stream_index = permutation[self.coded_index]
+
+        # Positions of the systematic bits in the coded payload and in the FEC output
+        self.systematic_index = numpy.concatenate(systematic_index)
+        self.systematic_positions = numpy.concatenate(systematic_positions)
+
+    def getSubStreams(self, nrz):
+        sub_streams = [(generator, positions, nrz[stream_positions]) for generator, positions, stream_positions in self.sub_streams]
+        return sub_streams + self.known_sub_streams
+
+
+
+class FramePlan:
+
+    def __init__(self, direction, burst_mode, burst_type, phy_payload_length, interleaver=None):
+        self.layout = CODED_PAYLOAD_LAYOUTS[(direction, burst_mode, burst_type)]
+        self.coded_payload_names = [CODED_PAYLOAD_NAMES[coded_payload_class] for coded_payload_class in self.layout]
+        rate_7_8 = any(hasattr(coded_payload_class(), "_7_8_padding") for coded_payload_class in self.layout)
+
+        self.bits_payload = phy_payload_length * 8
+        self.bits_padding_7_8 = (-self.bits_payload) % CommonFecEncodingScheme.PUNCTURING_PATTERN_SIZE if rate_7_8 else 0
+        self.bits_fec = self.bits_payload + self.bits_padding_7_8
+        self.bits_tail = CommonFecEncodingScheme.CONSTRAINT_LENGTH - 1
+        self.bits_punctured = self.bits_fec // CommonFecEncodingScheme.PUNCTURING_PATTERN_SIZE
+
+        # Size and emission of every coded payload field by name, as (generator, positions, known zero)
+        parity = slice(0, self.bits_fec)
+        tail = slice(self.bits_fec, self.bits_fec + self.bits_tail)
+        puncturers = {
+            "fec_parity_3a": Puncturer(CommonFecEncodingScheme.PUNCTURING_PATTERN_SIZE, CommonFecEncodingScheme.PUNCTURING_PATTERN_A),
+            "fec_parity_3b": Puncturer(CommonFecEncodingScheme.PUNCTURING_PATTERN_SIZE, CommonFecEncodingScheme.PUNCTURING_PATTERN_B),
+            "fec_parity_3c": Puncturer(CommonFecEncodingScheme.PUNCTURING_PATTERN_SIZE, CommonFecEncodingScheme.PUNCTURING_PATTERN_C),
+        }
+        self.field_sizes = {
+            "phy_payload": self.bits_payload,
+            "_7_8_padding": self.bits_padding_7_8,
+            "fec_parity_1": self.bits_fec,
+            "fec_parity_2": self.bits_fec,
+        } | {name: self.bits_punctured for name in puncturers}
+        field_emissions = {
+            "phy_payload": (0, slice(0, self.bits_payload), False),
+            "_7_8_padding": (0, slice(self.bits_payload, self.bits_fec), True),
+            "fec_parity_1": (1, parity, False),
+            "fec_parity_2": (2, parity, False),
+            "fec_tail_0": (0, tail, False),
+            "fec_tail_1": (1, tail, False),
+            "fec_tail_2": (2, tail, False),
+        } | {name: (3, puncturer.positions(self.bits_punctured, self.bits_fec), False) for name, puncturer in puncturers.items()}
+
+        coded_payloads = self.createCodedPayloads()
+        fields = []
+        for coded_payload in coded_payloads:
+            coded_payload_fields = {}
+            for name, field in vars(coded_payload).items():
+                if name in field_emissions and self.field_sizes.get(name, 1) > 0:
+                    coded_payload_fields[id(field)] = field_emissions[name] + (name in SYSTEMATIC_FIELDS,)
+            fields.append(coded_payload_fields)
+
+        self.bits_coded_payload = coded_payloads[0].getSize()
+        self.length_data = self.bits_coded_payload // 8
+        self.length_data_a = math.ceil(self.length_data / 2)
+        self.length_data_b = self.length_data - self.length_data_a
+
+        # Any interleaver with a deinterleave method works, the plan only keeps its permutation
+        if interleaver is None:
+            interleaver = CommonInterleavingScheme()
+        self.permutation = interleaver.deinterleave(numpy.arange(self.bits_coded_payload))
+        emission_size = self.bits_fec + self.bits_tail
+        self.bursts = [BurstPlan(coded_payload, coded_payload_fields, emission_size, self.permutation)
+                       for coded_payload, coded_payload_fields in zip(coded_payloads, fields)]
+
+    def createCodedPayloads(self):
+        # New coded payload struct of every burst, with all field sizes set
+        coded_payloads = [coded_payload_class() for coded_payload_class in self.layout]
+        for coded_payload in coded_payloads:
+            for name, field in vars(coded_payload).items():
+                if name in self.field_sizes:
+                    field.setSize(self.field_sizes[name])
+        return coded_payloads
+
+    def interleave(self, data):
+        interleaved = numpy.empty_like(data)
+        interleaved[self.permutation] = data
+        return interleaved
+
+    def deinterleave(self, interleaved):
+        return interleaved[self.permutation]
+
+    def encodeEmissions(self, fec_codec: CommonFecEncodingScheme, phy_payload):
+        # Unpunctured FEC output of the padded payload, one array per generator
+        fec_input = numpy.zeros(self.bits_fec, dtype=bool)
+        fec_input[:self.bits_payload] = bytesToBits(phy_payload)
+        return fec_codec.encodeEmissions(fec_input)
+
+    def encode(self, fec_codec: CommonFecEncodingScheme, phy_payload, interleave=True):
+        return self.scatterEmissions(self.encodeEmissions(fec_codec, phy_payload), interleave)
+
+    def scatterEmissions(self, emissions, interleave=True):
+        # Returns the interleaved coded payload bitstream of every burst, or the
+        # coded payload itself (the bitstream of the coded payload struct)
+        emissions = numpy.concatenate(emissions)
+
+        bitstreams = []
+        for burst in self.bursts:
+            bitstream = numpy.zeros(self.bits_coded_payload, dtype=int)
+            bitstream[burst.stream_index if interleave else burst.coded_index] = emissions[burst.emission_index]
+            bitstreams.append(bitstream)
+
+        return bitstreams
+
+    def decodeBits(self, fec_codec: CommonFecEncodingScheme, nrzs):
+        # nrzs holds the interleaved NRZ stream of every burst, None for bursts that were not received,
+        # returns the systematic FEC output
+        sub_streams = []
+        for burst, nrz in zip(self.bursts, nrzs):
+            if nrz is not None:
+                sub_streams += burst.getSubStreams(numpy.nan_to_num(nrz, nan=0))
+
+        return fec_codec.decodeSubStreams(sub_streams, self.bits_fec)
+
+    def decode(self, fec_codec: CommonFecEncodingScheme, nrzs):
+        fec_output = self.decodeBits(fec_codec, nrzs)
+        return bitsToBytes(fec_output[:self.bits_payload]).tobytes()
+
+    def decodeCodedPayloads(self, fec_codec: CommonFecEncodingScheme, nrzs):
+        # Deinterleaved NRZ stream of every received burst (the stream of the coded payload struct)
+        # with the systematic bits replaced by the FEC output, and the FEC output itself
+        fec_output = self.decodeBits(fec_codec, nrzs)
+
+        coded_payload_nrzs = []
+        for burst, nrz in zip(self.bursts, nrzs):
+            if nrz is None:
+                coded_payload_nrzs.append(None)
+                continue
+            coded_payload_nrz = self.deinterleave(nrz)
+            coded_payload_nrz[burst.systematic_index] = binaryToNrz(fec_output[burst.systematic_positions])
+            coded_payload_nrzs.append(coded_payload_nrz)
+
+        return coded_payload_nrzs, fec_output
+
+
+
+def getFramePlan(direction, burst_mode, burst_type, phy_payload_length, interleaver=None):
+    # Plans only depend on their key, so they are built once and shared by generators and parsers.
+    # The common interleaving scheme has no state, any instance of it shares the default plans.
+    if type(interleaver) is CommonInterleavingScheme:
+        interleaver = None
+    key = (int(direction), int(burst_mode), int(burst_type), int(phy_payload_length), interleaver)
+    frame_plan = _plan_cache.get(key)
+
+    if frame_plan is None:
+        frame_plan = FramePlan(*key)
+        _plan_cache[key] = frame_plan
+
+    return frame_plan
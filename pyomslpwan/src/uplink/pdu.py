@@ -11,6 +11,8 @@ class CodedLength:
         self.struct = structs.CodedLength()
         
         self.length_data_a = None
+        self.correlation = None
+        self.margin = None
 
 
 
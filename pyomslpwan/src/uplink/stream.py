@@ -1,5 +1,6 @@
 import numpy
 import time
+from collections import deque
 
 from pyomslpwan.src.channel import *
 from pyomslpwan.src.uplink.frame import *
@@ -102,14 +103,30 @@ class BitstreamParser:
 
 class UplinkReceiver:
 
-    def __init__(self, syncword_threshold, midamble_threshold):
+    # Bursts found by both synchronizers start within this many samples of each other
+    DUPLICATE_TOLERANCE = 2
+
+    def __init__(self, syncword_threshold, midamble_threshold, false_alarm_rate=None, sample_rate=None, squelch=None, resampler=None, samples_per_symbol=1):
         self.parser = BurstModeUplinkParser()
-        self.syncword_synchronizer = UplinkSyncwordSynchronizer(syncword_threshold)
-        self.midamble_synchronizer = UplinkMidambleSynchronizer(midamble_threshold)
+        # An optional SampleRateConverter brings SDR samples to samples_per_symbol, above one sample per symbol
+        # the input is taken to be GMSK and reduced to one MSK-like sample per symbol before detection
+        self.resampler = resampler
+        self.symbol_sampler = UplinkGmskSymbolSampler(samples_per_symbol) if samples_per_symbol > 1 else None
+        # Both synchronizers search the same samples, so they share one correlation pass and sample history,
+        # an optional PowerSquelch limits correlation to samples around channel activity
+        self.front_end = DetectionFrontEnd(squelch=squelch)
+        # With a false alarm rate, thresholds adapt so that both synchronizers together open about that
+        # many false candidates per second, the fixed thresholds become lower bounds
+        assert false_alarm_rate is None or sample_rate is not None, "false_alarm_rate requires sample_rate"
+        cfar = dict(false_alarm_rate=None if false_alarm_rate is None else false_alarm_rate / 2, sample_rate=sample_rate)
+        self.syncword_synchronizer = UplinkSyncwordSynchronizer(syncword_threshold, self.front_end, **cfar)
+        self.midamble_synchronizer = UplinkMidambleSynchronizer(midamble_threshold, self.front_end, **cfar)
         self.syncword_demodulator = UplinkPrecodedMskDemodulator()
         self.midamble_demodulator = UplinkPrecodedMskDemodulator()
 
         self.bursts: list[UplinkBurst] = []
+        # Start positions of recently received bursts
+        self.burst_positions = deque(maxlen=16)
 
         self.syncword_parser_loop = self.syncwordParserLoop()
         self.midamble_parser_loop = self.midambleParserLoop()
@@ -121,11 +138,19 @@ class UplinkReceiver:
                 nrz = numpy.zeros(0)
                 self.syncword_demodulator.clear()
 
+                # Wait for a candidate, the midamble parser loop may have received its burst already
+                while self.syncword_synchronizer.getSize() == 0:
+                    yield None
+                burst_position = self.syncword_synchronizer.streams[0]["position"]
+                if self.isReceived(burst_position):
+                    self.syncword_synchronizer.nextMatch()
+                    continue
+
                 syncword_start = self.syncword_synchronizer.syncword_offset
                 syncword_end = syncword_start + burst.struct.syncword.getSize()
                 while self.syncword_synchronizer.getSize() < syncword_end:
                     yield None
-                samples = self.syncword_synchronizer.getBuffer()[syncword_start:syncword_end]
+                samples = self.syncword_synchronizer.getSamples(syncword_start, syncword_end)
                 nrz = numpy.concatenate([nrz, self.syncword_demodulator.demodulate(samples)])
                 #print("Found syncword")
 
@@ -133,7 +158,7 @@ class UplinkReceiver:
                 coded_length_end = coded_length_start + burst.struct.coded_length.getSize()
                 while self.syncword_synchronizer.getSize() < coded_length_end:
                     yield None
-                samples = self.syncword_synchronizer.getBuffer()[coded_length_start:coded_length_end]
+                samples = self.syncword_synchronizer.getSamples(coded_length_start, coded_length_end)
                 nrz = numpy.concatenate([nrz, self.syncword_demodulator.demodulate(samples)])
                 burst.struct.coded_length.setNrzStream(nrz[coded_length_start:coded_length_end])
 
@@ -144,7 +169,7 @@ class UplinkReceiver:
                 data_a_end = data_a_start + burst.struct.data_a.getSize()
                 while self.syncword_synchronizer.getSize() < data_a_end:
                     yield None
-                samples = self.syncword_synchronizer.getBuffer()[data_a_start:data_a_end]
+                samples = self.syncword_synchronizer.getSamples(data_a_start, data_a_end)
                 nrz = numpy.concatenate([nrz, self.syncword_demodulator.demodulate(samples)])
                 burst.struct.data_a.setNrzStream(nrz[data_a_start:data_a_end])
 
@@ -152,14 +177,14 @@ class UplinkReceiver:
                 midamble_end = midamble_start + burst.struct.midamble.getSize()
                 while self.syncword_synchronizer.getSize() < midamble_end:
                     yield None
-                samples = self.syncword_synchronizer.getBuffer()[midamble_start:midamble_end]
+                samples = self.syncword_synchronizer.getSamples(midamble_start, midamble_end)
                 nrz = numpy.concatenate([nrz, self.syncword_demodulator.demodulate(samples)])
 
                 coded_header_start = midamble_end
                 coded_header_end = coded_header_start + burst.struct.coded_header.getSize()
                 while self.syncword_synchronizer.getSize() < coded_header_end:
                     yield None
-                samples = self.syncword_synchronizer.getBuffer()[coded_header_start:coded_header_end]
+                samples = self.syncword_synchronizer.getSamples(coded_header_start, coded_header_end)
                 nrz = numpy.concatenate([nrz, self.syncword_demodulator.demodulate(samples)])
                 burst.struct.coded_header.setNrzStream(nrz[coded_header_start:coded_header_end])
 
@@ -171,14 +196,17 @@ class UplinkReceiver:
                 data_b_end = data_b_start + burst.struct.data_b.getSize()
                 while self.syncword_synchronizer.getSize() < data_b_end:
                     yield None
-                samples = self.syncword_synchronizer.getBuffer()[data_b_start:data_b_end]
+                samples = self.syncword_synchronizer.getSamples(data_b_start, data_b_end)
                 nrz = numpy.concatenate([nrz, self.syncword_demodulator.demodulate(samples)])
                 burst.struct.data_b.setNrzStream(nrz[data_b_start:data_b_end])
 
                 self.parser.parseData(burst)
                 #print("Parsed data")
 
-                yield burst
+                # The other parser loop may have finished the same burst while this one waited for samples
+                if not self.isReceived(burst_position):
+                    self.burst_positions.append(burst_position)
+                    yield burst
 
             except AssertionError:
                 pass
@@ -196,7 +224,7 @@ class UplinkReceiver:
                 midamble_end = midamble_start + burst.struct.midamble.getSize()
                 while self.midamble_synchronizer.getSize() < midamble_end:
                     yield None
-                samples = self.midamble_synchronizer.getBuffer()[midamble_start:midamble_end]
+                samples = self.midamble_synchronizer.getSamples(midamble_start, midamble_end)
                 nrz = numpy.concatenate([nrz, self.midamble_demodulator.demodulate(samples)])
                 #print("Found midamble")
 
@@ -204,7 +232,7 @@ class UplinkReceiver:
                 coded_header_end = coded_header_start + burst.struct.coded_header.getSize()
                 while self.midamble_synchronizer.getSize() < coded_header_end:
                     yield None
-                samples = self.midamble_synchronizer.getBuffer()[coded_header_start:coded_header_end]
+                samples = self.midamble_synchronizer.getSamples(coded_header_start, coded_header_end)
                 nrz = numpy.concatenate([nrz, self.midamble_demodulator.demodulate(samples)])
                 burst.struct.coded_header.setNrzStream(nrz[coded_header_start:coded_header_end])
 
@@ -214,44 +242,58 @@ class UplinkReceiver:
                 beginning_size = burst.struct.syncword.getSize() + burst.struct.coded_length.getSize()
                 beginning_start = self.midamble_synchronizer.syncword_offset - burst.struct.data_a.getSize() - beginning_size
                 beginning_end = beginning_start + beginning_size
+
+                burst_position = self.midamble_synchronizer.streams[0]["position"] + beginning_start
+                if self.isReceived(burst_position):
+                    self.midamble_synchronizer.nextMatch()
+                    continue
                 nrz = numpy.zeros(beginning_start)
                 self.midamble_demodulator.clear()
 
-                samples = self.midamble_synchronizer.getBuffer()[beginning_start:beginning_end]
+                samples = self.midamble_synchronizer.getSamples(beginning_start, beginning_end)
                 nrz = numpy.concatenate([nrz, self.midamble_demodulator.demodulate(samples)])
 
                 data_a_start = beginning_end
                 data_a_end = data_a_start + burst.struct.data_a.getSize()
-                samples = self.midamble_synchronizer.getBuffer()[data_a_start:data_a_end]
+                samples = self.midamble_synchronizer.getSamples(data_a_start, data_a_end)
                 nrz = numpy.concatenate([nrz, self.midamble_demodulator.demodulate(samples)])
                 burst.struct.data_a.setNrzStream(nrz[data_a_start:data_a_end])
 
                 middle_start = data_a_end
                 middle_end = middle_start + burst.struct.midamble.getSize() + burst.struct.coded_header.getSize()
-                samples = self.midamble_synchronizer.getBuffer()[middle_start:middle_end]
+                samples = self.midamble_synchronizer.getSamples(middle_start, middle_end)
                 nrz = numpy.concatenate([nrz, self.midamble_demodulator.demodulate(samples)])
 
                 data_b_start = middle_end
                 data_b_end = data_b_start + burst.struct.data_b.getSize()
                 while self.midamble_synchronizer.getSize() < data_b_end:
                     yield None
-                samples = self.midamble_synchronizer.getBuffer()[data_b_start:data_b_end]
+                samples = self.midamble_synchronizer.getSamples(data_b_start, data_b_end)
                 nrz = numpy.concatenate([nrz, self.midamble_demodulator.demodulate(samples)])
                 burst.struct.data_b.setNrzStream(nrz[data_b_start:data_b_end])
 
                 self.parser.parseData(burst)
                 #print("Parsed data")
 
-                yield burst
+                # The other parser loop may have finished the same burst while this one waited for samples
+                if not self.isReceived(burst_position):
+                    self.burst_positions.append(burst_position)
+                    yield burst
 
             except AssertionError:
                     pass
 
             self.midamble_synchronizer.nextMatch()
 
+    def isReceived(self, burst_position):
+        return any(abs(burst_position - position) <= self.DUPLICATE_TOLERANCE for position in self.burst_positions)
+
     def feed(self, samples):
-        self.syncword_synchronizer.feed(samples)
-        self.midamble_synchronizer.feed(samples)
+        if self.resampler is not None:
+            samples = self.resampler.resample(samples)
+        if self.symbol_sampler is not None:
+            samples = self.symbol_sampler.sample(samples)
+        self.front_end.feed(samples)
 
         while (burst := next(self.syncword_parser_loop)) is not None:
             self.bursts.append(burst)
@@ -260,10 +302,16 @@ class UplinkReceiver:
     
     def clear(self):
         self.bursts = []
+        self.burst_positions.clear()
         self.syncword_parser_loop = self.syncwordParserLoop()
         self.midamble_parser_loop = self.midambleParserLoop()
+        self.front_end.clear()
         self.syncword_synchronizer.clear()
         self.midamble_synchronizer.clear()
+        if self.resampler is not None:
+            self.resampler.clear()
+        if self.symbol_sampler is not None:
+            self.symbol_sampler.clear()
 
 
 
@@ -0,0 +1,368 @@
+import unittest
+import numpy
+from scipy import signal
+
+from pyomslpwan.lib.channel import Correlator, MultiCorrelator, DetectionFrontEnd, SampleRingBuffer, SyncwordSynchronizer, PowerSquelch, \
+    RationalResampler, SampleRateConverter, GMSKSynchronizer, GmskModulator, GmskSymbolSampler
+from pyomslpwan.src.channel import *
+from pyomslpwan.src.structs import *
+from pyomslpwan.src.uplink.frame import BurstModeUplinkGenerator, BurstModeUplinkParser
+from pyomslpwan.src.uplink.pdu import UplinkFrame
+from pyomslpwan.src.uplink.stream import UplinkReceiver
+
+
+
+class CorrelatorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = numpy.random.default_rng(0)
+
+    def reference(self, pattern, blocks):
+        # Direct correlation over the whole stream, with the zero history of a fresh correlator
+        samples = numpy.concatenate([numpy.zeros(len(pattern) - 1)] + blocks)
+        window_squared = numpy.lib.stride_tricks.sliding_window_view(numpy.abs(samples) ** 2, len(pattern))
+        window_rms = numpy.sqrt(window_squared.sum(axis=1))
+        pattern_rms = numpy.sqrt((numpy.abs(pattern) ** 2).sum())
+        return numpy.correlate(samples, pattern) / (window_rms * pattern_rms)
+
+    def test_overlap_save(self):
+        for correlator in [UplinkSyncwordCorrelator(), UplinkMidambleCorrelator(), DownlinkSyncwordCorrelator(), Correlator(numpy.ones(5), fft_size=8)]:
+            blocks = [self.rng.normal(size=size) + 1j * self.rng.normal(size=size) for size in [1, 7, 300, 0, 5000]]
+            correlation = numpy.concatenate([correlator.correlate(block) for block in blocks])
+            numpy.testing.assert_allclose(correlation, self.reference(correlator.pattern, blocks), atol=1e-9)
+
+    def test_silence(self):
+        correlator = UplinkSyncwordCorrelator()
+        correlation = correlator.correlate(numpy.concatenate([self.rng.normal(size=100) * 1e3, numpy.zeros(100)]))
+        self.assertTrue(numpy.isfinite(correlation).all())
+        self.assertTrue((correlation[-60:] == 0).all())
+
+    def test_multiple_patterns(self):
+        patterns = [UplinkSyncwordCorrelator().pattern, UplinkMidambleCorrelator().pattern, DownlinkSyncwordCorrelator().pattern]
+        correlator = MultiCorrelator(patterns)
+        blocks = [self.rng.normal(size=size) + 1j * self.rng.normal(size=size) for size in [50, 3000]]
+        correlations = [correlator.correlate(block) for block in blocks]
+        for index, pattern in enumerate(patterns):
+            correlation = numpy.concatenate([block_correlations[index] for block_correlations in correlations])
+            numpy.testing.assert_allclose(correlation, self.reference(pattern, blocks), atol=1e-9)
+
+
+
+class SampleRingBufferTest(unittest.TestCase):
+
+    def test_wrap(self):
+        ring = SampleRingBuffer(8)
+        samples = numpy.arange(100, dtype=complex)
+        position = 0
+        for size in [5, 3, 6, 6, 2, 6]:
+            ring.append(samples[position:position + size])
+            position += size
+            ring.discard(position - 2)
+            self.assertEqual(ring.capacity, 8)
+            numpy.testing.assert_array_equal(ring.view(ring.start, ring.end), samples[ring.start:ring.end])
+
+        # Keeping more samples than fit grows the buffer without losing any
+        ring.append(samples[position:position + 20])
+        self.assertGreaterEqual(ring.capacity, 22)
+        numpy.testing.assert_array_equal(ring.view(position - 2, position + 20), samples[position - 2:position + 20])
+        with self.assertRaises(AssertionError):
+            ring.view(position - 3, position)
+
+
+
+class DetectionFrontEndTest(unittest.TestCase):
+
+    def test_shared(self):
+        rng = numpy.random.default_rng(1)
+        samples = (rng.normal(size=20000) + 1j * rng.normal(size=20000)) * 0.3
+        syncword = UplinkSyncwordCorrelator().pattern
+        midamble = UplinkMidambleCorrelator().pattern
+        samples[1000:1000 + len(syncword)] += syncword
+        samples[9000:9000 + len(midamble)] += midamble * 1j
+
+        front_end = DetectionFrontEnd()
+        shared = [UplinkSyncwordSynchronizer(0.8, front_end), UplinkMidambleSynchronizer(0.8, front_end)]
+        separate = [UplinkSyncwordSynchronizer(0.8), UplinkMidambleSynchronizer(0.8)]
+        for index in range(0, len(samples), 4096):
+            front_end.feed(samples[index:index + 4096])
+            for synchronizer in separate:
+                synchronizer.feed(samples[index:index + 4096])
+
+        for shared_synchronizer, synchronizer in zip(shared, separate):
+            self.assertEqual(len(shared_synchronizer.streams), len(synchronizer.streams))
+            self.assertGreater(len(synchronizer.streams), 0)
+            numpy.testing.assert_allclose(shared_synchronizer.getBuffer(), synchronizer.getBuffer())
+        self.assertAlmostEqual(shared[1].streams[0]["phase_shift"], 1j, places=2)
+
+        # Clearing one synchronizer keeps the shared history the other one still reads from
+        buffer = shared[1].getBuffer().copy()
+        shared[0].clear()
+        self.assertEqual(len(shared[0].streams), 0)
+        numpy.testing.assert_array_equal(shared[1].getBuffer(), buffer)
+
+
+
+class PeakClusteringTest(unittest.TestCase):
+
+    def setUp(self):
+        # A flat pattern has a wide correlation peak with many crossings around it
+        self.pattern = numpy.ones(8)
+        self.samples = numpy.zeros(4000, dtype=complex)
+        self.samples[1000:1008] += 1
+        self.samples[3000:3008] += 1j
+
+    def feed(self, synchronizer, block_size):
+        for index in range(0, len(self.samples), block_size):
+            synchronizer.feed(self.samples[index:index + block_size])
+        # Positions relative to the first fed sample
+        return [stream["position"] - synchronizer.min_buffer_size for stream in synchronizer.streams]
+
+    def test_single_candidate(self):
+        positions = self.feed(SyncwordSynchronizer(self.pattern, 0, 0.5, guard=0, min_spacing=0), 4000)
+        self.assertGreater(len(positions), 2)
+
+        # Peaks split across blocks are merged as well
+        for block_size in [4000, 1003, 1005]:
+            synchronizer = SyncwordSynchronizer(self.pattern, 0, 0.5)
+            self.assertEqual(self.feed(synchronizer, block_size), [1000, 3000])
+            self.assertGreater(synchronizer.streams[1]["metric"], 0.9)
+            self.assertAlmostEqual(synchronizer.streams[1]["phase_shift"], 1j, places=1)
+
+
+
+class CfarTest(unittest.TestCase):
+
+    def test_false_alarm_rate(self):
+        rng = numpy.random.default_rng(3)
+        noise = rng.normal(size=500000) + 1j * rng.normal(size=500000)
+
+        thresholds = []
+        for scale in [1, 100]:
+            # 20 false candidates per second at 100 ksps, 100 expected
+            synchronizer = UplinkSyncwordSynchronizer(0, false_alarm_rate=20, sample_rate=100e3)
+            for index in range(0, len(noise), 4096):
+                synchronizer.feed(noise[index:index + 4096] * scale)
+            self.assertTrue(60 < len(synchronizer.streams) < 140)
+            thresholds.append(synchronizer.detection_threshold)
+        self.assertAlmostEqual(thresholds[0], thresholds[1])
+
+        # The fixed threshold stays a lower bound
+        synchronizer = UplinkSyncwordSynchronizer(0.9, false_alarm_rate=20, sample_rate=100e3)
+        synchronizer.feed(noise[:4096])
+        self.assertEqual(synchronizer.detection_threshold, 0.9)
+
+    def test_block_size(self):
+        rng = numpy.random.default_rng(7)
+        noise = rng.normal(size=100000) + 1j * rng.normal(size=100000)
+
+        thresholds = []
+        for block_size in [64, 1024, 16384]:
+            synchronizer = UplinkSyncwordSynchronizer(0, false_alarm_rate=20, sample_rate=100e3)
+            for index in range(0, len(noise), block_size):
+                synchronizer.feed(noise[index:index + block_size])
+            thresholds.append(synchronizer.detection_threshold)
+        self.assertEqual(thresholds[0], thresholds[1])
+        self.assertEqual(thresholds[0], thresholds[2])
+
+    def test_excluded_signal(self):
+        rng = numpy.random.default_rng(8)
+        noise = (rng.normal(size=200000) + 1j * rng.normal(size=200000)) * 0.1
+        syncword = UplinkSyncwordCorrelator().pattern
+        samples = noise.copy()
+        for position in range(5000, len(samples), 3000):
+            samples[position:position + 400] += numpy.tile(syncword, 13)[:400]
+
+        # Neither peaks nor, with a squelch, samples around activity count as noise
+        thresholds = []
+        for squelch, data in [(None, noise), (None, samples), (PowerSquelch(), samples)]:
+            synchronizer = UplinkSyncwordSynchronizer(0, DetectionFrontEnd(squelch=squelch), false_alarm_rate=20, sample_rate=100e3)
+            for index in range(0, len(data), 4096):
+                synchronizer.feed(data[index:index + 4096])
+            thresholds.append(synchronizer.detection_threshold)
+        self.assertAlmostEqual(thresholds[1], thresholds[0], delta=0.02)
+        self.assertAlmostEqual(thresholds[2], thresholds[0], delta=0.02)
+
+    def test_missing_sample_rate(self):
+        with self.assertRaises(AssertionError):
+            UplinkSyncwordSynchronizer(0.5, false_alarm_rate=20)
+        with self.assertRaises(AssertionError):
+            UplinkReceiver(0.5, 0.3, false_alarm_rate=20)
+
+
+
+class PowerSquelchTest(unittest.TestCase):
+
+    def test_idle_channel(self):
+        rng = numpy.random.default_rng(4)
+        samples = (rng.normal(size=200000) + 1j * rng.normal(size=200000)) * 0.1
+        syncword = UplinkSyncwordCorrelator().pattern
+        # Bursts right before and after block boundaries
+        for position in [4096 - 40, 100000, 3 * 4096 + 2000]:
+            samples[position:position + 400] += numpy.tile(syncword, 13)[:400]
+
+        synchronizers = []
+        for squelch in [None, PowerSquelch()]:
+            synchronizer = UplinkSyncwordSynchronizer(0.8, DetectionFrontEnd(squelch=squelch))
+            for index in range(0, len(samples), 4096):
+                synchronizer.feed(samples[index:index + 4096])
+            synchronizers.append(synchronizer)
+
+        positions = [[stream["position"] - synchronizer.front_end.getLookback() for stream in synchronizer.streams] for synchronizer in synchronizers]
+        self.assertEqual(positions[0], positions[1])
+        self.assertEqual(len(positions[0]), 3)
+        self.assertLess(synchronizers[1].front_end.correlated_samples, len(samples) / 10)
+
+    def test_burst_at_start(self):
+        rng = numpy.random.default_rng(5)
+        samples = (rng.normal(size=40000) + 1j * rng.normal(size=40000)) * 0.1
+        syncword = UplinkSyncwordCorrelator().pattern
+        # Reception starts in the middle of a burst that spans the whole first block of the second receiver
+        samples[:3000] += numpy.tile(syncword, 94)[:3000]
+        samples[20000:20400] += numpy.tile(syncword, 13)[:400]
+
+        synchronizers = []
+        for squelch, block_size in [(None, 4096), (PowerSquelch(), 4096), (PowerSquelch(noise_floor=0.02), 1024)]:
+            synchronizer = UplinkSyncwordSynchronizer(0.8, DetectionFrontEnd(squelch=squelch))
+            for index in range(0, len(samples), block_size):
+                synchronizer.feed(samples[index:index + block_size])
+            synchronizers.append(synchronizer)
+
+        positions = [[stream["position"] - synchronizer.front_end.getLookback() for stream in synchronizer.streams] for synchronizer in synchronizers]
+        self.assertGreater(len(positions[0]), 1)
+        self.assertLess(positions[0][0], 3000)
+        self.assertEqual(positions[1], positions[0])
+        self.assertEqual(positions[2], positions[0])
+
+    def test_blank_start(self):
+        rng = numpy.random.default_rng(6)
+        samples = (rng.normal(size=20000) + 1j * rng.normal(size=20000)) * 0.1
+        samples[10000:11000] += 1
+
+        # A zero-filled first block must not pull the noise floor to zero
+        squelch = PowerSquelch()
+        self.assertEqual(squelch.getSpans(numpy.zeros(1024, dtype=numpy.complex64)), [])
+        spans = squelch.getSpans(samples)
+        self.assertEqual(len(spans), 1)
+        self.assertLessEqual(spans[0][0], 10000)
+        self.assertGreaterEqual(spans[0][1], 11000)
+        self.assertLess(spans[0][1] - spans[0][0], 5000)
+
+
+
+class ResamplerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = numpy.random.default_rng(0)
+
+    def test_streaming(self):
+        samples = self.rng.normal(size=5000) + 1j * self.rng.normal(size=5000)
+        bounds = numpy.r_[0, numpy.cumsum(self.rng.integers(0, 300, 100))]
+        bounds = bounds[bounds < len(samples)].tolist() + [len(samples)]
+        for interpolation, decimation in [(1, 3), (5, 3), (3, 5), (14, 4), (4, 1)]:
+            resampler = RationalResampler(interpolation, decimation)
+            resampled = numpy.concatenate([resampler.resample(samples[start:end]) for start, end in zip(bounds[:-1], bounds[1:])])
+            expected = signal.upfirdn(resampler.taps, samples, resampler.interpolation, resampler.decimation)
+            self.assertEqual(len(resampled), -(-len(samples) * resampler.interpolation // resampler.decimation))
+            numpy.testing.assert_allclose(resampled, expected[:len(resampled)], atol=1e-12)
+
+    def test_converter(self):
+        converter = SampleRateConverter(2.4e6, 96e3)
+        self.assertEqual(converter.output_rate, 96e3)
+        self.assertEqual([(stage.interpolation, stage.decimation) for stage in converter.stages], [(1, 5), (1, 5)])
+
+        # A tone in the passband keeps its amplitude, a tone that would alias into it is suppressed
+        time = numpy.arange(240000) / 2.4e6
+        passed = converter.resample(numpy.exp(2j * numpy.pi * 30e3 * time))
+        converter.clear()
+        aliased = converter.resample(numpy.exp(2j * numpy.pi * 130e3 * time))
+        self.assertEqual(len(passed), 9600)
+        numpy.testing.assert_allclose(numpy.abs(passed[1000:]), 1, atol=1e-2)
+        self.assertLess(numpy.abs(aliased[1000:]).max(), 1e-2)
+
+    def test_receiver(self):
+        frame = UplinkFrame()
+        frame.coded_payload.phy_payload = b"Hello world!"
+        frame.coded_header.timing_input_value = 64
+        frame.coded_header.burst_mode = BURST_MODE_SINGLE_BURST
+        frame.coded_header.burst_type = BURST_TYPE_UPLINK_SINGLE_BURST_FEC_RATE_1_3
+        BurstModeUplinkGenerator().generateFrame(frame)
+        samples = numpy.zeros(len(frame.uplink_0.bitstream) + 400, dtype=complex)
+        samples[200:-200] = UplinkMskModulator().modulate(frame.uplink_0.bitstream)
+
+        # Samples at 25 / 3 samples per symbol, fed in blocks
+        samples = RationalResampler(25, 3).resample(samples)
+        receiver = UplinkReceiver(1, 0.5, resampler=SampleRateConverter(25, 3))
+        for start in range(0, len(samples), 1000):
+            receiver.feed(samples[start:start + 1000])
+
+        self.assertEqual(len(receiver.bursts), 1)
+        frame_rx = UplinkFrame()
+        frame_rx.uplink_0 = receiver.bursts[0]
+        BurstModeUplinkParser().parseFrame(frame_rx)
+        self.assertEqual(frame_rx.coded_payload.phy_payload, b"Hello world!")
+
+
+
+class GMSKSynchronizerTest(unittest.TestCase):
+
+    def test_streaming(self):
+        rng = numpy.random.default_rng(0)
+        samples = GmskModulator(0.5, 3, 8).modulate(rng.integers(0, 2, 1000), padded=True)
+        samples = samples * numpy.exp(1j * 0.002 * numpy.arange(len(samples))) + 0.05 * (rng.normal(size=len(samples)) + 1j * rng.normal(size=len(samples)))
+
+        synchronizer = GMSKSynchronizer(8, 0.01, 0.01, diagnostics=True)
+        whole = synchronizer.synchronize(samples)
+        self.assertAlmostEqual(abs(synchronizer.state["nco"][0]), 1, places=12)
+        self.assertEqual(whole[5].dtype, numpy.complex64)
+        self.assertEqual(len(whole[0]), len(samples))
+        self.assertAlmostEqual(len(whole[5]), len(samples) / 8, delta=10)
+
+        # Blocks of any size continue where the previous one stopped, diagnostics do not change the output
+        synchronizer = GMSKSynchronizer(8, 0.01, 0.01)
+        bounds = [0, 1, 2, 3, 100, 5000, len(samples)]
+        parts = [synchronizer.synchronize(samples[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+        self.assertIsNone(parts[0][0])
+        numpy.testing.assert_array_equal(numpy.concatenate([part[5] for part in parts]), whole[5])
+
+
+
+class GmskSymbolSamplerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = numpy.random.default_rng(0)
+        self.frame = UplinkFrame()
+        self.frame.coded_payload.phy_payload = b"Hello world!"
+        self.frame.coded_header.timing_input_value = 64
+        self.frame.coded_header.burst_mode = BURST_MODE_SINGLE_BURST
+        self.frame.coded_header.burst_type = BURST_TYPE_UPLINK_SINGLE_BURST_FEC_RATE_1_3
+        BurstModeUplinkGenerator().generateFrame(self.frame)
+
+    def getSamples(self, sps, delay, noise):
+        modulated = GmskModulator(0.5, 3, sps).modulate(self.frame.uplink_0.bitstream, padded=True)
+        samples = numpy.zeros(len(modulated) + 400 * sps, dtype=complex)
+        samples[200 * sps + delay:200 * sps + delay + len(modulated)] = modulated * numpy.exp(0.7j)
+        return samples + noise * (self.rng.normal(size=len(samples)) + 1j * self.rng.normal(size=len(samples)))
+
+    def test_timing(self):
+        for delay in [0, 3, 6]:
+            samples = self.getSamples(8, delay, 0)
+            sampler = GmskSymbolSampler(0.5, 3, 8)
+            symbols = numpy.concatenate([sampler.sample(samples[start:start + 500]) for start in range(0, len(samples), 500)])
+            self.assertAlmostEqual(len(symbols), len(samples) / 8, delta=1)
+
+            # The chosen phase is within one sample of the phase with the strongest alternating structure
+            filtered = numpy.convolve(samples, sampler.taps)
+            metric = [abs(numpy.sum(filtered[phase::8] ** 2 * (-1) ** numpy.arange(len(filtered[phase::8])))) for phase in range(8)]
+            self.assertLessEqual(min((sampler.getPhase() - numpy.argmax(metric)) % 8, (numpy.argmax(metric) - sampler.getPhase()) % 8), 1)
+
+    def test_receiver(self):
+        samples = self.getSamples(8, 3, 1)
+        receiver = UplinkReceiver(0.5, 0.3, samples_per_symbol=8)
+        for start in range(0, len(samples), 777):
+            receiver.feed(samples[start:start + 777])
+
+        self.assertEqual(len(receiver.bursts), 1)
+        frame_rx = UplinkFrame()
+        frame_rx.uplink_0 = receiver.bursts[0]
+        BurstModeUplinkParser().parseFrame(frame_rx)
+        self.assertEqual(frame_rx.coded_payload.phy_payload, b"Hello world!")
@@ -1,9 +1,13 @@
 import unittest
+import numpy
 from bitstring import Bits
 
 from pyomslpwan.tests.vectors import *
-from pyomslpwan.lib.coding import toBinaryArray, toNrzArray
+from pyomslpwan.lib.coding import toBinaryArray, toNrzArray, ConvolutionalCodec
+from pyomslpwan.lib.convolution import convolve, deconvolve, softViterbiDecode, quantizedViterbiDecode
+from pyomslpwan.lib import trellis
 from pyomslpwan.src.coding import *
+from pyomslpwan.src import plan, structs
 
 
 
@@ -100,6 +104,75 @@ class FecTest(unittest.TestCase):
 
 
 
+class ConvolutionalEncoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.codecs = [CommonFecEncodingScheme().codec, ConvolutionalCodec(16, [0xC617], recursive_polynomial=0xC617)]
+
+    def test_encoder(self):
+        # Table encoders against the reference shift register convolution
+        for codec in self.codecs:
+            for data_size in [1, 8, 13, 400]:
+                data = numpy.random.randint(0, 2, data_size).astype(bool)
+                feedback = deconvolve(data, codec.constraint_length, codec.recursive_polynomial, 0)
+                for final_state, emissions in zip([0, 5], [codec.encode(data), codec.encode(data, final_state=5)]):
+                    for poly, emission in zip(codec.polynomials, emissions):
+                        self.assertEqual(Bits(emission), Bits(convolve(feedback, codec.constraint_length, poly, 0, final_state)))
+
+
+
+class SubStreamDecoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.codec = CommonFecEncodingScheme().codec
+
+    def test_decoder(self):
+        data = numpy.random.randint(0, 2, 400).astype(bool)
+        emissions = toNrzArray(self.codec.encode(data)) + numpy.random.normal(0, 0.5, (4, 406))
+        positions = numpy.arange(0, 406, 7)
+
+        # Generator 0 fully received, generator 3 only every 7th symbol, 1 and 2 missing
+        sub_streams = [(0, slice(None), emissions[0]), (3, positions, emissions[3, positions])]
+        data_rx = self.codec.decodeSubStreams(sub_streams, 406, soft=True)
+
+        erased_emissions = numpy.zeros_like(emissions)
+        erased_emissions[0] = emissions[0]
+        erased_emissions[3, positions] = emissions[3, positions]
+        expected = self.codec.decode(list(erased_emissions), soft=True)
+        self.assertEqual(Bits(data_rx), Bits(expected))
+
+
+
+class TrellisCacheTest(unittest.TestCase):
+
+    def test_shared(self):
+        codec_1 = CommonFecEncodingScheme().codec
+        codec_2 = CommonFecEncodingScheme().codec
+        self.assertIs(codec_1.emission_table, codec_2.emission_table)
+        self.assertIs(codec_1.next_states, codec_2.next_states)
+        self.assertFalse(codec_1.emission_table.flags.writeable)
+
+    def test_shared_memory(self):
+        codec = CommonFecEncodingScheme().codec
+        key = trellis.trellisKey(codec.constraint_length, codec.polynomials, codec.recursive_polynomial)
+        tables = trellis.getTrellis(codec.constraint_length, codec.polynomials, codec.recursive_polynomial).getTables()
+
+        handle = trellis.shareTrellisCache()
+        del trellis._trellis_cache[key]
+        trellis.attachTrellisCache(handle)
+        trellis.releaseTrellisCache()
+
+        attached_tables = trellis.getTrellis(codec.constraint_length, codec.polynomials, codec.recursive_polynomial).getTables()
+        self.assertEqual(tables.keys(), attached_tables.keys())
+        for name, table in tables.items():
+            self.assertTrue((table == attached_tables[name]).all())
+
+        data = numpy.random.randint(0, 2, 100).astype(bool)
+        codec = CommonFecEncodingScheme().codec
+        self.assertEqual(Bits(codec.decode(codec.encode(data))), Bits(data))
+
+
+
 class InterleaverTest(unittest.TestCase):
 
     def setUp(self):
@@ -127,6 +200,54 @@ class InterleaverTest(unittest.TestCase):
     
 
 
+class FramePlanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.fec_codec = CommonFecEncodingScheme()
+
+    def test_cached(self):
+        frame_plan = plan.getFramePlan(plan.DIRECTION_UPLINK, 0, 0, 20)
+        self.assertIs(plan.getFramePlan(plan.DIRECTION_UPLINK, 0, 0, 20), frame_plan)
+        self.assertEqual(frame_plan.length_data_a + frame_plan.length_data_b, frame_plan.bits_coded_payload // 8)
+
+    def test_round_trip(self):
+        for direction, burst_mode, burst_type in plan.CODED_PAYLOAD_LAYOUTS:
+            for phy_payload_length in [5, 17, 255]:
+                frame_plan = plan.getFramePlan(direction, burst_mode, burst_type, phy_payload_length)
+                phy_payload = numpy.random.randint(0, 256, phy_payload_length, dtype=numpy.uint8).tobytes()
+
+                bitstreams = frame_plan.encode(self.fec_codec, phy_payload)
+                for bitstream in bitstreams:
+                    self.assertEqual(len(bitstream), frame_plan.bits_coded_payload)
+                    self.assertFalse(frame_plan.deinterleave(bitstream)[-2:].any())
+
+                nrzs = [toNrzArray(bitstream) for bitstream in bitstreams]
+                self.assertEqual(frame_plan.decode(self.fec_codec, nrzs), phy_payload)
+                if len(nrzs) > 1:
+                    self.assertEqual(frame_plan.decode(self.fec_codec, [None] + nrzs[1:]), phy_payload)
+
+    def test_interleaver(self):
+        class ReversingInterleaver:
+            def interleave(self, data):
+                return data[::-1]
+            def deinterleave(self, interleaved):
+                return interleaved[::-1]
+
+        key = (plan.DIRECTION_UPLINK, structs.BURST_MODE_SINGLE_BURST, structs.BURST_TYPE_UPLINK_SINGLE_BURST_FEC_RATE_1_2, 17)
+        default_plan = plan.getFramePlan(*key)
+        self.assertIs(plan.getFramePlan(*key, CommonInterleavingScheme()), default_plan)
+
+        interleaver = ReversingInterleaver()
+        frame_plan = plan.getFramePlan(*key, interleaver)
+        self.assertIsNot(frame_plan, default_plan)
+        phy_payload = numpy.random.randint(0, 256, 17, dtype=numpy.uint8).tobytes()
+        bitstream, = frame_plan.encode(self.fec_codec, phy_payload)
+        default_bitstream, = default_plan.encode(self.fec_codec, phy_payload)
+        self.assertEqual(Bits(interleaver.deinterleave(bitstream)), Bits(default_plan.deinterleave(default_bitstream)))
+        self.assertEqual(frame_plan.decode(self.fec_codec, [toNrzArray(bitstream)]), phy_payload)
+
+
+
 class PrecoderTest(unittest.TestCase):
 
     def setUp(self):
@@ -164,4 +285,152 @@ class PrecoderTest(unittest.TestCase):
 
         precoder_input = toBinaryArray(self.vector_2.precoded_uplink_radio_burst)
         data = Bits(self.precoder.decode(precoder_input))
-        self.assertEqual(data, self.data_2)
\ No newline at end of file
+        self.assertEqual(data, self.data_2)
+
+
+class CrcTest(unittest.TestCase):
+
+    def setUp(self):
+        self.codecs = [(CodedLengthCrc(), 9), (CodedHeaderCrc(), 20)]
+
+    def test_parity(self):
+        for crc_codec, data_size in self.codecs:
+            data = numpy.random.randint(0, 2, (100, data_size))
+            parity = crc_codec.parity(data)
+            self.assertEqual(parity.shape, (100, crc_codec.crc_length))
+            for word, word_parity in zip(data, parity):
+                encoded = crc_codec.codec.encode(word)[0]
+                self.assertEqual(Bits(word_parity), Bits(encoded[-crc_codec.crc_length:]))
+                self.assertEqual(Bits(crc_codec.parity(word)), Bits(word_parity))
+
+    def test_check(self):
+        for crc_codec, data_size in self.codecs:
+            data = numpy.random.randint(0, 2, (100, data_size))
+            encoded = crc_codec.encode(data)
+            self.assertTrue(crc_codec.check(encoded).all())
+            encoded[:, 0] ^= True
+            self.assertFalse(crc_codec.check(encoded).any())
+
+    def test_decode_batch(self):
+        for crc_codec, data_size in self.codecs:
+            data = numpy.random.randint(0, 2, (20, data_size)).astype(bool)
+            nrz = toNrzArray(crc_codec.encode(data)).astype(float)
+            # Every other codeword has a weak wrong bit, the others are valid as received
+            nrz[1::2, 2] *= -0.1
+            decoded = crc_codec.decode(nrz, soft=True)
+            self.assertEqual(decoded.shape, data.shape)
+            for word_nrz, word_decoded in zip(nrz, decoded):
+                self.assertEqual(Bits(word_decoded), Bits(crc_codec.decode(word_nrz, soft=True)))
+
+    def test_codebook(self):
+        # Correcting short codewords with the codebook agrees with the Viterbi decoder
+        crc_codec = CrcCodec(8, 0x107)
+        data = numpy.random.randint(0, 2, (50, 10)).astype(bool)
+        nrz = toNrzArray(crc_codec.encode(data)) + numpy.random.normal(scale=0.8, size=(50, 18))
+        self.assertIsNone(crc_codec._codec)
+        decoded = crc_codec.correct(nrz, soft=True)
+        self.assertIsNone(crc_codec._codec)
+        self.assertTrue((decoded == crc_codec.codec.decodeBatch(nrz[:, None, :], soft=True)).all())
+
+
+
+class CodedLengthDecoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.decoder = CodedLengthDecoder()
+        self.crc_codec = CodedLengthCrc()
+
+    def test_decoder(self):
+        lengths = numpy.arange(4, 384 + 1)
+        length_bits = (lengths[:, numpy.newaxis] >> numpy.arange(8, -1, -1)) & 0b1
+        nrz = toNrzArray(self.crc_codec.encode(length_bits))
+        decoded, correlations, margins = self.decoder.decode(nrz)
+        self.assertTrue((decoded == lengths).all())
+        self.assertTrue((correlations == 1).all())
+        self.assertTrue((margins > 0).all())
+
+        nrz[:, :3] *= -1
+        decoded, correlations, margins = self.decoder.decode(nrz)
+        self.assertTrue((decoded == lengths).all())
+        self.assertEqual(self.decoder.decode(nrz[0]), (4, correlations[0], margins[0]))
+
+    def test_reject_noise(self):
+        rng = numpy.random.default_rng(0)
+        lengths = rng.integers(4, 384 + 1, 1000)
+        length_bits = (lengths[:, numpy.newaxis] >> numpy.arange(8, -1, -1)) & 0b1
+        nrz = toNrzArray(self.crc_codec.encode(length_bits))
+
+        decoded, correlations, margins = self.decoder.decode(nrz)
+        self.assertTrue(self.decoder.check(correlations).all())
+
+        noisy = nrz + rng.normal(scale=0.5, size=nrz.shape)
+        decoded, correlations, margins = self.decoder.decode(noisy)
+        self.assertTrue((decoded == lengths).all())
+        self.assertTrue(self.decoder.check(correlations).all())
+
+        noise = rng.normal(size=nrz.shape)
+        decoded, correlations, margins = self.decoder.decode(noise)
+        self.assertLess(self.decoder.check(correlations).mean(), 0.35)
+
+
+
+class BatchDecoderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.vector = FecTestVector()
+        self.codec = CommonFecEncodingScheme().codec
+
+    def test_decoder(self):
+        data = toBinaryArray(self.vector.input_data)
+        emissions = toNrzArray(self.codec.encode(data))
+        observed_emissions = numpy.stack([emissions] * 4)
+        observed_emissions[1:] += numpy.random.normal(0, 0.5, observed_emissions[1:].shape)
+
+        erasures = numpy.zeros(observed_emissions.shape, dtype=bool)
+        erasures[1, 3] = True
+        erasures[2, 2:] = True
+        erasures[3, 0] = True
+        erasures[3, 3] = True
+
+        data_rx = self.codec.decodeBatch(observed_emissions, soft=True, erasures=erasures)
+        self.assertEqual(data_rx.shape, (4, len(data)))
+        for batch_index in range(4):
+            expected = self.codec.decode(list(numpy.where(erasures[batch_index], 0, observed_emissions[batch_index])), soft=True)
+            self.assertEqual(Bits(data_rx[batch_index]), Bits(expected))
+        self.assertEqual(Bits(data_rx[0]), self.vector.input_data)
+
+    def test_traceback_depth(self):
+        data = numpy.random.randint(0, 2, 400).astype(bool)
+        emissions = toNrzArray(self.codec.encode(data))
+        observed_emissions = emissions + numpy.random.normal(0, 0.3, emissions.shape)
+
+        expected = self.codec.decode(list(observed_emissions), soft=True)
+        self.codec.traceback_depth = 48
+        data_rx = self.codec.decode(list(observed_emissions), soft=True)
+        self.codec.traceback_depth = 0
+        self.assertEqual(Bits(data_rx), Bits(expected))
+        self.assertEqual(Bits(data_rx), Bits(data))
+
+    def test_quantized(self):
+        data = numpy.random.randint(0, 2, 400).astype(bool)
+        emissions = toNrzArray(self.codec.encode(data))
+        observed_emissions = numpy.stack([emissions] * 3)
+        observed_emissions[1:] += numpy.random.normal(0, 0.3, observed_emissions[1:].shape)
+
+        codec = ConvolutionalCodec(self.codec.constraint_length, self.codec.polynomials, self.codec.recursive_polynomial, quantization_bits=4)
+        data_rx = codec.decodeBatch(observed_emissions, soft=True)
+        for batch_index in range(3):
+            self.assertEqual(Bits(data_rx[batch_index]), Bits(data))
+            self.assertEqual(Bits(codec.decode(list(observed_emissions[batch_index]), soft=True)), Bits(data))
+
+    def test_quantized_metrics(self):
+        # On integer soft values the int16 metrics must take the same decisions as the float ones
+        data = numpy.random.randint(0, 2, 400).astype(bool)
+        emissions = toNrzArray(self.codec.encode(data))
+        observed_emissions = numpy.clip(numpy.rint((emissions + numpy.random.normal(0, 1.5, emissions.shape)) * 40), -127, 127).astype(numpy.int8)
+        emission_table = self.codec.getEmissionTable()
+
+        for traceback_depth in [0, 48]:
+            expected = softViterbiDecode(observed_emissions.astype(numpy.float32), self.codec.constraint_length, 0, 0, emission_table=emission_table, traceback_depth=traceback_depth)
+            data_rx = quantizedViterbiDecode(observed_emissions, self.codec.constraint_length, 0, 0, emission_table, traceback_depth)
+            self.assertEqual(Bits(data_rx), Bits(expected))
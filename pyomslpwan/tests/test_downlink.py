@@ -367,4 +367,33 @@ class MultiBurstTest(unittest.TestCase):
         self.assertEqual(coded_payload.multi_burst_1_struct.getBits(), self.vector.coded_payload_dl1)
         self.assertEqual(coded_payload.multi_burst_2_struct.getBits(), self.vector.coded_payload_dl2)
         self.assertEqual(coded_payload.multi_burst_3_struct.getBits(), self.vector.coded_payload_dl3)
+        self.assertEqual(Bits(coded_payload.phy_payload), self.vector.phy_payload)
+
+    def test_parser_missing_burst(self):
+        # DL1 is not received, the payload is recovered from DL2 and DL3
+        frame = DownlinkFrame()
+        for name, radio_burst in [("downlink_2", self.vector.radio_burst_dl2), ("downlink_3", self.vector.radio_burst_dl3)]:
+            bitstream = toBinaryArray(radio_burst)
+
+            burst = DownlinkBurst()
+            group1 = FieldGroup([
+                burst.struct.preamble,
+                burst.struct.syncword,
+                burst.struct.coded_header
+            ])
+
+            input, bitstream = numpy.split(bitstream, [group1.getSize()])
+            group1.setBitstream(input)
+            self.parser.parseCodedHeader(burst)
+
+            input, bitstream = numpy.split(bitstream, [burst.struct.data.getSize()])
+            burst.struct.data.setBitstream(input)
+
+            setattr(frame, name, burst)
+
+        self.parser.parseFrame(frame)
+        coded_payload = frame.coded_payload
+        self.assertIsNone(coded_payload.multi_burst_1_struct)
+        self.assertEqual(coded_payload.multi_burst_2_struct.getBits(), self.vector.coded_payload_dl2)
+        self.assertEqual(coded_payload.multi_burst_3_struct.getBits(), self.vector.coded_payload_dl3)
         self.assertEqual(Bits(coded_payload.phy_payload), self.vector.phy_payload)
\ No newline at end of file
@@ -0,0 +1,131 @@
+import unittest
+import numpy
+from bitstring import Bits
+
+from pyomslpwan.lib.bits import uintToBits, bitsToUint, bytesToBits, bitsToBytes
+from pyomslpwan.lib.fields import Field, FieldGroup, HARD_DTYPE, SOFT_DTYPE
+from pyomslpwan.src.structs import *
+
+
+
+class BitsTest(unittest.TestCase):
+
+    def test_uint(self):
+        for value, width in [(1, 1), (5, 3), (42, 8), (0x5A5A, 15), (2 ** 95 + 3, 96)]:
+            bits = uintToBits(value, width)
+            self.assertEqual(bits.tolist(), list(Bits(uint=value, length=width)))
+            self.assertEqual(bitsToUint(bits), value)
+
+        values = numpy.array([[0, 1], [300, 511]])
+        bits = uintToBits(values, 9)
+        self.assertEqual(bits.shape, (2, 2, 9))
+        self.assertEqual(bitsToUint(bits).tolist(), values.tolist())
+
+    def test_bytes(self):
+        data = b"Hello world!"
+        bits = bytesToBits(data)
+        self.assertEqual(bits.tolist(), list(Bits(bytes=data)))
+        self.assertEqual(bitsToBytes(bits).tobytes(), data)
+
+        batch = numpy.frombuffer(data, dtype=numpy.uint8).reshape(3, 4)
+        self.assertEqual(bytesToBits(batch).shape, (3, 32))
+        self.assertEqual(bitsToBytes(bytesToBits(batch)).tolist(), batch.tolist())
+
+    def test_field(self):
+        field = Field(16)
+        field.setUint(1234)
+        self.assertEqual(field.getUint(), 1234)
+        self.assertEqual(field.getBits(), Bits(uint=1234, length=16))
+        field.setBytes(b"ab")
+        self.assertEqual(field.getBytes(), b"ab")
+
+
+
+class FieldLayoutTest(unittest.TestCase):
+
+    def setUp(self):
+        self.struct = BurstModeUplink()
+        self.struct.data_a.setSize(16)
+        self.struct.data_b.setSize(24)
+        self.struct.coded_header.phy_payload_length.setBits(uint=42)
+
+    def test_allocate(self):
+        bits = self.struct.getBits()
+        self.struct.allocate()
+
+        self.assertEqual(self.struct.getBits(), bits)
+        buffer = self.struct.getData(copy=False)
+        for container in [self.struct.coded_header, self.struct.coded_header.fec_systematic, self.struct.data_b]:
+            self.assertTrue(numpy.shares_memory(container.getData(copy=False), buffer))
+
+        # Writes to nested fields and groups land in the shared buffer
+        self.struct.data_b.setBitstream(numpy.ones(24, dtype=int))
+        self.struct.coded_header.crc_systematic.setBits(uint=0)
+        self.assertTrue((buffer[-24:] > 0).all())
+        self.assertEqual(self.struct.coded_header.phy_payload_length.getBits().uint, 0)
+
+    def test_copy(self):
+        # Values are copied unless the storage is asked for
+        self.struct.allocate()
+        for container in [self.struct, self.struct.coded_header, self.struct.data_b]:
+            container.setBitstream(numpy.zeros(container.getSize(), dtype=int))
+            data = container.getData()
+            nrz = container.getNrzStream()
+            valid = container.getValid()
+            container.setBitstream(numpy.ones(container.getSize(), dtype=int))
+            self.assertFalse(numpy.shares_memory(data, container.getData(copy=False)))
+            self.assertFalse(numpy.shares_memory(nrz, container.getData(copy=False)))
+            self.assertFalse(numpy.shares_memory(valid, container.getValid(copy=False)))
+            self.assertTrue((nrz < 0).all())
+
+        nrz = self.struct.data_b.getNrzStream(copy=False)
+        self.struct.data_b.setBitstream(numpy.zeros(24, dtype=int))
+        self.assertTrue((nrz < 0).all())
+
+    def test_release(self):
+        self.struct.allocate()
+        self.struct.data_a.setSize(16)
+        self.assertIs(self.struct.layout, self.struct)
+
+        self.struct.data_b.setBitstream(numpy.ones(24, dtype=int))
+        self.struct.data_a.setSize(8)
+        self.assertIsNone(self.struct.layout)
+        self.assertEqual(self.struct.getSize(), self.struct.getPosition(self.struct.data_b) + 24)
+        self.assertEqual(self.struct.data_b.getBits(), Bits(uint=2 ** 24 - 1, length=24))
+        self.assertEqual(self.struct.coded_header.phy_payload_length.getBits().uint, 42)
+
+    def test_rebind(self):
+        field = Field(4, uint=5)
+        group_1 = FieldGroup([field, Field(4)])
+        group_2 = FieldGroup([Field(4), field])
+        group_1.allocate()
+        group_2.allocate()
+
+        self.assertIsNone(group_1.layout)
+        self.assertEqual(group_1.getBits()[:4].uint, 5)
+        self.assertEqual(group_2.getBits()[4:].uint, 5)
+
+    def test_storage(self):
+        hard = FieldGroup([Field(4, uint=5), Field(4)])
+        hard.allocate(HARD_DTYPE)
+        self.assertEqual(hard.getData().dtype, HARD_DTYPE)
+        self.assertEqual(hard.getData().nbytes + hard.getValid().nbytes, 2 * 8)
+
+        # Hard bits become NRZ symbols, bits that were never set stay erased
+        soft = FieldGroup([Field(4), Field(4)])
+        soft.copyFrom(hard)
+        self.assertEqual(soft.getDtype(), SOFT_DTYPE)
+        self.assertEqual(soft.getNrzStream().tolist(), [-1, 1, -1, 1, 0, 0, 0, 0])
+        self.assertEqual(soft.getBits()[:4].uint, 5)
+
+    def test_release_dtype(self):
+        # Fields bound as hard bits store soft values again once the layout is released
+        group = FieldGroup([Field(4, uint=5), Field(4)])
+        group.allocate(HARD_DTYPE)
+        group.release()
+        for field in group.fields:
+            self.assertEqual(field.getDtype(), SOFT_DTYPE)
+        self.assertEqual(group.fields[0].getBits().uint, 5)
+
+        group.fields[1].setNrzStream(numpy.array([0.25, -0.5, 0.75, -1]))
+        self.assertEqual(group.fields[1].getNrzStream().tolist(), [0.25, -0.5, 0.75, -1])
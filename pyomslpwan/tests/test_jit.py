@@ -0,0 +1,57 @@
+import os
+import sys
+import unittest
+import tempfile
+import subprocess
+
+from pyomslpwan.lib import jit
+
+
+
+# Runs in a fresh interpreter, so that kernels compiled by other tests do not hide cache misses
+WARM_RUN = """
+import os
+import sys
+import unittest
+from numba.core import event
+from pyomslpwan.lib import jit
+
+jit.setCacheDir(sys.argv[1])
+compile_times, step_times = jit.warmup()
+assert not compile_times, sorted(compile_times)
+
+# The receiver and transmitter must not need any specialization the warm-up did not load
+kernels = jit.getKernels()
+suite = unittest.defaultTestLoader.loadTestsFromNames([
+    "pyomslpwan.tests.test_uplink",
+    "pyomslpwan.tests.test_downlink",
+    "pyomslpwan.tests.test_synchronization",
+    "pyomslpwan.tests.test_channel",
+])
+with event.install_recorder("numba:compile") as recorder:
+    result = unittest.TextTestRunner(stream=open(os.devnull, "w")).run(suite)
+assert result.wasSuccessful()
+compiled = {compile_event.data["dispatcher"].py_func.__name__ for _, compile_event in recorder.buffer}
+assert not compiled & set(kernels), sorted(compiled & set(kernels))
+"""
+
+
+
+class JitTest(unittest.TestCase):
+
+    def test_kernels(self):
+        kernels = jit.getKernels()
+        for name in ["convolutionalEncode", "viterbiDecode", "symbolSync"]:
+            self.assertIn(name, kernels)
+
+    def test_warmup(self):
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cold = subprocess.run([sys.executable, "-m", "pyomslpwan.lib.jit", "--cache-dir", cache_dir],
+                                  cwd=root, capture_output=True, text=True)
+            self.assertEqual(cold.returncode, 0, cold.stderr)
+            self.assertIn("compiled", cold.stdout)
+            self.assertTrue(os.listdir(cache_dir))
+
+            warm = subprocess.run([sys.executable, "-c", WARM_RUN, cache_dir], cwd=root, capture_output=True, text=True)
+            self.assertEqual(warm.returncode, 0, warm.stderr)
@@ -0,0 +1,53 @@
+import unittest
+import numpy
+
+from pyomslpwan.lib.synchronization import InterpolatingResampler, GmskDemod, getInterpolatorTaps
+from pyomslpwan.lib.channel import GmskModulator
+
+
+
+class InterpolatorTest(unittest.TestCase):
+
+    def test_taps(self):
+        taps = getInterpolatorTaps()
+        self.assertEqual(taps.dtype, numpy.float32)
+        self.assertEqual(taps.shape, (129, 8))
+        self.assertTrue(taps.flags.c_contiguous)
+        self.assertFalse(taps.flags.writeable)
+
+        # Every resampler shares the bank of the process
+        self.assertIs(InterpolatingResampler().filter_bank, taps)
+        self.assertIs(InterpolatingResampler().filter_bank, getInterpolatorTaps())
+
+    def test_interpolate_many(self):
+        rng = numpy.random.default_rng(0)
+        resampler = InterpolatingResampler()
+        samples = rng.normal(size=100) + 1j * rng.normal(size=100)
+        indices = rng.integers(0, 100 - resampler.ntaps, 50)
+        mus = numpy.concatenate([rng.random(46), [0, 0.5 / 128, 1.5 / 128, 1]])
+
+        outputs = resampler.interpolate_many(samples, indices, mus)
+        expected = [resampler.interpolate(samples[index:], mu) for index, mu in zip(indices, mus)]
+        numpy.testing.assert_allclose(outputs, expected, rtol=1e-6)
+
+
+
+class GmskDemodTest(unittest.TestCase):
+
+    def test_chunked(self):
+        rng = numpy.random.default_rng(0)
+        bits = rng.integers(0, 2, 500) * 2.0 - 1
+        signal = GmskModulator(0.5, 3, 8).modulate(bits, padded=True)
+        signal = signal + 0.05 * (rng.normal(size=len(signal)) + 1j * rng.normal(size=len(signal)))
+
+        demod = GmskDemod(8, 0.175, 0.005, 0)
+        whole = demod.demodulate(signal)
+        # Decisions lag the transmitted bits by one symbol, only a few are wrong once the loop has settled
+        self.assertLess((whole[3][21:481] != (bits[20:480] > 0)).sum(), 10)
+
+        demod.clear()
+        bounds = numpy.r_[0, numpy.cumsum(rng.integers(1, 300, 100))]
+        bounds = bounds[bounds < len(signal)].tolist() + [len(signal)]
+        parts = [demod.demodulate(signal[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+        for index in range(4):
+            numpy.testing.assert_allclose(numpy.concatenate([part[index] for part in parts]), whole[index], atol=1e-12)
@@ -305,6 +305,7 @@ class MultiBurstTest(unittest.TestCase):
         self.assertEqual(coded_header.struct.burst_type.getBits(), self.vector.burst_type)
 
         self.assertEqual(coded_payload.multi_burst_1_struct.phy_payload.getBits(), self.vector.phy_payload)
+        self.assertEqual(coded_payload.fec_parities.fec_parity_3b.getBits(), coded_payload.multi_burst_2_struct.fec_parity_3b.getBits())
         self.assertEqual(coded_payload.multi_burst_1_struct.getBits(), self.vector.coded_payload_ul1)
         self.assertEqual(coded_payload.multi_burst_2_struct.getBits(), self.vector.coded_payload_ul2)
         self.assertEqual(coded_payload.multi_burst_3_struct.getBits(), self.vector.coded_payload_ul3)
@@ -482,4 +483,43 @@ class MultiBurstTest(unittest.TestCase):
         self.assertEqual(coded_payload.multi_burst_1_struct.getBits(), self.vector.coded_payload_ul1)
         self.assertEqual(coded_payload.multi_burst_2_struct.getBits(), self.vector.coded_payload_ul2)
         self.assertEqual(coded_payload.multi_burst_3_struct.getBits(), self.vector.coded_payload_ul3)
+        self.assertEqual(Bits(coded_payload.phy_payload), self.vector.phy_payload)
+
+    def test_parser_missing_burst(self):
+        # UL1 is not received, the payload is recovered from UL2 and UL3
+        frame = UplinkFrame()
+        for name, radio_burst in [("uplink_2", self.vector.radio_burst_ul2), ("uplink_3", self.vector.radio_burst_ul3)]:
+            bitstream = toBinaryArray(radio_burst)
+
+            burst = UplinkBurst()
+            group1 = FieldGroup([
+                burst.struct.preamble,
+                burst.struct.syncword,
+                burst.struct.coded_length
+            ])
+            group2 = FieldGroup([
+                burst.struct.data_a,
+                burst.struct.midamble,
+                burst.struct.coded_header
+            ])
+
+            input, bitstream = numpy.split(bitstream, [group1.getSize()])
+            group1.setBitstream(input)
+            self.parser.parseCodedLength(burst)
+
+            input, bitstream = numpy.split(bitstream, [group2.getSize()])
+            group2.setBitstream(input)
+            self.parser.parseCodedHeader(burst)
+
+            input, bitstream = numpy.split(bitstream, [burst.struct.data_b.getSize()])
+            burst.struct.data_b.setBitstream(input)
+            self.parser.parseData(burst)
+
+            setattr(frame, name, burst)
+
+        self.parser.parseFrame(frame)
+        coded_payload = frame.coded_payload
+        self.assertIsNone(coded_payload.multi_burst_1_struct)
+        self.assertEqual(coded_payload.multi_burst_2_struct.getBits(), self.vector.coded_payload_ul2)
+        self.assertEqual(coded_payload.multi_burst_3_struct.getBits(), self.vector.coded_payload_ul3)
         self.assertEqual(Bits(coded_payload.phy_payload), self.vector.phy_payload)
\ No newline at end of file